@@ -0,0 +1,259 @@
+"""
+Offline end-to-end benchmark for the IterativeResearcher and DeepResearcher.
+
+All models point at a local OpenAI-compatible mock LLM and searches go to a Serper-shaped mock endpoint over a fixture
+web (see benchmarks/mock_services.py), so runs are deterministic in their shape and need no API keys or network. Each
+scenario fixes the number of sections, iterations and tool calls per iteration, and the latency and token rate of the
+mock LLM. For each scenario the benchmark reports:
+- wall time of the run (p50/p95 over the timed runs)
+- p50/p95 latency of each stage (the LLM calls of each agent, from the run stats)
+- LLM calls, search calls and page fetches, and the bytes sent to and received from the mock services
+- peak Python memory of the run (measured with tracemalloc in a separate, untimed run)
+
+Results are appended to benchmarks/results/e2e_history.jsonl along with the current commit, and compared with a saved
+baseline: the script exits with an error if a scenario's p50 wall time regresses by more than the tolerance or it makes
+more calls than the baseline run.
+
+Usage:
+    python -m benchmarks.bench_end_to_end [--scenarios deep-3x2 ...] [--runs 5] [--tolerance 0.2] [--update-baseline]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+HISTORY_FILE = os.path.join(RESULTS_DIR, "e2e_history.jsonl")
+BASELINE_FILE = os.path.join(RESULTS_DIR, "e2e_baseline.json")
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "iterative-3": {"mode": "iterative", "sections": 1, "iterations": 3, "fan_out": 2},
+    "deep-3x2": {"mode": "deep", "sections": 3, "iterations": 2, "fan_out": 2},
+    "deep-8x3-fanout3": {"mode": "deep", "sections": 8, "iterations": 3, "fan_out": 3},
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Get the q-th percentile (0-100) of the values, interpolating between the closest ranks"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+async def run_scenario(scenario: Dict[str, Any], base_url: str):
+    """Run the researcher for a scenario against the mock services, returning its RunStats"""
+    from deep_researcher import DeepResearcher, IterativeResearcher, LLMConfig
+
+    config = LLMConfig(
+        reasoning_model_provider="local",
+        reasoning_model="mock-reasoning",
+        main_model_provider="local",
+        main_model="mock-main",
+        fast_model_provider="local",
+        fast_model="mock-fast",
+        backup_model_provider=None,
+        backup_model=None,
+        search_provider="serper",
+        base_urls={"local": f"{base_url}/v1"},
+    )
+    # Leave room for the scripted number of iterations, which the mock knowledge gap agent decides
+    limits = {"max_iterations": scenario["iterations"] + 1, "max_time_minutes": 30, "verbose": False, "config": config}
+    if scenario["mode"] == "deep":
+        _, stats = await DeepResearcher(**limits).run("Benchmark query", return_stats=True)
+    else:
+        _, stats = await IterativeResearcher(**limits).run("Benchmark query", return_stats=True)
+    return stats
+
+
+class MockServicesProcess:
+    """The mock services running in a subprocess, so that they don't compete with the benchmarked code for the GIL"""
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.mock_services"], stdout=subprocess.PIPE, text=True
+        )
+        self.base_url = self.process.stdout.readline().strip()
+        if not self.base_url:
+            raise RuntimeError("The mock services failed to start")
+
+    def _request(self, path: str, payload: Optional[dict] = None) -> Any:
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(
+            f"{self.base_url}{path}", data=data, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def set_scenario(self, **scenario) -> None:
+        self._request("/control/scenario", scenario)
+
+    def pop_counters(self) -> Dict[str, Dict[str, int]]:
+        return self._request("/control/counters?reset=1")
+
+    def stop(self) -> None:
+        self.process.terminate()
+        self.process.wait()
+
+
+async def benchmark_scenario(name: str, services: MockServicesProcess, runs: int, latency_ms: float, tokens_per_second: float) -> Dict[str, Any]:
+    """
+    Run a scenario once to measure its memory use and then `runs` times to time it. All runs share one event loop, as
+    the LLM clients (and their connection pools) are shared between runs, like in a long-running service.
+    """
+    scenario = SCENARIOS[name]
+    services.set_scenario(
+        sections=scenario["sections"],
+        iterations=scenario["iterations"],
+        fan_out=scenario["fan_out"],
+        latency_ms=latency_ms,
+        tokens_per_second=tokens_per_second,
+    )
+
+    # Memory is measured in a separate run, as tracing allocations slows the run down
+    tracemalloc.start()
+    await run_scenario(scenario, services.base_url)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    services.pop_counters()
+
+    wall_times: List[float] = []
+    stage_latencies: Dict[str, List[float]] = {}
+    counters: Dict[str, Dict[str, int]] = {}
+    llm_calls = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        stats = await run_scenario(scenario, services.base_url)
+        wall_times.append(time.perf_counter() - start)
+        llm_calls = stats.total.calls
+        for call in stats.calls:
+            stage_latencies.setdefault(call.agent, []).append(call.wall_seconds)
+        counters = services.pop_counters()
+
+    return {
+        "scenario": name,
+        "runs": runs,
+        "wall_p50": percentile(wall_times, 50),
+        "wall_p95": percentile(wall_times, 95),
+        "stages": {
+            agent: {"calls_per_run": len(latencies) / runs, "p50": percentile(latencies, 50), "p95": percentile(latencies, 95)}
+            for agent, latencies in stage_latencies.items()
+        },
+        "llm_calls": llm_calls,
+        "search_calls": counters.get("serper", {}).get("requests", 0),
+        "page_fetches": counters.get("web", {}).get("requests", 0),
+        "bytes_sent": sum(endpoint["bytes_in"] for endpoint in counters.values()),
+        "bytes_received": sum(endpoint["bytes_out"] for endpoint in counters.values()),
+        "peak_memory_mb": peak_memory / 1024 / 1024,
+    }
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    print(
+        f"\n{result['scenario']}: wall p50 {result['wall_p50']:.2f}s, p95 {result['wall_p95']:.2f}s | "
+        f"{result['llm_calls']} LLM calls, {result['search_calls']} searches, {result['page_fetches']} page fetches | "
+        f"{result['bytes_sent'] / 1024:.0f} KB sent, {result['bytes_received'] / 1024:.0f} KB received | "
+        f"peak memory {result['peak_memory_mb']:.1f} MB"
+    )
+    print(f"  {'stage':<24} {'calls/run':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for agent, stage in sorted(result["stages"].items(), key=lambda item: item[1]["p95"], reverse=True):
+        print(f"  {agent:<24} {stage['calls_per_run']:>9.1f} {stage['p50'] * 1000:>8.0f} {stage['p95'] * 1000:>8.0f}")
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Compare the results with the baseline, returning a description of each regression"""
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["scenario"])
+        if previous is None:
+            continue
+        if result["wall_p50"] > previous["wall_p50"] * (1 + tolerance):
+            regressions.append(
+                f"{result['scenario']}: p50 wall time {result['wall_p50']:.2f}s vs {previous['wall_p50']:.2f}s "
+                f"at {previous.get('commit', 'baseline')}"
+            )
+        for metric in ("llm_calls", "search_calls", "page_fetches"):
+            if result[metric] > previous[metric]:
+                regressions.append(f"{result['scenario']}: {metric} {result[metric]} vs {previous[metric]}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the researchers")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=5, help="Number of timed runs of each scenario")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fixed latency of each mock LLM response")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0, help="Output token rate of the mock LLM")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression of the p50 wall time")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline results to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Save the results as the new baseline")
+    args = parser.parse_args()
+
+    # Searches go to the mock Serper endpoint and no traces are exported
+    from benchmarks.mock_services import MockScenario  # noqa: F401 (checks that aiohttp is available before starting)
+    from agents import set_tracing_disabled
+    set_tracing_disabled(True)
+
+    services = MockServicesProcess()
+    os.environ["SERPER_API_KEY"] = "mock"
+    os.environ["SERPER_API_URL"] = f"{services.base_url}/serper/search"
+    commit = get_commit()
+
+    async def run_benchmarks() -> List[Dict[str, Any]]:
+        # Warm up first, so that importing the agents isn't counted in the peak memory of the first scenario
+        await benchmark_scenario(args.scenarios[0], services, 0, args.latency_ms, args.tokens_per_second)
+        results = []
+        for name in args.scenarios:
+            result = await benchmark_scenario(name, services, args.runs, args.latency_ms, args.tokens_per_second)
+            result.update(commit=commit, timestamp=time.time(), latency_ms=args.latency_ms, tokens_per_second=args.tokens_per_second)
+            print_result(result)
+            results.append(result)
+        return results
+
+    try:
+        results = asyncio.run(run_benchmarks())
+    finally:
+        services.stop()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+    baseline: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.tolerance)
+
+    if args.update_baseline:
+        baseline.update({result["scenario"]: result for result in results})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if regressions:
+        print("\nRegressions:\n" + "\n".join(f"- {regression}" for regression in regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
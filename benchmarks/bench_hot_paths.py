@@ -0,0 +1,191 @@
+"""
+Micro-benchmarks for the pure-Python code that runs on every fetched page or LLM call.
+
+Each case times one function on a realistic generated input (a 2 MB HTML page, a 100 KB JSON output from a model, a
+50-iteration conversation, a report with 500 references, ...). Timings are the best and median of several rounds, in
+milliseconds per call. Results are compared with a baseline saved on the same machine, so that optimizations and
+regressions show up as a ratio for each case; the script exits with an error if any case is slower than the baseline
+by more than the tolerance.
+
+Usage:
+    python -m benchmarks.bench_hot_paths [--cases html_to_text ...] [--rounds 5] [--tolerance 0.25] [--update-baseline]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BASELINE_FILE = os.path.join(RESULTS_DIR, "hot_paths_baseline.json")
+
+WORDS = (
+    "market growth revenue battery supply chain capacity policy demand analysis forecast region technology adoption "
+    "pricing customer investment strategy performance efficiency regulation competition production research"
+).split()
+
+
+def words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def make_html(size_kb: int, seed: int = 0, links_per_block: int = 5) -> str:
+    """Build a page of roughly size_kb kilobytes, with navigation, scripts, headings, paragraphs, lists and links"""
+    rng = random.Random(seed)
+    nav = "".join(f'<li><a href="/nav/{i}">{words(rng, 2)}</a></li>' for i in range(30))
+    parts = [
+        "<html><head><title>Benchmark page</title><style>body { font-family: sans-serif; }</style></head><body>",
+        f"<header><nav><ul>{nav}</ul></nav></header>",
+    ]
+    size, block = 0, 0
+    while size < size_kb * 1024:
+        links = " ".join(
+            f'<a href="{"/page/" if i % 2 else "https://other.example.org/page/"}{block}-{i}">{words(rng, 3)}</a>'
+            for i in range(links_per_block)
+        )
+        html = (
+            f"<div class=\"section\"><h2>{words(rng, 5)}</h2><p>{words(rng, 120)} {links}</p>"
+            f"<ul>{''.join(f'<li>{words(rng, 12)}</li>' for _ in range(4))}</ul>"
+            f"<blockquote>{words(rng, 30)}</blockquote><script>var x{block} = {block};</script></div>"
+        )
+        parts.append(html)
+        size += len(html)
+        block += 1
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def make_urls(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    extensions = ["", "", "", "/", ".html", ".pdf", ".png", "?page=2"]
+    return [f"https://www.{rng.choice(WORDS)}-{i}.com/{words(rng, 3).replace(' ', '/')}{rng.choice(extensions)}" for i in range(count)]
+
+
+def make_json_output(size_kb: int, seed: int = 0) -> str:
+    """Build a ToolAgentOutput-like JSON object of roughly size_kb kilobytes, wrapped in text as models tend to return it"""
+    rng = random.Random(seed)
+    paragraphs = []
+    while sum(len(p) for p in paragraphs) < size_kb * 1024:
+        paragraphs.append(words(rng, 80) + f" [{rng.randint(1, 50)}]")
+    payload = json.dumps({
+        "output": "\n\n".join(paragraphs),
+        "sources": [f"https://example.com/source-{i}" for i in range(50)],
+    })
+    return f"Here is the output:\n```json\n{payload}\n```\nLet me know if you need anything else."
+
+
+def make_conversation(iterations: int, seed: int = 0):
+    from deep_researcher.iterative_research import Conversation
+
+    rng = random.Random(seed)
+    conversation = Conversation()
+    for _ in range(iterations):
+        # Filled in the same way as by the research loop
+        conversation.add_iteration()
+        conversation.set_latest_thought(words(rng, 80))
+        conversation.set_latest_gap(words(rng, 15))
+        conversation.set_latest_tool_calls([f"[Agent] WebSearchAgent [Query] {words(rng, 8)} [Entity] null" for _ in range(3)])
+        conversation.set_latest_findings([words(rng, 300) for _ in range(3)])
+    return conversation
+
+
+def make_report_references(count: int, seed: int = 0) -> Tuple[List[str], str, List[str]]:
+    """Get the references of a report, and a new section that cites a mix of those sources and new ones"""
+    rng = random.Random(seed)
+    all_references = [f"[{i + 1}] https://example.com/source-{i}" for i in range(count)]
+    section_urls = [f"https://example.com/source-{rng.randrange(count)}" for _ in range(25)]
+    section_urls += [f"https://example.org/new-source-{i}" for i in range(25)]
+    section_references = [f"[{i + 1}] {url}" for i, url in enumerate(section_urls)]
+    section = "\n\n".join(f"{words(rng, 60)} [{i + 1}]" for i in range(len(section_urls)))
+    return all_references, section, section_references
+
+
+def make_section_markdown(headings: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "\n\n".join(f"{'#' * (1 + i % 3)} {words(rng, 5)}\n{words(rng, 100)}" for i in range(headings))
+
+
+def make_cases() -> Dict[str, Callable[[], object]]:
+    """Build the inputs of each case and return the functions to time"""
+    from deep_researcher.agents.long_writer_agent import reformat_references, reformat_section_headings
+    from deep_researcher.agents.utils.parse_output import find_json_in_string, parse_json_output
+    from deep_researcher.tools.crawl_website import extract_links
+    from deep_researcher.tools.web_search import html_to_text, is_valid_url
+
+    page = make_html(2048)
+    urls = make_urls(10_000)
+    json_output = make_json_output(100)
+    conversation = make_conversation(50)
+    all_references, section, section_references = make_report_references(500)
+    section_markdown = make_section_markdown(200)
+
+    return {
+        "html_to_text (2 MB page)": lambda: html_to_text(page),
+        "extract_links (2 MB page)": lambda: extract_links(page, "https://example.com/start", "example.com"),
+        "is_valid_url (10k URLs)": lambda: [is_valid_url(url) for url in urls],
+        "find_json_in_string (100 KB)": lambda: find_json_in_string(json_output),
+        "parse_json_output (100 KB)": lambda: parse_json_output(json_output),
+        "compile_conversation_history (50 it.)": conversation.compile_conversation_history,
+        "reformat_references (500 refs)": lambda: reformat_references(section, section_references, list(all_references)),
+        "reformat_section_headings (200 headings)": lambda: reformat_section_headings(section_markdown),
+    }
+
+
+def time_case(func: Callable[[], object], rounds: int, min_round_seconds: float = 0.2) -> Tuple[float, float]:
+    """Get the (best, median) seconds per call, calling the function enough times per round to fill min_round_seconds"""
+    number = 1
+    while True:
+        elapsed = timeit.timeit(func, number=number)
+        if elapsed >= min_round_seconds or number >= 1_000_000:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_round_seconds / elapsed) + 1)
+    times = [elapsed / number] + [t / number for t in timeit.repeat(func, number=number, repeat=rounds - 1)]
+    return min(times), statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the pure-Python hot paths")
+    parser.add_argument("--cases", nargs="+", help="Only run the cases whose names start with one of these")
+    parser.add_argument("--rounds", type=int, default=5, help="Number of timed rounds for each case")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown against the baseline")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline results to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Save the results as the new baseline")
+    args = parser.parse_args()
+
+    baseline: Dict[str, Dict[str, float]] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    cases = make_cases()
+    if args.cases:
+        cases = {name: func for name, func in cases.items() if name.startswith(tuple(args.cases))}
+
+    results: Dict[str, Dict[str, float]] = {}
+    regressions = []
+    print(f"{'case':<42} {'best ms':>10} {'median ms':>10} {'x baseline':>11}")
+    for name, func in cases.items():
+        best, median = time_case(func, args.rounds)
+        results[name] = {"best_ms": best * 1000, "median_ms": median * 1000}
+        ratio = results[name]["best_ms"] / baseline[name]["best_ms"] if name in baseline else None
+        print(f"{name:<42} {best * 1000:>10.3f} {median * 1000:>10.3f} {f'{ratio:.2f}' if ratio else '-':>11}")
+        if ratio and ratio > 1 + args.tolerance:
+            regressions.append(f"{name}: {ratio:.2f}x the baseline")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if regressions:
+        print("\nRegressions:\n" + "\n".join(f"- {regression}" for regression in regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark for the cold start time of the package, measured with `python -X importtime` in fresh interpreters.
+
+Three entry points are timed: a bare `import deep_researcher`, the CLI's `--help` and a worker creating a
+DeepResearcher (which imports the agents SDK). The script exits with an error if the median time of an entry point
+exceeds its budget, so it can be used as a check in CI.
+
+Usage:
+    python -m benchmarks.bench_import_time [--runs 5] [--package-budget-ms 50] [--cli-budget-ms 100] [--worker-budget-ms 3000]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+ENTRY_POINTS = {
+    "package": "import deep_researcher",
+    "cli --help": "import sys; sys.argv = ['deep-researcher', '--help']; from deep_researcher.main import cli_entry; cli_entry()",
+    "worker": "from deep_researcher import DeepResearcher; DeepResearcher()",
+}
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Get the cumulative import time in microseconds of each top-level module from -X importtime output"""
+    cumulative: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            cumulative[match.group(4)] = int(match.group(2))
+    return cumulative
+
+
+def time_entry_point(code: str) -> Tuple[float, Dict[str, int]]:
+    """Run the code in a fresh interpreter, returning the wall time in seconds and the import times of top-level modules"""
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY") or "sk-benchmark")
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f"Entry point failed:\n{process.stderr[-2000:]}")
+    return elapsed, parse_importtime(process.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the import time of deep_researcher")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to time for each entry point")
+    parser.add_argument("--package-budget-ms", type=float, default=50, help="Budget for the import time of the package")
+    parser.add_argument("--cli-budget-ms", type=float, default=100, help="Budget for the import time of the CLI (--help)")
+    parser.add_argument("--worker-budget-ms", type=float, default=3000, help="Budget for the import time of a worker")
+    parser.add_argument("--top", type=int, default=5, help="Number of slowest top-level imports to show for each entry point")
+    args = parser.parse_args()
+
+    budgets = {"package": args.package_budget_ms, "cli --help": args.cli_budget_ms, "worker": args.worker_budget_ms}
+    # The interpreter start-up time is subtracted so that the budgets only cover our imports
+    baseline = statistics.median(time_entry_point("pass")[0] for _ in range(args.runs))
+
+    failures: List[str] = []
+    print(f"Interpreter start-up: {baseline * 1000:.0f} ms")
+    print(f"{'entry point':<12} {'median ms':>10} {'budget ms':>10}  slowest imports")
+    for name, code in ENTRY_POINTS.items():
+        runs = [time_entry_point(code) for _ in range(args.runs)]
+        median_ms = max(0.0, statistics.median(elapsed for elapsed, _ in runs) - baseline) * 1000
+        slowest = sorted(runs[-1][1].items(), key=lambda item: item[1], reverse=True)[:args.top]
+        slowest_str = ", ".join(f"{module} {us / 1000:.0f}ms" for module, us in slowest)
+        print(f"{name:<12} {median_ms:>10.0f} {budgets[name]:>10.0f}  {slowest_str}")
+        if median_ms > budgets[name]:
+            failures.append(name)
+
+    if failures:
+        print(f"Over budget: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark for parse_json_output on the kinds of outputs returned by models without structured output support.
+
+Each case is timed against a plain json.loads of the same payload, which is the lower bound for any parser.
+
+Usage:
+    python -m benchmarks.bench_parse_output [--size-kb 100] [--repeat 20]
+"""
+import argparse
+import json
+import random
+import timeit
+from deep_researcher.agents.utils.parse_output import parse_json_output
+
+
+def make_payload(size_kb: int, seed: int = 0) -> dict:
+    """Build a ToolAgentOutput-like object with roughly size_kb kilobytes of JSON"""
+    rng = random.Random(seed)
+    words = ["market", "growth", "{revenue}", "\"quoted\"", "[1]", "report", "company", "analysis", "data", "C:\\path"]
+    paragraphs = []
+    while sum(len(p) for p in paragraphs) < size_kb * 1024:
+        paragraphs.append(' '.join(rng.choice(words) for _ in range(80)))
+    return {
+        "output": '\n\n'.join(paragraphs),
+        "sources": [f"https://example.com/source-{i}" for i in range(50)],
+    }
+
+
+def make_cases(size_kb: int) -> dict:
+    payload = json.dumps(make_payload(size_kb))
+    return {
+        "plain JSON": payload,
+        "code block": f"```json\n{payload}\n```",
+        "surrounded by text": f"Here is the output [1]:\n{payload}\nLet me know if you need anything else.",
+        "trailing commas": payload[:-1] + ",}",
+        "truncated": payload[:len(payload) * 3 // 4],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark parse_json_output")
+    parser.add_argument("--size-kb", type=int, default=100, help="Approximate size of the JSON payload in KB")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of calls to time for each case")
+    args = parser.parse_args()
+
+    payload = json.dumps(make_payload(args.size_kb))
+    baseline = min(timeit.repeat(lambda: json.loads(payload), number=args.repeat, repeat=3)) / args.repeat
+
+    print(f"Payload size: {len(payload) / 1024:.0f} KB, json.loads baseline: {baseline * 1000:.2f} ms")
+    print(f"{'case':<20} {'ms/call':>10} {'x baseline':>12}")
+    for name, output in make_cases(args.size_kb).items():
+        elapsed = min(timeit.repeat(lambda: parse_json_output(output), number=args.repeat, repeat=3)) / args.repeat
+        print(f"{name:<20} {elapsed * 1000:>10.2f} {elapsed / baseline:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
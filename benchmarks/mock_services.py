@@ -0,0 +1,374 @@
+"""
+Local stand-ins for the external services used by the researchers, for benchmarking without live APIs.
+
+A single aiohttp server (run in a background thread with its own event loop) provides:
+- `/v1/chat/completions`: an OpenAI-compatible endpoint that recognizes each agent from its instructions and returns
+  scripted outputs in the format the agent expects (including calls to the web_search tool for the search agent).
+  Each response is delayed by a fixed latency plus the time to generate its output tokens at a given token rate.
+  Streamed requests (`"stream": true`) get server-sent events, with the output spread over the generation time.
+- `/serper/search`: a Serper-shaped search endpoint that returns results from the fixture web.
+- `/web/<page>`: a fixture web of canned HTML pages.
+
+The server counts the requests and bytes sent and received for each kind of endpoint. When it is run as a separate
+process (so that it doesn't compete with the benchmarked code for the GIL), the scenario can be set by posting it to
+`/control/scenario` and the counters are read (and reset) with `/control/counters`.
+
+Usage:
+    python -m benchmarks.mock_services [--port 8765]
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from aiohttp import web
+
+_WORDS = (
+    "market growth revenue analysis battery supply chain production capacity policy regulation adoption pricing "
+    "competition strategy investment research technology performance efficiency demand forecast region customer"
+).split()
+
+
+class MockScenario:
+    """Shape of the research that the mock LLM scripts: number of sections, iterations per section and tools per iteration"""
+
+    def __init__(
+        self,
+        sections: int = 3,
+        iterations: int = 2,
+        fan_out: int = 2,
+        latency_ms: float = 20.0,
+        tokens_per_second: float = 2000.0,
+        output_words: int = 150,
+        results_per_search: int = 5,
+    ):
+        self.sections = sections
+        self.iterations = iterations  # The knowledge gap agent marks the research complete after this many iterations
+        self.fan_out = fan_out  # Number of tool calls selected per iteration
+        self.latency_ms = latency_ms  # Fixed latency of each LLM response
+        self.tokens_per_second = tokens_per_second  # Rate at which output tokens are "generated"
+        self.output_words = output_words  # Length of the text written by the search, writer and long writer agents
+        self.results_per_search = results_per_search
+
+
+class EndpointCounters:
+    def __init__(self):
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+
+class MockServices:
+    """Mock LLM, search API and fixture web served from a background thread"""
+
+    def __init__(self, scenario: Optional[MockScenario] = None, num_pages: int = 50, seed: int = 0, port: int = 0):
+        self.scenario = scenario or MockScenario()
+        self.port = port  # 0 to pick a free port
+        self.pages = make_corpus(num_pages, seed)
+        self.counters: Dict[str, EndpointCounters] = {}
+        self.base_url: Optional[str] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ------- LIFECYCLE -------
+
+    def start(self) -> str:
+        """Start the server on the configured port (a free one by default), returning its base URL"""
+        started = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            app = web.Application(client_max_size=64 * 1024 * 1024)
+            app.router.add_post("/v1/chat/completions", self._chat_completions)
+            app.router.add_post("/serper/search", self._search)
+            app.router.add_get("/web/{page}", self._page)
+            app.router.add_post("/control/scenario", self._set_scenario)
+            app.router.add_get("/control/counters", self._get_counters)
+            self._runner = web.AppRunner(app, access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+            self._loop.run_until_complete(site.start())
+            port = site._server.sockets[0].getsockname()[1]
+            self.base_url = f"http://127.0.0.1:{port}"
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="mock-services", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.base_url
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    def reset_counters(self) -> None:
+        self.counters = {}
+
+    def get_counters(self) -> Dict[str, Dict[str, int]]:
+        return {endpoint: dict(vars(counters)) for endpoint, counters in self.counters.items()}
+
+    async def _set_scenario(self, request: web.Request) -> web.Response:
+        self.scenario = MockScenario(**await request.json())
+        self.reset_counters()
+        return web.json_response({"ok": True})
+
+    async def _get_counters(self, request: web.Request) -> web.Response:
+        counters = self.get_counters()
+        if request.query.get("reset"):
+            self.reset_counters()
+        return web.json_response(counters)
+
+    def _count(self, endpoint: str, bytes_in: int, bytes_out: int) -> None:
+        counters = self.counters.setdefault(endpoint, EndpointCounters())
+        counters.requests += 1
+        counters.bytes_in += bytes_in
+        counters.bytes_out += bytes_out
+
+    # ------- FIXTURE WEB AND SEARCH -------
+
+    async def _page(self, request: web.Request) -> web.Response:
+        html = self.pages.get(request.match_info["page"])
+        if html is None:
+            self._count("web", 0, 0)
+            return web.Response(status=404)
+        self._count("web", 0, len(html))
+        return web.Response(text=html, content_type="text/html")
+
+    async def _search(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        query = json.loads(body).get("q", "")
+        # Pick the pages deterministically from the query so that the same query always finds the same pages
+        rng = random.Random(query)
+        names = rng.sample(sorted(self.pages), min(self.scenario.results_per_search, len(self.pages)))
+        payload = json.dumps({"organic": [
+            {"title": f"Fixture page {name}", "link": f"{self.base_url}/web/{name}", "snippet": f"About {query}"}
+            for name in names
+        ]})
+        self._count("serper", len(body), len(payload))
+        return web.Response(text=payload, content_type="application/json")
+
+    # ------- MOCK LLM -------
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.read()
+        payload = json.loads(body)
+        messages = payload.get("messages", [])
+        content, tool_calls = self._script_response(messages)
+
+        prompt_tokens = sum(len(str(message.get("content") or "")) for message in messages) // 4
+        completion_tokens = max(1, len(content or json.dumps(tool_calls)) // 4)
+        if payload.get("stream"):
+            return await self._stream_chat_completion(request, payload, len(body), content, tool_calls, prompt_tokens, completion_tokens)
+        delay = self.scenario.latency_ms / 1000 + completion_tokens / self.scenario.tokens_per_second
+        await asyncio.sleep(delay)
+
+        message: Dict[str, Any] = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        response = json.dumps({
+            "id": f"chatcmpl-{random.getrandbits(64):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+        self._count("llm", len(body), len(response))
+        return web.Response(text=response, content_type="application/json")
+
+    async def _stream_chat_completion(
+        self,
+        request: web.Request,
+        payload: Dict[str, Any],
+        request_bytes: int,
+        content: Optional[str],
+        tool_calls: Optional[List[Dict[str, Any]]],
+        prompt_tokens: int,
+        completion_tokens: int,
+        num_chunks: int = 20,
+    ) -> web.StreamResponse:
+        """Send a chat completion as server-sent events: the first chunk after the latency, the rest over the generation time"""
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        completion_id = f"chatcmpl-{random.getrandbits(64):x}"
+        sent_bytes = 0
+
+        async def send(choices: List[Dict[str, Any]], **extra: Any) -> None:
+            nonlocal sent_bytes
+            data = json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": payload.get("model", "mock"),
+                "choices": choices,
+                **extra,
+            })
+            event = f"data: {data}\n\n".encode("utf-8")
+            sent_bytes += len(event)
+            await response.write(event)
+
+        await asyncio.sleep(self.scenario.latency_ms / 1000)
+        chunk_delay = completion_tokens / self.scenario.tokens_per_second / num_chunks
+        if tool_calls:
+            await asyncio.sleep(chunk_delay * num_chunks)
+            deltas = [{"role": "assistant", "tool_calls": [{"index": i, **call} for i, call in enumerate(tool_calls)]}]
+        else:
+            content = content or ""
+            size = max(1, -(-len(content) // num_chunks))
+            deltas = [{"role": "assistant", "content": content[i:i + size]} for i in range(0, len(content), size)]
+        for i, delta in enumerate(deltas):
+            if i and not tool_calls:
+                await asyncio.sleep(chunk_delay)
+            await send([{"index": 0, "delta": delta, "finish_reason": None}])
+        await send([{"index": 0, "delta": {}, "finish_reason": "tool_calls" if tool_calls else "stop"}])
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            await send([], usage={
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            })
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        self._count("llm", request_bytes, sent_bytes)
+        return response
+
+    def _script_response(self, messages: List[Dict[str, Any]]):
+        """Get the (content, tool_calls) that the agent with the given messages expects"""
+        system = next((str(m.get("content") or "") for m in messages if m.get("role") == "system"), "").lstrip()
+        user = "\n".join(str(m.get("content") or "") for m in messages if m.get("role") == "user")
+        last = messages[-1] if messages else {}
+        rng = random.Random(user[-200:])
+        scenario = self.scenario
+
+        if system.startswith("You are a research manager"):
+            return json.dumps({
+                "background_context": text(rng, 60),
+                "report_title": "Benchmark Report",
+                "report_outline": [
+                    {"title": f"Section {i + 1}", "key_question": f"What about topic {i + 1} of the query?"}
+                    for i in range(scenario.sections)
+                ],
+            }), None
+
+        if system.startswith("You are a Research State Evaluator"):
+            iteration = int(_field(user, "CURRENT ITERATION NUMBER") or 1)
+            complete = iteration >= scenario.iterations
+            return json.dumps({"research_complete": complete, "outstanding_gaps": [] if complete else [f"Gap {iteration}"]}), None
+
+        if system.startswith("You are an Tool Selector"):
+            question = _field(user, "ORIGINAL QUERY") or "query"
+            gap = _field(user, "KNOWLEDGE GAP TO ADDRESS") or "gap"
+            return json.dumps({"tasks": [
+                {"gap": gap, "agent": "WebSearchAgent", "query": f"{question} {gap} angle {i}"}
+                for i in range(scenario.fan_out)
+            ]}), None
+
+        if system.startswith("You are a research assistant that specializes in retrieving"):
+            if last.get("role") != "tool":
+                query = json.loads(user).get("query", user) if user.startswith("{") else user
+                return None, [{
+                    "id": f"call_{random.getrandbits(32):x}",
+                    "type": "function",
+                    "function": {"name": "web_search", "arguments": json.dumps({"query": query})},
+                }]
+            urls = list(dict.fromkeys(re.findall(r'https?://[^\s"\'\\,]+/web/page-\d+', str(last.get("content")))))
+            return json.dumps({"output": cited_text(rng, scenario.output_words, urls), "sources": urls}), None
+
+        if system.startswith("You are a search result filter"):
+            results = [
+                {"url": url, "title": title, "description": None}
+                for url, title in re.findall(r'"url": "([^"]+)",\s*"title": "([^"]*)"', user)
+            ]
+            return json.dumps({"results_list": results[:scenario.results_per_search]}), None
+
+        if system.startswith("You are a senior researcher"):
+            urls = list(dict.fromkeys(re.findall(r'https?://[^\s)\]]+/web/page-\d+', user)))
+            return cited_text(rng, scenario.output_words, urls), None
+
+        if system.startswith("You are an expert report writer"):
+            title = _field(user, "TITLE OF NEXT SECTION TO WRITE", tagged=True) or "Section"
+            urls = list(dict.fromkeys(re.findall(r'https?://[^\s)\]]+/web/page-\d+', user)))[:5]
+            markdown = f"## {title}\n\n" + text(rng, scenario.output_words) + "".join(f" [{i + 1}]" for i in range(len(urls)))
+            references = [f"[{i + 1}] {url}" for i, url in enumerate(urls)]
+            # The streaming variant of the writer asks for the references first
+            if "StreamedLongWriterOutput(" in system:
+                return json.dumps({"references": references, "next_section_markdown": markdown}), None
+            return json.dumps({"next_section_markdown": markdown, "references": references}), None
+
+        if system.startswith("You are a research expert who proofreads"):
+            if "SECTIONS TO PROOFREAD" in user:
+                return json.dumps({"sections_markdown": "## Section\n\n" + text(rng, scenario.output_words), "references": []}), None
+            return "# Benchmark Report\n\n" + text(rng, scenario.output_words), None
+
+        if system.startswith("You are a web craling agent"):
+            return json.dumps({"output": text(rng, scenario.output_words), "sources": []}), None
+
+        # Thinking agent, report summary agent and anything else that writes plain text
+        return text(rng, 60), None
+
+
+def _field(prompt: str, label: str, tagged: bool = False) -> Optional[str]:
+    """Get the value of a labelled section of a prompt"""
+    pattern = rf"<{label}>\s*(.*?)\s*</{label}>" if tagged else rf"{label}:\s*\n?(.*)"
+    match = re.search(pattern, prompt, flags=re.DOTALL if tagged else 0)
+    return match.group(1).strip() if match else None
+
+
+def text(rng: random.Random, num_words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(num_words)).capitalize() + "."
+
+
+def cited_text(rng: random.Random, num_words: int, urls: List[str]) -> str:
+    """Text with a markdown citation to each of the URLs spread through it"""
+    sentences = [text(rng, max(5, num_words // max(1, len(urls)))) for _ in range(max(1, len(urls)))]
+    return " ".join(
+        f"{sentence[:-1]} [{i + 1}]({urls[i]})." if i < len(urls) else sentence for i, sentence in enumerate(sentences)
+    )
+
+
+def make_corpus(num_pages: int, seed: int = 0, paragraphs: int = 20) -> Dict[str, str]:
+    """Canned HTML pages with navigation, headings and paragraphs of text, as typically seen in search results"""
+    rng = random.Random(seed)
+    pages = {}
+    for i in range(num_pages):
+        body = "\n".join(
+            f"<h2>{text(rng, 4)}</h2><p>{text(rng, 80)}</p><ul><li>{text(rng, 10)}</li><li>{text(rng, 10)}</li></ul>"
+            for _ in range(paragraphs)
+        )
+        pages[f"page-{i}"] = (
+            f"<html><head><title>Fixture page {i}</title><script>var x = {i};</script></head><body>"
+            f"<nav><a href='/web/page-{(i + 1) % num_pages}'>Next</a></nav><h1>Fixture page {i}</h1>{body}</body></html>"
+        )
+    return pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the mock LLM, search API and fixture web")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (0 to pick a free port)")
+    parser.add_argument("--pages", type=int, default=50, help="Number of pages in the fixture web")
+    args = parser.parse_args()
+
+    services = MockServices(num_pages=args.pages, port=args.port)
+    print(services.start(), flush=True)
+    try:
+        services._thread.join()
+    except KeyboardInterrupt:
+        services.stop()
+
+
+if __name__ == "__main__":
+    main()
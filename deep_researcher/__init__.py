@@ -1,5 +1,26 @@
-from .deep_research import DeepResearcher
-from .iterative_research import IterativeResearcher
-from .agents.baseclass import ResearchRunner
+from typing import TYPE_CHECKING
 
-__all__ = ["DeepResearcher", "IterativeResearcher", "ResearchRunner"]
+if TYPE_CHECKING:
+    from .deep_research import DeepResearcher
+    from .iterative_research import IterativeResearcher
+    from .agents.baseclass import ResearchRunner
+    from .llm_client import LLMConfig
+
+__all__ = ["DeepResearcher", "IterativeResearcher", "ResearchRunner", "LLMConfig"]
+
+# The public classes are imported on first access, so that importing the package (e.g. for the CLI) stays fast
+_LAZY_IMPORTS = {
+    "DeepResearcher": ".deep_research",
+    "IterativeResearcher": ".iterative_research",
+    "ResearchRunner": ".agents.baseclass",
+    "LLMConfig": ".llm_client",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
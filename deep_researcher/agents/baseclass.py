@@ -1,6 +1,20 @@
-from typing import Any, Callable, Optional
-from agents import Agent, Runner, RunResult
+import time
+from typing import Any, Awaitable, Callable, Optional
+from agents import Agent, ModelSettings, Runner, RunResult
+from openai.types.responses import ResponseTextDeltaEvent
 from agents.run_context import TContext
+from ..budget import record_llm_calls
+from ..events import emit_log
+from ..llm_client import get_base_url, model_supports_structured_output
+from ..resilience import CircuitOpenError, call_with_retries, get_circuit_breaker, is_retryable_error, llm_call_slot
+from ..stats import record_llm_call
+from .utils.parse_output import OutputParserError, create_type_parser
+from .utils.prompts import get_output_tokens, get_token_usage
+
+REPROMPT_MESSAGE = (
+    "Your previous response could not be parsed: {error}\n"
+    "Respond again following the output format from your instructions exactly. Only output valid JSON."
+)
 
 
 class ResearchAgent(Agent[TContext]):
@@ -17,11 +31,15 @@ class ResearchAgent(Agent[TContext]):
         self,
         *args,
         output_parser: Optional[Callable[[str], Any]] = None,
+        backup_model: Optional[Any] = None,
         **kwargs
     ):
         # The output_parser is a function that only takes effect if output_type is not specified
         self.output_parser = output_parser
 
+        # The backup_model is used by the ResearchRunner if the provider of the agent's model is failing
+        self.backup_model = backup_model
+
         # If both are specified, we raise an error - they can't be used together
         if self.output_parser and kwargs.get('output_type'):
             raise ValueError("Cannot specify both output_parser and output_type")
@@ -50,18 +68,155 @@ class ResearchRunner(Runner):
     """
     
     @classmethod
-    async def run(cls, *args, **kwargs) -> RunResult:
+    async def run(cls, starting_agent: Agent, input: Any, **kwargs) -> RunResult:
         """
         Run the agent and process its output with the custom parser if applicable.
+
+        Transient provider errors are retried with backoff. If the provider of the agent's model is failing and a
+        backup model is configured, the agent is re-run with the backup model instead. If the output of a ResearchAgent
+        cannot be parsed, the agent is re-prompted once with the parser error.
+        """
+        try:
+            return await cls._run_with_failover(starting_agent, input, **kwargs)
+        except OutputParserError as e:
+            return await cls._run_with_failover(starting_agent, _reprompt_input(input, e), **kwargs)
+
+    @classmethod
+    async def run_streamed_text(
+        cls,
+        starting_agent: Agent,
+        input: Any,
+        on_text_delta: Callable[[str], Awaitable[None]],
+        **kwargs
+    ) -> RunResult:
         """
-        # Call the original run method
-        result = await Runner.run(*args, **kwargs)
-        
-        # Get the starting agent
-        starting_agent = kwargs.get('starting_agent') or args[0]
-        
-        # If the starting agent is of type ResearchAgent, parse the output
-        if isinstance(starting_agent, ResearchAgent):
-            return await starting_agent.parse_output(result)
-        
-        return result
\ No newline at end of file
+        Run the agent with the streamed run API, passing each piece of its output text to on_text_delta as it is
+        generated, and return the result once the run has finished (with its output parsed as in `run`).
+
+        Retries and failover to the backup model only happen while no text has been passed on, since the text of a
+        failed attempt can't be taken back. If the output can't be parsed, the agent is re-prompted without streaming
+        (the caller already has the text of the first attempt and can reconcile it with the final output).
+        """
+        try:
+            return await cls._run_with_failover(starting_agent, input, on_text_delta=on_text_delta, **kwargs)
+        except OutputParserError as e:
+            return await cls._run_with_failover(starting_agent, _reprompt_input(input, e), **kwargs)
+
+    @classmethod
+    async def _run_with_failover(
+        cls,
+        agent: Agent,
+        input: Any,
+        on_text_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+        **kwargs
+    ) -> RunResult:
+        """Run the agent with retries, failing over to the backup model while the agent's provider is down"""
+        start_time = time.perf_counter()
+        attempt_start_time = start_time
+        text_delivered = False
+
+        async def attempt(agent: Agent) -> RunResult:
+            nonlocal attempt_start_time
+            # Time spent waiting for a slot under the process-wide limit on LLM calls counts as queueing
+            async with llm_call_slot():
+                attempt_start_time = time.perf_counter()
+                if on_text_delta is None:
+                    return await Runner.run(agent, input, **kwargs)
+                return await stream_attempt(agent)
+
+        async def stream_attempt(agent: Agent) -> RunResult:
+            nonlocal text_delivered
+            result = Runner.run_streamed(_with_stream_usage(agent), input, **kwargs)
+            try:
+                async for event in result.stream_events():
+                    if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                        text_delivered = True
+                        await on_text_delta(event.data.delta)
+            except BaseException:
+                result.cancel()
+                raise
+            return result
+
+        def is_retryable(e: BaseException) -> bool:
+            return is_retryable_error(e) and not text_delivered
+
+        breaker = get_circuit_breaker(_get_provider(agent.model))
+        try:
+            result = await call_with_retries(lambda: attempt(agent), breaker=breaker, is_retryable=is_retryable)
+        except Exception as e:
+            if not (isinstance(e, CircuitOpenError) or is_retryable(e)):
+                raise
+            backup_model = getattr(agent, "backup_model", None)
+            if backup_model is None or backup_model is agent.model:
+                raise
+            message = f"{agent.name} failed on its primary model ({str(e)}), retrying with backup model {backup_model.model}"
+            # Progress goes to the event stream of the run (printed in verbose mode); print it only outside of a run
+            if not emit_log(message):
+                print(message)
+            agent = _with_model(agent, backup_model)
+            result = await call_with_retries(
+                lambda: attempt(agent),
+                breaker=get_circuit_breaker(_get_provider(backup_model)),
+                is_retryable=is_retryable,
+            )
+
+        # Count each model response towards the LLM call budget of the current run (if any)
+        record_llm_calls(len(result.raw_responses))
+        # Record the usage and latency of the call in the stats of the current run (if any)
+        end_time = time.perf_counter()
+        record_llm_call(
+            agent.name,
+            _get_model_name(agent.model),
+            (*get_token_usage(result), get_output_tokens(result)),
+            model_calls=len(result.raw_responses),
+            wall_seconds=end_time - start_time,
+            queue_seconds=attempt_start_time - start_time,
+        )
+
+        # If the agent is of type ResearchAgent, parse the output
+        if isinstance(agent, ResearchAgent):
+            return await agent.parse_output(result)
+        return result
+
+
+def _reprompt_input(input: Any, error: OutputParserError) -> Any:
+    """Add the parser error to the input of an agent, asking it to respond again in the right format"""
+    reprompt = REPROMPT_MESSAGE.format(error=error.message)
+    if isinstance(input, str):
+        return f"{input}\n\n{reprompt}"
+    return list(input) + [{"role": "user", "content": reprompt}]
+
+
+def _with_stream_usage(agent: Agent) -> Agent:
+    """Copy an agent so that streamed responses end with their token usage, which most providers only send on request"""
+    if agent.model_settings.include_usage is not None:
+        return agent
+    streaming_agent = agent.clone(model_settings=agent.model_settings.resolve(ModelSettings(include_usage=True)))
+    if isinstance(agent, ResearchAgent):
+        streaming_agent.output_parser = agent.output_parser
+        streaming_agent.backup_model = agent.backup_model
+    return streaming_agent
+
+
+def _get_provider(model: Any) -> str:
+    """Get a key identifying the provider of a model (used to share circuit breakers across models)"""
+    if hasattr(model, "_client"):
+        return get_base_url(model)
+    return "default"
+
+
+def _get_model_name(model: Any) -> str:
+    """Get the name of a model, which may be a model object or a string"""
+    return getattr(model, "model", None) or str(model)
+
+
+def _with_model(agent: Agent, model: Any) -> Agent:
+    """Copy an agent with a different model, switching to output parsing if the model doesn't support structured output"""
+    fallback_agent = agent.clone(model=model)
+    if isinstance(agent, ResearchAgent):
+        fallback_agent.output_parser = agent.output_parser
+        fallback_agent.backup_model = None
+        if agent.output_type and not model_supports_structured_output(model):
+            fallback_agent.output_type = None
+            fallback_agent.output_parser = create_type_parser(agent.output_type)
+    return fallback_agent
@@ -20,7 +20,7 @@ The Agent then:
 from pydantic import BaseModel, Field
 from typing import List
 from .baseclass import ResearchAgent
-from ..llm_client import fast_model, model_supports_structured_output
+from ..llm_client import LLMConfig, get_default_config, model_supports_structured_output
 from datetime import datetime
 from .utils.parse_output import create_type_parser
 
@@ -30,7 +30,8 @@ class KnowledgeGapOutput(BaseModel):
     outstanding_gaps: List[str] = Field(description="List of knowledge gaps that still need to be addressed")
 
 
-INSTRUCTIONS = f"""
+def build_instructions() -> str:
+    return f"""
 You are a Research State Evaluator. Today's date is {datetime.now().strftime("%Y-%m-%d")}.
 Your job is to critically analyze the current state of a research report, 
 identify what knowledge gaps still exist and determine the best next step to take.
@@ -50,12 +51,23 @@ Only output JSON and follow the JSON schema below. Do not output anything else.
 {KnowledgeGapOutput.model_json_schema()}
 """
 
-selected_model = fast_model
 
-knowledge_gap_agent = ResearchAgent(
-    name="KnowledgeGapAgent",
-    instructions=INSTRUCTIONS,
-    model=selected_model,
-    output_type=KnowledgeGapOutput if model_supports_structured_output(selected_model) else None,
-    output_parser=create_type_parser(KnowledgeGapOutput) if not model_supports_structured_output(selected_model) else None
-)
\ No newline at end of file
+def init_knowledge_gap_agent(config: LLMConfig) -> ResearchAgent:
+    selected_model = config.fast_model
+
+    return ResearchAgent(
+        name="KnowledgeGapAgent",
+        instructions=build_instructions(),
+        model=selected_model,
+        output_type=KnowledgeGapOutput if model_supports_structured_output(selected_model) else None,
+        output_parser=create_type_parser(KnowledgeGapOutput) if not model_supports_structured_output(selected_model) else None,
+        backup_model=config.backup_model
+    )
+
+
+def __getattr__(name: str):
+    if name == "knowledge_gap_agent":
+        agent = init_knowledge_gap_agent(get_default_config())
+        globals()[name] = agent
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
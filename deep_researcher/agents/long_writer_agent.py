@@ -21,26 +21,97 @@ The Agent then:
 4. Returns the updated draft of the new section along with references/citations
 """
 from .baseclass import ResearchAgent, ResearchRunner
-from ..llm_client import fast_model, model_supports_structured_output
+from ..llm_client import LLMConfig, get_default_config, model_supports_structured_output
 from .utils.parse_output import create_type_parser
+from .utils.citations import CitationIndex
+from .utils.prompts import estimate_tokens
 from datetime import datetime
 from pydantic import BaseModel, Field
 from .proofreader_agent import ReportDraft
-from typing import List, Tuple, Dict
+from ..events import ReportChunkEvent, emit, emit_log
+from typing import Awaitable, Callable, Dict, List, Tuple, Optional
+import asyncio
+import json
 import re
 
 
+DEFAULT_CONTEXT_TOKENS = 6000  # Default limit on the size of the report context sent when writing each section
+
+
 class LongWriterOutput(BaseModel):
     next_section_markdown: str = Field(description="The final draft of the next section in markdown format")
     references: List[str] = Field(description="A list of URLs and their corresponding reference numbers for the section")
 
 
-INSTRUCTIONS = f"""
+class StreamedLongWriterOutput(BaseModel):
+    """LongWriterOutput with the references first, so that citations can be renumbered while the section is streamed"""
+    references: List[str] = Field(description="A list of URLs and their corresponding reference numbers for the section")
+    next_section_markdown: str = Field(description="The final draft of the next section in markdown format")
+
+
+class RollingReportContext:
+    """
+    Bounded view of the report written so far, which is sent to the LongWriterAgent in place of the full draft.
+
+    The context is made up of the title and table of contents, a compact digest of each earlier section (computed once
+    when the section is added) and the previous section in full. If this exceeds max_tokens, the previous section is cut
+    down to the part closest to the next section and the digests of the oldest sections are left out. Prompt size stays
+    roughly constant per section, rather than growing with the length of the report.
+    """
+
+    def __init__(self, report_header: str, max_tokens: int = DEFAULT_CONTEXT_TOKENS, digest_words: int = 80):
+        self.report_header = report_header
+        self.max_tokens = max_tokens
+        self.digest_words = digest_words
+        self.digests: List[str] = []  # Digests of all sections before the previous section
+        self.previous_section: str = ""
+        self.previous_digest: str = ""
+
+    def add_section(self, section_title: str, section_markdown: str) -> None:
+        """Add a finalized section, moving the section before it into the digests"""
+        if self.previous_section:
+            self.digests.append(self.previous_digest)
+        self.previous_section = section_markdown
+        self.previous_digest = f"[Summary of section: {section_title}]\n{create_section_digest(section_markdown, self.digest_words)}"
+
+    def render(self) -> str:
+        """Render the context within the token limit"""
+        remaining_tokens = self.max_tokens - estimate_tokens(self.report_header)
+
+        previous_section = self.previous_section
+        if estimate_tokens(previous_section) > max(remaining_tokens, 0):
+            keep_characters = max(remaining_tokens, 0) * 4
+            previous_section = "..." + previous_section[len(previous_section) - keep_characters:]
+        remaining_tokens -= estimate_tokens(previous_section)
+
+        # Keep the digests of the most recent sections that fit in the remaining space
+        digests = []
+        for digest in reversed(self.digests):
+            if estimate_tokens(digest) > remaining_tokens:
+                break
+            digests.insert(0, digest)
+            remaining_tokens -= estimate_tokens(digest)
+
+        parts = [self.report_header.rstrip("\n")]
+        if len(digests) < len(self.digests):
+            parts.append(f"[{len(self.digests) - len(digests)} earlier sections omitted]")
+        parts.extend(digests)
+        if previous_section:
+            parts.append(previous_section)
+        return "\n\n".join(parts) + "\n\n"
+
+
+def build_instructions(references_first: bool = False) -> str:
+    output_model = StreamedLongWriterOutput if references_first else LongWriterOutput
+    markdown_example = 'next_section_markdown="The company specializes in IT consulting [1](https://example.com/first-source-url). It operates in the software services market which is expected to grow at 10% per year [2](https://example.com/second-source-url)."'
+    references_example = 'references=["[1] https://example.com/first-source-url", "[2] https://example.com/second-source-url"]'
+    example_fields = [references_example, markdown_example] if references_first else [markdown_example, references_example]
+    return f"""
 You are an expert report writer tasked with iteratively writing each section of a report. 
 Today's date is {datetime.now().strftime('%Y-%m-%d')}.
 You will be provided with:
 1. The original research query
-3. A final draft of the report containing the table of contents and all sections written up until this point (in the first iteration there will be no sections written yet)
+3. A final draft of the report containing the table of contents and all sections written up until this point (in the first iteration there will be no sections written yet). In long reports the earlier sections may be shortened to summaries, and if sections are being written separately you will instead be given the table of contents and summaries of the surrounding sections
 3. A first draft of the next section of the report to be written
 
 OBJECTIVE:
@@ -52,9 +123,9 @@ The citations should be in numerical order, written in numbered square brackets
 Separately, a list of all URLs and their corresponding reference numbers will be included at the end of the report.
 Follow the example below for fomartting.
 
-LongWriterOutput(
-    next_section_markdown="The company specializes in IT consulting [1](https://example.com/first-source-url). It operates in the software services market which is expected to grow at 10% per year [2](https://example.com/second-source-url).",
-    references=["[1] https://example.com/first-source-url", "[2] https://example.com/second-source-url"]
+{output_model.__name__}(
+    {example_fields[0]},
+    {example_fields[1]}
 )
 
 GUIDELINES:
@@ -65,18 +136,31 @@ GUIDELINES:
 - Do not include a title for the reference section, just a list of numbered references
 
 Only output JSON. Follow the JSON schema below. Do not output anything else. I will be parsing this with Pydantic so output valid JSON only:
-{LongWriterOutput.model_json_schema()}
+{output_model.model_json_schema()}
 """
 
-selected_model = fast_model
 
-long_writer_agent = ResearchAgent(
-    name="LongWriterAgent",
-    instructions=INSTRUCTIONS,
-    model=selected_model,
-    output_type=LongWriterOutput if model_supports_structured_output(selected_model) else None,
-    output_parser=create_type_parser(LongWriterOutput) if not model_supports_structured_output(selected_model) else None
-)
+def init_long_writer_agent(config: LLMConfig, references_first: bool = False) -> ResearchAgent:
+    """Create the long writer agent; with references_first it outputs a StreamedLongWriterOutput for streamed writing"""
+    selected_model = config.fast_model
+    output_model = StreamedLongWriterOutput if references_first else LongWriterOutput
+
+    return ResearchAgent(
+        name="LongWriterAgent",
+        instructions=build_instructions(references_first),
+        model=selected_model,
+        output_type=output_model if model_supports_structured_output(selected_model) else None,
+        output_parser=create_type_parser(output_model) if not model_supports_structured_output(selected_model) else None,
+        backup_model=config.backup_model
+    )
+
+
+def __getattr__(name: str):
+    if name == "long_writer_agent":
+        agent = init_long_writer_agent(get_default_config())
+        globals()[name] = agent
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 async def write_next_section(
@@ -84,10 +168,62 @@ async def write_next_section(
     report_draft: str,
     next_section_title: str,
     next_section_draft: str,
+    agent: Optional[ResearchAgent] = None,
 ) -> LongWriterOutput:
     """Write the next section of the report"""
+    result = await ResearchRunner.run(
+        agent or init_long_writer_agent(get_default_config()),
+        _build_section_message(original_query, report_draft, next_section_title, next_section_draft),
+    )
+
+    return result.final_output_as(LongWriterOutput)
+
 
-    user_message = f"""
+async def write_next_section_streamed(
+    original_query: str,
+    report_draft: str,
+    next_section_title: str,
+    next_section_draft: str,
+    citation_index: CitationIndex,
+    on_text: Callable[[str], Awaitable[None]],
+    agent: Optional[ResearchAgent] = None,
+) -> Tuple[LongWriterOutput, str]:
+    """
+    Write the next section of the report with a streamed run, passing the section to on_text as it is generated, with
+    its references renumbered by the citation_index and its headings rebased as in add_section_to_report. Returns the
+    output of the writer and the formatted section, which on_text has been given in full by the time this returns.
+
+    The agent should be created with init_long_writer_agent(config, references_first=True), so that the references
+    come before the text and citations can be renumbered straight away (otherwise text from the first citation onward
+    is held back until the references arrive).
+    """
+    formatter = StreamedSectionFormatter(citation_index)
+
+    async def on_text_delta(delta: str) -> None:
+        text = formatter.feed(delta)
+        if text:
+            await on_text(text)
+
+    result = await ResearchRunner.run_streamed_text(
+        agent or init_long_writer_agent(get_default_config(), references_first=True),
+        _build_section_message(original_query, report_draft, next_section_title, next_section_draft),
+        on_text_delta,
+    )
+    output = LongWriterOutput.model_validate(result.final_output.model_dump())
+    remainder, section_markdown = formatter.finish(output)
+    if remainder is None:
+        # The parsed output doesn't match what was streamed (e.g. the writer was re-prompted), so the stream diverges
+        # from the report here - the report itself uses the parsed output
+        message = f"Streamed text of section '{next_section_title}' does not match the final output of the writer"
+        if not emit_log(message):
+            print(message)
+    elif remainder:
+        await on_text(remainder)
+    return output, section_markdown
+
+
+def _build_section_message(original_query: str, report_draft: str, next_section_title: str, next_section_draft: str) -> str:
+    return f"""
     <ORIGINAL QUERY>
     {original_query}
     </ORIGINAL QUERY>
@@ -105,39 +241,396 @@ async def write_next_section(
     </DRAFT OF NEXT SECTION>
     """
 
-    result = await ResearchRunner.run(
-        long_writer_agent,
-        user_message,
-    )
-
-    return result.final_output_as(LongWriterOutput)
-
 
 async def write_report(
     original_query: str,
     report_title: str,
     report_draft: ReportDraft,
+    config: Optional[LLMConfig] = None,
+    parallel: bool = False,
+    max_context_tokens: Optional[int] = DEFAULT_CONTEXT_TOKENS,
+    citation_index: Optional[CitationIndex] = None,
+    written_sections: Optional[Dict[int, LongWriterOutput]] = None,
+    on_section_written: Optional[Callable[[], None]] = None,
+    stream: bool = False,
 ) -> str:
-    """Write the final report by iteratively writing each section"""
+    """
+    Write the final report by iteratively writing each section (or by writing all sections at once if parallel is set).
+    With stream set, sequentially written sections are emitted to the event stream as the writer generates them.
+    """
+    section_titles = [section.section_title for section in report_draft.sections]
+    section_drafts = [_completed(section.section_content) for section in report_draft.sections]
+    if parallel:
+        return await write_report_in_parallel(
+            original_query,
+            report_title,
+            section_titles,
+            section_drafts,
+            config=config,
+            citation_index=citation_index,
+            written_sections=written_sections,
+            on_section_written=on_section_written,
+        )
+    return await write_report_as_sections_complete(
+        original_query,
+        report_title,
+        section_titles,
+        section_drafts,
+        config=config,
+        max_context_tokens=max_context_tokens,
+        citation_index=citation_index,
+        written_sections=written_sections,
+        on_section_written=on_section_written,
+        stream=stream,
+    )
+
+
+async def write_report_as_sections_complete(
+    original_query: str,
+    report_title: str,
+    section_titles: List[str],
+    section_drafts: List[Awaitable[str]],
+    config: Optional[LLMConfig] = None,
+    max_context_tokens: Optional[int] = DEFAULT_CONTEXT_TOKENS,
+    citation_index: Optional[CitationIndex] = None,
+    written_sections: Optional[Dict[int, LongWriterOutput]] = None,
+    on_section_written: Optional[Callable[[], None]] = None,
+    stream: bool = False,
+) -> str:
+    """
+    Write the final report by iteratively writing each section, where the draft of each section may still be in progress
+    (e.g. a task running the research loop for the section). Each section is written as soon as its own draft and all of
+    the sections before it are done, so writing overlaps with the research of the later sections. The sections are still
+    written in order, so the output (including the numbering of references) is the same as for write_report.
+
+    Each section is given a RollingReportContext of the report so far that is limited to max_context_tokens, or the
+    full report so far if max_context_tokens is None. References are numbered with the citation_index, which can be
+    given the sources retrieved during the research so that citations of other URLs are flagged.
+
+    written_sections maps the index of each section to its LongWriterOutput. Sections that are already in it (e.g.
+    from a checkpoint of an interrupted run) are not written again, and each newly written section is added to it
+    before on_section_written is called.
+
+    The report is emitted to the event stream of the run (if any) as it is built: first the header, then each section
+    once its references are numbered, then the references. With stream set, each section is instead emitted piece by
+    piece while the writer generates it (see write_next_section_streamed).
+    """
+    config = config or get_default_config()
+    # The streamed writer outputs its references first, so that citations can be renumbered as the text arrives
+    agent = init_long_writer_agent(config, references_first=True) if stream else init_long_writer_agent(config)
 
     # Initialize the final draft of the report with the title and table of contents
-    final_draft = f"# {report_title}\n\n" + "## Table of Contents\n\n" + "\n".join([f"{i+1}. {section.section_title}" for i, section in enumerate(report_draft.sections)]) + "\n\n"
-    all_references = []
-
-    for section in report_draft.sections:
-        # Produce the final draft of each section and add it to the report with corresponding references
-        next_section_draft = await write_next_section(original_query, final_draft, section.section_title, section.section_content)
-        section_markdown, all_references = reformat_references(
-            next_section_draft.next_section_markdown, 
-            next_section_draft.references,
-            all_references
-        )
-        section_markdown = reformat_section_headings(section_markdown)
-        final_draft += section_markdown + '\n\n'
+    final_draft = build_report_header(report_title, section_titles)
+    await emit(ReportChunkEvent(text=final_draft))
+    citation_index = citation_index or CitationIndex()
+    context = RollingReportContext(final_draft, max_context_tokens) if max_context_tokens is not None else None
+
+    written_sections = written_sections if written_sections is not None else {}
+
+    try:
+        for index, (section_title, section_draft) in enumerate(zip(section_titles, section_drafts)):
+            next_section_draft = written_sections.get(index)
+            section_markdown = None  # Set if the section was streamed while it was written
+            if next_section_draft is None:
+                section_content = await section_draft
+
+                # Produce the final draft of each section and add it to the report with corresponding references
+                report_context = context.render() if context else final_draft
+                if stream:
+                    next_section_draft, section_markdown = await write_next_section_streamed(
+                        original_query, report_context, section_title, section_content, citation_index, _emit_report_chunk, agent
+                    )
+                else:
+                    next_section_draft = await write_next_section(original_query, report_context, section_title, section_content, agent)
+                written_sections[index] = next_section_draft
+                if on_section_written:
+                    on_section_written()
+            if section_markdown is None:
+                section_markdown = add_section_to_report("", next_section_draft, citation_index)
+                await emit(ReportChunkEvent(text=section_markdown))
+            final_draft += section_markdown
+            if context:
+                context.add_section(section_title, section_markdown.rstrip("\n"))
+    finally:
+        # Drafts that weren't awaited (sections already written, or after a failure) must not be left pending
+        for section_draft in section_drafts:
+            if asyncio.iscoroutine(section_draft):
+                section_draft.close()
+            elif asyncio.isfuture(section_draft):
+                section_draft.cancel()
 
     # Add the final references to the end of the report
-    final_draft += '## References:\n\n' + '  \n'.join(all_references)
-    return final_draft
+    references = '## References:\n\n' + citation_index.render_references()
+    await emit(ReportChunkEvent(text=references))
+    return final_draft + references
+
+
+async def write_report_in_parallel(
+    original_query: str,
+    report_title: str,
+    section_titles: List[str],
+    section_drafts: List[Awaitable[str]],
+    config: Optional[LLMConfig] = None,
+    citation_index: Optional[CitationIndex] = None,
+    written_sections: Optional[Dict[int, LongWriterOutput]] = None,
+    on_section_written: Optional[Callable[[], None]] = None,
+) -> str:
+    """
+    Write the final report by writing all sections concurrently. Instead of the report written so far, each section is
+    given the table of contents and short digests of the drafts of the sections either side of it, so a section can be
+    written as soon as its own draft and those of its neighbours are done. The sections are merged in document order
+    as they are written, which renumbers and de-duplicates the references in the same way as when writing sequentially. Sections in
+    written_sections are reused as in write_report_as_sections_complete.
+    """
+    agent = init_long_writer_agent(config or get_default_config())
+    report_header = build_report_header(report_title, section_titles)
+
+    # Wrap the drafts in futures, as each draft is awaited by its own section and by its neighbours
+    section_drafts = [asyncio.ensure_future(section_draft) for section_draft in section_drafts]
+
+    written_sections = written_sections if written_sections is not None else {}
+
+    async def write_section(index: int) -> LongWriterOutput:
+        if index in written_sections:
+            return written_sections[index]
+        section_content = await section_drafts[index]
+        neighbours = []
+        for neighbour_index, label in [(index - 1, "PREVIOUS SECTION"), (index + 1, "NEXT SECTION")]:
+            if 0 <= neighbour_index < len(section_drafts):
+                digest = create_section_digest(await section_drafts[neighbour_index])
+                neighbours.append(f"{label} ({section_titles[neighbour_index]}), written separately - summary:\n{digest}")
+        report_context = report_header + "\n\n".join(neighbours)
+        section_output = await write_next_section(original_query, report_context, section_titles[index], section_content, agent)
+        written_sections[index] = section_output
+        if on_section_written:
+            on_section_written()
+        return section_output
+
+    section_outputs = [asyncio.ensure_future(write_section(i)) for i in range(len(section_titles))]
+    final_draft = report_header
+    await emit(ReportChunkEvent(text=final_draft))
+    citation_index = citation_index or CitationIndex()
+    try:
+        # Merge the sections in document order (as soon as each one and those before it are written), so that
+        # references are numbered by their first appearance in the report
+        for section_output in section_outputs:
+            section_start = len(final_draft)
+            final_draft = add_section_to_report(final_draft, await section_output, citation_index)
+            await emit(ReportChunkEvent(text=final_draft[section_start:]))
+    finally:
+        for task in section_outputs + section_drafts:
+            task.cancel()
+
+    references = '## References:\n\n' + citation_index.render_references()
+    await emit(ReportChunkEvent(text=references))
+    return final_draft + references
+
+
+def build_report_header(report_title: str, section_titles: List[str]) -> str:
+    """Build the start of the report with the title and table of contents"""
+    return f"# {report_title}\n\n" + "## Table of Contents\n\n" + "\n".join([f"{i+1}. {section_title}" for i, section_title in enumerate(section_titles)]) + "\n\n"
+
+
+def add_section_to_report(final_draft: str, section_output: LongWriterOutput, citation_index: CitationIndex) -> str:
+    """Add a written section to the report, renumbering its references to follow on from those of earlier sections"""
+    section_markdown = citation_index.add_section(section_output.next_section_markdown, section_output.references)
+    section_markdown = reformat_section_headings(section_markdown)
+    return final_draft + section_markdown + '\n\n'
+
+
+class StreamedSectionFormatter:
+    """
+    Formats a section of the report while the long writer is still generating it, giving the same text as
+    add_section_to_report would for the finished output.
+
+    The writer's raw output is JSON, so the text of the next_section_markdown string is decoded as it arrives (holding
+    back escape sequences that are split across deltas). Decoded text is passed on once it can be formatted: citations
+    are renumbered once the references of the section have been parsed, a citation split across deltas is held back
+    until it is complete, and lines starting with '#' are held back until they are complete so that headings can be
+    rebased to level 2 (by the level of the first heading in the section, as in reformat_section_headings).
+    """
+
+    _MARKDOWN_KEY = re.compile(r'"next_section_markdown"\s*:\s*"')
+    _REFERENCES_KEY = re.compile(r'"references"\s*:\s*(?=\[)')
+
+    def __init__(self, citation_index: CitationIndex):
+        self.citation_index = citation_index
+        self.raw: str = ""  # Raw output of the writer so far
+        self.markdown_start: Optional[int] = None  # Position in raw of the start of the next_section_markdown string
+        self.markdown_end: Optional[int] = None  # Position in raw of the closing quote of the string, once it has arrived
+        self.decoded_until: Optional[int] = None  # Position in raw up to which the string has been decoded
+        self.pending: str = ""  # Decoded text that hasn't been passed on yet
+        self.references: Optional[List[str]] = None
+        self.numbers: Optional[Dict[int, int]] = None  # Section reference number -> report reference number
+        self.heading_adjustment: Optional[int] = None
+        self.at_line_start: bool = True
+        self.formatted: str = ""  # Formatted text passed on so far
+        self.failed: bool = False  # Set if the output couldn't be decoded, leaving the rest of the section to finish()
+
+    def feed(self, delta: str) -> str:
+        """Add the next piece of the writer's raw output, returning the formatted text that is now ready (if any)"""
+        if self.failed:
+            return ""
+        self.raw += delta
+        try:
+            self._find_references()
+            self._decode_markdown()
+        except ValueError:
+            self.failed = True
+            return ""
+        text = self._format_pending()
+        self.formatted += text
+        return text
+
+    def finish(self, output: LongWriterOutput) -> Tuple[Optional[str], str]:
+        """
+        Format the final output of the writer, returning the text still to be passed on and the formatted section
+        (which ends with a blank line, as in add_section_to_report). The text still to be passed on is None if the
+        text passed on so far isn't the start of the formatted section.
+        """
+        if self.numbers is not None and self.references == output.references:
+            numbers = self.numbers
+        else:
+            numbers = self.citation_index.number_section_references(output.references)
+        section_markdown = self.citation_index.renumber_citations(output.next_section_markdown, numbers)
+        section_markdown = reformat_section_headings(section_markdown) + '\n\n'
+        if not section_markdown.startswith(self.formatted):
+            return None, section_markdown
+        return section_markdown[len(self.formatted):], section_markdown
+
+    def _find_references(self) -> None:
+        if self.references is not None:
+            return
+        for match in self._REFERENCES_KEY.finditer(self.raw):
+            inside_markdown = self.markdown_start is not None and match.start() >= self.markdown_start and (
+                self.markdown_end is None or match.start() < self.markdown_end
+            )
+            if inside_markdown:
+                continue
+            try:
+                references, _ = json.JSONDecoder(strict=False).raw_decode(self.raw, match.end())
+            except json.JSONDecodeError:
+                return  # The list hasn't been fully generated yet
+            self.references = [str(reference) for reference in references]
+            self.numbers = self.citation_index.number_section_references(self.references)
+            return
+
+    def _decode_markdown(self) -> None:
+        if self.markdown_end is not None:
+            return
+        if self.markdown_start is None:
+            match = self._MARKDOWN_KEY.search(self.raw)
+            if not match:
+                return
+            self.markdown_start = self.decoded_until = match.end()
+
+        # Find the end of the part of the string that can be decoded, leaving out an escape sequence that is incomplete
+        position = self.decoded_until
+        end = len(self.raw)
+        while position < end:
+            character = self.raw[position]
+            if character == '"':
+                self.markdown_end = position
+                break
+            if character != '\\':
+                position += 1
+                continue
+            if position + 1 >= end:
+                break
+            if self.raw[position + 1] != 'u':
+                position += 2
+                continue
+            if position + 6 > end:
+                break
+            if 0xD800 <= int(self.raw[position + 2:position + 6], 16) <= 0xDBFF:
+                # A high surrogate is decoded together with the low surrogate that follows it
+                if position + 12 > end:
+                    break
+                if self.raw[position + 6:position + 8] == '\\u':
+                    position += 6
+            position += 6
+        self.pending += json.loads('"' + self.raw[self.decoded_until:position] + '"', strict=False)
+        self.decoded_until = position
+
+    def _format_pending(self) -> str:
+        parts = []
+        string_complete = self.markdown_end is not None
+        while self.pending:
+            newline = self.pending.find('\n')
+            line_complete = newline != -1 or string_complete
+            text = self.pending[:newline + 1] if newline != -1 else self.pending
+
+            if self.at_line_start and text.startswith('#'):
+                # A line that may be a heading is formatted as a whole
+                if not line_complete or (self.numbers is None and '[' in text):
+                    break
+                parts.append(self._format_line(text))
+                self.pending = self.pending[len(text):]
+                self.at_line_start = text.endswith('\n')
+                continue
+
+            cut = len(text)
+            if not line_complete:
+                # Hold back a citation that may still be in progress
+                open_bracket = text.rfind('[')
+                if open_bracket != -1 and ']' not in text[open_bracket:]:
+                    cut = open_bracket
+            if self.numbers is None and '[' in text[:cut]:
+                cut = text.index('[')
+            if cut == 0:
+                break
+            segment = text[:cut]
+            parts.append(self.citation_index.renumber_citations(segment, self.numbers) if self.numbers is not None else segment)
+            self.pending = self.pending[cut:]
+            self.at_line_start = segment.endswith('\n')
+        return ''.join(parts)
+
+    def _format_line(self, line: str) -> str:
+        """Format a whole line, rebasing it if it's a heading"""
+        if self.numbers is not None:
+            line = self.citation_index.renumber_citations(line, self.numbers)
+        if self.heading_adjustment is None:
+            first_heading_match = re.match(r'(#+)\s', line)
+            if not first_heading_match:
+                return line
+            self.heading_adjustment = 2 - len(first_heading_match.group(1))
+
+        def adjust_heading_level(match):
+            new_level = max(2, len(match.group(1)) + self.heading_adjustment)
+            return '#' * new_level + ' ' + match.group(2)
+
+        return re.sub(r'^(#+)\s(.+)$', adjust_heading_level, line, flags=re.MULTILINE)
+
+
+async def _emit_report_chunk(text: str) -> None:
+    await emit(ReportChunkEvent(text=text))
+
+
+def create_section_digest(section_markdown: str, max_words: int = 80) -> str:
+    """
+    Create a short digest of a section without an LLM call: the headings it covers followed by the opening words of its
+    text, with citations removed.
+    """
+    headings = []
+    body_lines = []
+    for line in section_markdown.splitlines():
+        heading = re.match(r'^#+\s+(.+)$', line.strip())
+        if heading:
+            headings.append(heading.group(1).strip())
+        elif line.strip():
+            body_lines.append(line.strip())
+
+    body = re.sub(r'\[\d+\](\([^)]*\))?', '', ' '.join(body_lines))
+    words = body.split()
+    digest = ' '.join(words[:max_words]) + (' ...' if len(words) > max_words else '')
+    if headings:
+        digest = f"Covers: {'; '.join(headings)}\n{digest}"
+    return digest
+
+
+async def _completed(value: str) -> str:
+    """Wrap a finished section draft so it can be passed to write_report_as_sections_complete"""
+    return value
 
 
 def reformat_references(
@@ -155,46 +648,15 @@ def reformat_references(
     It returns:
     1. The updated markdown content of the new section with the references re-numbered and de-duplicated, such that they increment from the previous references
     2. The updated list of references for the full report, to include the new section's references
-    """
-    def convert_ref_list_to_map(ref_list: List[str]) -> Dict[str, str]:
-        ref_map = {}
-        for ref in ref_list:
-            try:
-                ref_num = int(ref.split(']')[0].strip('['))
-                url = ref.split(']', 1)[1].strip()
-                ref_map[url] = ref_num
-            except ValueError:
-                print(f"Invalid reference format: {ref}")
-                continue
-        return ref_map
-
-    section_ref_map = convert_ref_list_to_map(section_references)
-    report_ref_map = convert_ref_list_to_map(all_references)
-    section_to_report_ref_map = {}
-
-    report_urls = set(report_ref_map.keys())
-    ref_count = max(report_ref_map.values() or [0])
-    for url, section_ref_num in section_ref_map.items():
-        if url in report_urls:
-            section_to_report_ref_map[section_ref_num] = report_ref_map[url]
-        else:
-            # If the reference is not in the report, add it to the report
-            ref_count += 1
-            section_to_report_ref_map[section_ref_num] = ref_count
-            all_references.append(f"[{ref_count}] {url}")
-
-    def replace_reference(match):
-        # Extract the reference number from the match
-        ref_num = int(match.group(1))
-        # Look up the new reference number
-        mapped_ref_num = section_to_report_ref_map.get(ref_num)
-        if mapped_ref_num:
-            return f'[{mapped_ref_num}]'
-        return ''
-    
-    # Replace all references in a single pass using a replacement function
-    section_markdown = re.sub(r'\[(\d+)\]', replace_reference, section_markdown)
 
+    This re-parses all prior references on every call - when adding many sections, use a CitationIndex directly instead.
+    """
+    citation_index = CitationIndex.from_references(all_references)
+    previous_last_number = citation_index.last_number
+    section_markdown = citation_index.add_section(section_markdown, section_references)
+    all_references.extend(
+        f"[{number}] {citation_index.urls[number]}" for number in sorted(citation_index.urls) if number > previous_last_number
+    )
     return section_markdown, all_references
 
 
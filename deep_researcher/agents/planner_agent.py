@@ -10,17 +10,29 @@ QUERY: <original user query>
 The Agent then outputs a ReportPlan object, which includes:
 1. A summary of initial background context (if needed), based on web searches and/or crawling
 2. An outline of the report that includes a list of section titles and the key question to be addressed in each section
+
+The planner can either run the search and crawl agents itself as tools, or (which is much faster, as it avoids a chain of
+nested agent calls) be given the results of searches and scrapes that were prefetched for the query in a single, tool-less
+call. In the second case the input also includes:
+===========================================================
+SEARCH RESULTS: <scraped pages from a direct search for the query and any websites it mentions>
+===========================================================
 """
+import asyncio
+import re
 
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from .baseclass import ResearchAgent
-from ..llm_client import reasoning_model, model_supports_structured_output
-from .tool_agents.crawl_agent import crawl_agent
-from .tool_agents.search_agent import search_agent
+from ..events import emit_log
+from ..llm_client import LLMConfig, get_default_config, model_supports_structured_output
+from .tool_agents import init_tool_agents
 from .utils.parse_output import create_type_parser
+from ..tools.web_search import ScrapeResult, WebpageSnippet, get_serper_client, scrape_urls
 from datetime import datetime
 
+_WEBSITE_PATTERN = re.compile(r'\b(?:https?://)?(?:www\.)?((?:[a-z0-9-]+\.)+[a-z]{2,})(/\S*)?', re.IGNORECASE)
+
 
 class ReportPlanSection(BaseModel):
     """A section of the report that needs to be written"""
@@ -35,17 +47,30 @@ class ReportPlan(BaseModel):
     report_title: str = Field(description="The title of the report")
 
 
-INSTRUCTIONS = f"""
+def build_instructions(use_tools: bool = True) -> str:
+    if use_tools:
+        inputs = "- An initial research query"
+        context_task = "Produce 1-2 paragraphs of initial background context (if needed) on the query by running web searches or crawling websites"
+        context_guidelines = """- The background_context should be draw only from web search or crawl results rather than prior knowledge (i.e. it should only be included if you have called tools)
+- For example, if the query is about a company, the background context should include some basic information about what the company does
+- DO NOT do more than 2 tool calls"""
+    else:
+        inputs = "- An initial research query\n- The results of a web search for the query and of scraping any websites mentioned in it"
+        context_task = "Produce 1-2 paragraphs of initial background context (if needed) on the query from the search results you are given"
+        context_guidelines = """- The background_context should be drawn only from the search results you are given rather than prior knowledge (leave it empty if they are not relevant)
+- For example, if the query is about a company, the background context should include some basic information about what the company does"""
+
+    return f"""
 You are a research manager, managing a team of research agents. Today's date is {datetime.now().strftime("%Y-%m-%d")}.
 Given a research query, your job is to produce an initial outline of the report (section titles and key questions),
 as well as some background context. Each section will be assigned to a different researcher in your team who will then
 carry out research on the section.
 
 You will be given:
-- An initial research query
+{inputs}
 
 Your task is to:
-1. Produce 1-2 paragraphs of initial background context (if needed) on the query by running web searches or crawling websites
+1. {context_task}
 2. Produce an outline of the report that includes a list of section titles and the key question to be addressed in each section
 3. Provide a title for the report that will be used as the main heading
 
@@ -54,30 +79,86 @@ Guidelines:
 - The key question for each section should include both the NAME and DOMAIN NAME / WEBSITE (if available and applicable) if it is related to a company, product or similar
 - The background_context should not be more than 2 paragraphs
 - The background_context should be very specific to the query and include any information that is relevant for researchers across all sections of the report
-- The background_context should be draw only from web search or crawl results rather than prior knowledge (i.e. it should only be included if you have called tools)
-- For example, if the query is about a company, the background context should include some basic information about what the company does
-- DO NOT do more than 2 tool calls
+{context_guidelines}
 
 Only output JSON. Follow the JSON schema below. Do not output anything else. I will be parsing this with Pydantic so output valid JSON only:
 {ReportPlan.model_json_schema()}
 """
 
-selected_model = reasoning_model
 
-planner_agent = ResearchAgent(
+def init_planner_agent(config: LLMConfig, use_tools: bool = True) -> ResearchAgent:
+    """Create the planner agent, without the search and crawl tools if it is given prefetched search results instead"""
+    selected_model = config.reasoning_model
+    # The tools wrap the tool agents of the config, which are shared with the research loops
+    tool_agents = config.get_agent("ToolAgents", init_tool_agents) if use_tools else {}
+
+    return ResearchAgent(
         name="PlannerAgent",
-        instructions=INSTRUCTIONS,
-    tools=[
-        search_agent.as_tool(
-            tool_name="web_search",
-            tool_description="Use this tool to search the web for information relevant to the query - provide a query with 3-6 words as input"
+        instructions=build_instructions(use_tools),
+        tools=[
+            tool_agents["WebSearchAgent"].as_tool(
+                tool_name="web_search",
+                tool_description="Use this tool to search the web for information relevant to the query - provide a query with 3-6 words as input"
+            ),
+            tool_agents["SiteCrawlerAgent"].as_tool(
+                tool_name="crawl_website",
+                tool_description="Use this tool to crawl a website for information relevant to the query - provide a starting URL as input"
+            )
+        ] if use_tools else [],
+        model=selected_model,
+        output_type=ReportPlan if model_supports_structured_output(selected_model) else None,
+        output_parser=create_type_parser(ReportPlan) if not model_supports_structured_output(selected_model) else None,
+        backup_model=config.backup_model
+    )
+
+
+async def prefetch_search_results(
+    query: str,
+    config: LLMConfig,
+    max_results: int = 3,
+    max_characters: int = 2000,
+) -> Optional[str]:
+    """
+    Search for the raw query and scrape the top results, concurrently with scraping the home page of any websites that
+    the query mentions. No LLM calls are made (the search results are not filtered for relevance). Returns the scraped
+    pages formatted for the planner, or None if nothing could be fetched, e.g. because the search provider isn't Serper.
+    """
+    async def search() -> List[ScrapeResult]:
+        if config.search_provider == "openai":
+            return []
+        search_results = await get_serper_client(config).search(query, filter_for_relevance=False, max_results=max_results)
+        return await scrape_urls(search_results, session=config.registry.get_http_session())
+
+    websites = list(dict.fromkeys(f"https://{match.group(1).lower()}" for match in _WEBSITE_PATTERN.finditer(query)))
+    results = await asyncio.gather(
+        search(),
+        scrape_urls(
+            [WebpageSnippet(url=url, title=url, description=None) for url in websites],
+            session=config.registry.get_http_session(),
         ),
-        crawl_agent.as_tool(
-            tool_name="crawl_website",
-            tool_description="Use this tool to crawl a website for information relevant to the query - provide a starting URL as input"
-        )
-    ],
-    model=selected_model,
-    output_type=ReportPlan if model_supports_structured_output(selected_model) else None,
-    output_parser=create_type_parser(ReportPlan) if not model_supports_structured_output(selected_model) else None
-)
\ No newline at end of file
+        return_exceptions=True,
+    )
+
+    pages: List[ScrapeResult] = []
+    for result in results:
+        if isinstance(result, Exception):
+            message = f"Error prefetching search results for the report plan: {str(result)}"
+            # Progress goes to the event stream of the run (printed in verbose mode); print it only outside of a run
+            if not emit_log(message):
+                print(message)
+        else:
+            pages.extend(page for page in result if not page.text.startswith("Error fetching content"))
+    if not pages:
+        return None
+    return "\n\n".join(
+        f"URL: {page.url}\nTITLE: {page.title}\nDESCRIPTION: {page.description}\nTEXT: {page.text[:max_characters]}"
+        for page in pages
+    )
+
+
+def __getattr__(name: str):
+    if name == "planner_agent":
+        agent = init_planner_agent(get_default_config())
+        globals()[name] = agent
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
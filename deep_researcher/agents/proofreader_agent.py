@@ -17,7 +17,7 @@ The Agent then outputs the final markdown for the report.
 from pydantic import BaseModel, Field
 from typing import List
 from .baseclass import ResearchAgent
-from ..llm_client import reasoning_model
+from ..llm_client import LLMConfig, get_default_config
 from datetime import datetime
 
 
@@ -32,7 +32,8 @@ class ReportDraft(BaseModel):
     sections: List[ReportDraftSection] = Field(description="List of sections that are in the report")
 
 
-INSTRUCTIONS = f"""
+def build_instructions() -> str:
+    return f"""
 You are a research expert who proofreads and edits research reports.
 Today's date is {datetime.now().strftime("%Y-%m-%d")}.
 
@@ -59,9 +60,19 @@ Guidelines:
 - Include all sources and references that are present in the final report
 """
 
-    
-proofreader_agent = ResearchAgent(
-    name="ProofreaderAgent",
-    instructions=INSTRUCTIONS,
-    model=reasoning_model
-)
\ No newline at end of file
+
+def init_proofreader_agent(config: LLMConfig) -> ResearchAgent:
+    return ResearchAgent(
+        name="ProofreaderAgent",
+        instructions=build_instructions(),
+        model=config.reasoning_model,
+        backup_model=config.backup_model
+    )
+
+
+def __getattr__(name: str):
+    if name == "proofreader_agent":
+        agent = init_proofreader_agent(get_default_config())
+        globals()[name] = agent
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,8 +1,9 @@
 from .baseclass import ResearchAgent
-from ..llm_client import reasoning_model
+from ..llm_client import LLMConfig, get_default_config
 from datetime import datetime
 
-INSTRUCTIONS = f"""
+def build_instructions() -> str:
+    return f"""
 You are a research expert who is managing a research process in iterations. Today's date is {datetime.now().strftime("%Y-%m-%d")}.
 
 You are given:
@@ -28,8 +29,18 @@ Guidelines:
 """
 
 
-thinking_agent = ResearchAgent(
-    name="ThinkingAgent",
-    instructions=INSTRUCTIONS,
-    model=reasoning_model,
-)
+def init_thinking_agent(config: LLMConfig) -> ResearchAgent:
+    return ResearchAgent(
+        name="ThinkingAgent",
+        instructions=build_instructions(),
+        model=config.reasoning_model,
+        backup_model=config.backup_model
+    )
+
+
+def __getattr__(name: str):
+    if name == "thinking_agent":
+        agent = init_thinking_agent(get_default_config())
+        globals()[name] = agent
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,3 +1,4 @@
+from typing import Dict
 from pydantic import BaseModel, Field
 
 class ToolAgentOutput(BaseModel):
@@ -5,10 +6,23 @@ class ToolAgentOutput(BaseModel):
     output: str
     sources: list[str] = Field(default_factory=list)
 
-from .search_agent import search_agent
-from .crawl_agent import crawl_agent
+from ..baseclass import ResearchAgent
+from ...llm_client import LLMConfig, get_default_config
+from .search_agent import init_search_agent
+from .crawl_agent import init_crawl_agent
 
-TOOL_AGENTS = {
-    "WebSearchAgent": search_agent,
-    "SiteCrawlerAgent": crawl_agent,
-}
\ No newline at end of file
+
+def init_tool_agents(config: LLMConfig) -> Dict[str, ResearchAgent]:
+    """Create the tool agents for a given config, keyed by the agent names used by the ToolSelectorAgent"""
+    return {
+        "WebSearchAgent": init_search_agent(config),
+        "SiteCrawlerAgent": init_crawl_agent(config),
+    }
+
+
+def __getattr__(name: str):
+    if name == "TOOL_AGENTS":
+        tool_agents = init_tool_agents(get_default_config())
+        globals()[name] = tool_agents
+        return tool_agents
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
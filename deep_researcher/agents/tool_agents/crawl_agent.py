@@ -10,14 +10,15 @@ The Agent then:
 4. Returns the formatted summary as a string
 """
 
-from ...tools import crawl_website
+from ...tools.crawl_website import create_crawl_website_tool
 from . import ToolAgentOutput
-from ...llm_client import fast_model, model_supports_structured_output
+from ...llm_client import LLMConfig, get_default_config, model_supports_structured_output
 from ..baseclass import ResearchAgent
 from ..utils.parse_output import create_type_parser
 
 
-INSTRUCTIONS = f"""
+def build_instructions() -> str:
+    return f"""
 You are a web craling agent that crawls the contents of a website answers a query based on the crawled contents. Follow these steps exactly:
 
 * From the provided information, use the 'entity_website' as the starting_url for the web crawler
@@ -33,13 +34,24 @@ Only output JSON. Follow the JSON schema below. Do not output anything else. I w
 {ToolAgentOutput.model_json_schema()}
 """
 
-selected_model = fast_model
 
-crawl_agent = ResearchAgent(
-    name="SiteCrawlerAgent",
-    instructions=INSTRUCTIONS,
-    tools=[crawl_website],
-    model=selected_model,
-    output_type=ToolAgentOutput if model_supports_structured_output(selected_model) else None,
-    output_parser=create_type_parser(ToolAgentOutput) if not model_supports_structured_output(selected_model) else None
-)
+def init_crawl_agent(config: LLMConfig) -> ResearchAgent:
+    selected_model = config.fast_model
+
+    return ResearchAgent(
+        name="SiteCrawlerAgent",
+        instructions=build_instructions(),
+        tools=[create_crawl_website_tool(config)],
+        model=selected_model,
+        output_type=ToolAgentOutput if model_supports_structured_output(selected_model) else None,
+        output_parser=create_type_parser(ToolAgentOutput) if not model_supports_structured_output(selected_model) else None,
+        backup_model=config.backup_model
+    )
+
+
+def __getattr__(name: str):
+    if name == "crawl_agent":
+        agent = init_crawl_agent(get_default_config())
+        globals()[name] = agent
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
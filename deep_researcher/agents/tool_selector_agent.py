@@ -19,7 +19,7 @@ The available agents are:
 
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from ..llm_client import fast_model, model_supports_structured_output
+from ..llm_client import LLMConfig, get_default_config, model_supports_structured_output
 from datetime import datetime
 from .baseclass import ResearchAgent
 from .utils.parse_output import create_type_parser
@@ -38,7 +38,8 @@ class AgentSelectionPlan(BaseModel):
     tasks: List[AgentTask] = Field(description="List of agent tasks to address knowledge gaps")
 
 
-INSTRUCTIONS = f"""
+def build_instructions() -> str:
+    return f"""
 You are an Tool Selector responsible for determining which specialized agents should address a knowledge gap in a research project.
 Today's date is {datetime.now().strftime("%Y-%m-%d")}.
 
@@ -67,12 +68,23 @@ Only output JSON. Follow the JSON schema below. Do not output anything else. I w
 {AgentSelectionPlan.model_json_schema()}
 """
 
-selected_model = fast_model
 
-tool_selector_agent = ResearchAgent(
-    name="ToolSelectorAgent",
-    instructions=INSTRUCTIONS,
-    model=selected_model,
-    output_type=AgentSelectionPlan if model_supports_structured_output(selected_model) else None,
-    output_parser=create_type_parser(AgentSelectionPlan) if not model_supports_structured_output(selected_model) else None
-)
+def init_tool_selector_agent(config: LLMConfig) -> ResearchAgent:
+    selected_model = config.fast_model
+
+    return ResearchAgent(
+        name="ToolSelectorAgent",
+        instructions=build_instructions(),
+        model=selected_model,
+        output_type=AgentSelectionPlan if model_supports_structured_output(selected_model) else None,
+        output_parser=create_type_parser(AgentSelectionPlan) if not model_supports_structured_output(selected_model) else None,
+        backup_model=config.backup_model
+    )
+
+
+def __getattr__(name: str):
+    if name == "tool_selector_agent":
+        agent = init_tool_selector_agent(get_default_config())
+        globals()[name] = agent
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,133 @@
+"""
+Index of the citations in a report, used to number references consistently as sections are added to the report.
+
+Sections are written with their own reference numbers (starting at 1 in each section). The CitationIndex maps the URL of
+each reference to its number in the full report, so that a URL cited in several sections gets a single number. URLs are
+canonicalized before lookup, so that e.g. `http://www.example.com/a/` and `https://example.com/a` are treated as the
+same source. Citations can also be checked against the sources that were actually retrieved during the research.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_REFERENCE_PATTERN = re.compile(r'^\s*\[(\d+)\]\s*(.+?)\s*$')
+_CITATION_PATTERN = re.compile(r'\[(\d+)\]')
+_TRACKING_PARAMETERS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Get the canonical form of a URL for de-duplication: the scheme and www. prefix are dropped, the host is lowercased,
+    default ports, fragments, tracking parameters and trailing slashes are removed.
+    """
+    url = url.strip().strip("<>")
+    if "://" not in url:
+        url = "https://" + url
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(_TRACKING_PARAMETERS)
+    ])
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, "")).lstrip("/")
+
+
+def parse_reference(reference: str) -> Optional[Tuple[int, str]]:
+    """Parse a reference of the form "[1] https://example.com" into its number and URL"""
+    match = _REFERENCE_PATTERN.match(reference)
+    if not match:
+        return None
+    return int(match.group(1)), match.group(2)
+
+
+class CitationIndex:
+    """Numbers the references of a report by URL, with O(1) lookups by canonical URL."""
+
+    def __init__(self, known_sources: Optional[Iterable[str]] = None):
+        self.numbers: Dict[str, int] = {}  # Canonical URL -> reference number in the report
+        self.urls: Dict[int, str] = {}  # Reference number -> URL as it was first cited
+        self.known_sources: Set[str] = set()  # Canonical URLs of the sources retrieved during the research
+        self.unverified: Set[str] = set()  # URLs that were cited but are not among the known sources
+        self.last_number: int = 0
+        if known_sources:
+            self.add_sources(known_sources)
+
+    @classmethod
+    def from_references(cls, references: Iterable[str]) -> "CitationIndex":
+        """Create an index from an existing list of references, keeping their numbers"""
+        index = cls()
+        for reference in references:
+            parsed = parse_reference(reference)
+            if parsed is None:
+                print(f"Invalid reference format: {reference}")
+                continue
+            index.add_reference(*parsed)
+        return index
+
+    def add_sources(self, urls: Iterable[str]) -> None:
+        """Add the URLs of sources retrieved during the research, which citations are validated against"""
+        self.known_sources.update(canonicalize_url(url) for url in urls if url)
+
+    def add_reference(self, number: int, url: str) -> int:
+        """Add a reference with a given number (if its URL isn't already in the index), returning its number"""
+        canonical_url = canonicalize_url(url)
+        if canonical_url not in self.numbers:
+            self.numbers[canonical_url] = number
+            self.urls[number] = url
+            self.last_number = max(self.last_number, number)
+        return self.numbers[canonical_url]
+
+    def get_number(self, url: str) -> int:
+        """Get the reference number for a URL, adding it to the end of the references if it hasn't been cited before"""
+        canonical_url = canonicalize_url(url)
+        number = self.numbers.get(canonical_url)
+        if number is None:
+            number = self.add_reference(self.last_number + 1, url)
+            if self.known_sources and canonical_url not in self.known_sources:
+                self.unverified.add(url)
+        return number
+
+    def add_section(self, section_markdown: str, section_references: List[str]) -> str:
+        """
+        Add the references of a section to the index and renumber the citations in the section to match. Citations
+        without a matching reference are removed.
+        """
+        return self.renumber_citations(section_markdown, self.number_section_references(section_references))
+
+    def number_section_references(self, section_references: List[str]) -> Dict[int, int]:
+        """Add the references of a section to the index, returning the report number of each section reference number"""
+        section_to_report_numbers = {}
+        for reference in section_references:
+            parsed = parse_reference(reference)
+            if parsed is None:
+                print(f"Invalid reference format: {reference}")
+                continue
+            section_number, url = parsed
+            section_to_report_numbers[section_number] = self.get_number(url)
+        return section_to_report_numbers
+
+    @staticmethod
+    def renumber_citations(markdown: str, section_to_report_numbers: Dict[int, int]) -> str:
+        """Renumber the citations in (part of) a section, removing those without a matching reference"""
+        def replace_citation(match: re.Match) -> str:
+            report_number = section_to_report_numbers.get(int(match.group(1)))
+            return f'[{report_number}]' if report_number else ''
+
+        return _CITATION_PATTERN.sub(replace_citation, markdown)
+
+    @property
+    def references(self) -> List[str]:
+        """The references of the report in order of their numbers"""
+        return [f"[{number}] {self.urls[number]}" for number in sorted(self.urls)]
+
+    def render_references(self) -> str:
+        """Render the list of references for the end of the report"""
+        return '  \n'.join(self.references)
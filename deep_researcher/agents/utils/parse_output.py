@@ -1,6 +1,7 @@
 import json
-from pydantic import BaseModel
-from typing import Any, Callable
+import re
+from pydantic import BaseModel, ValidationError
+from typing import Any, Callable, Iterator, Tuple
 
 
 class OutputParserError(Exception):
@@ -18,6 +19,69 @@ class OutputParserError(Exception):
         return self.message
 
 
+_OPENING_BRACKETS = re.compile(r'[{\[]')
+_STRUCTURAL_CHARACTERS = re.compile(r'[{}\[\]"\\]')
+_STRING_CHARACTERS = re.compile(r'["\\]')
+_DECODER = json.JSONDecoder()
+_PARTIAL_UNICODE_ESCAPE = re.compile(r'((?:^|[^\\])(?:\\\\)*)\\u[0-9a-fA-F]{0,3}$')
+_TRAILING_TOKEN = re.compile(r'[\w.+-]+$')
+
+
+def iter_json_candidates(string: str) -> Iterator[Tuple[str, bool]]:
+    """
+    Scan a string once and yield every top-level JSON object or array that appears in it, in order of appearance.
+    Each candidate is yielded as a tuple of (candidate, complete), where complete is False if the string ended before
+    the candidate's closing bracket (e.g. because the LLM output was truncated).
+
+    Braces and brackets inside JSON strings (including escaped quotes) are ignored, so they don't throw off the
+    matching. Text outside of the candidates (e.g. prose or code fence markers) is skipped. Note that the candidates
+    are not validated as JSON.
+    """
+    closing = {'{': '}', '[': ']'}
+    stack = []
+    start_index = 0
+    in_string = False
+    position = 0
+
+    # Jump straight between the characters that matter rather than stepping through every character
+    while True:
+        if in_string:
+            pattern = _STRING_CHARACTERS
+        elif stack:
+            pattern = _STRUCTURAL_CHARACTERS
+        else:
+            pattern = _OPENING_BRACKETS
+        match = pattern.search(string, position)
+        if not match:
+            break
+        i = match.start()
+        c = string[i]
+        position = i + 1
+
+        if not stack:
+            start_index = i
+            stack.append(closing[c])
+        elif in_string:
+            if c == '\\':
+                position = i + 2  # Skip the escaped character
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in closing:
+            stack.append(closing[c])
+        elif c == stack[-1]:
+            stack.pop()
+            if not stack:
+                yield string[start_index:i + 1], True
+        elif c in '}]':
+            # Mismatched closing bracket, so this can't be valid JSON - start looking again from the next character
+            stack = []
+
+    if stack:
+        yield string[start_index:], False
+
+
 def find_json_in_string(string: str) -> str:
     """
     Method to extract all text in the left-most brace that appears in a string.
@@ -27,50 +91,139 @@ def find_json_in_string(string: str) -> str:
         string = "bla bla bla {this is {some} text{{}and it's sneaky}} because {it's} confusing"
         output = "{this is {some} text{{}and it's sneaky}}"
     """
-    stack = 0
-    start_index = None
-
-    for i, c in enumerate(string):
-        if c == '{':
-            if stack == 0:
-                start_index = i  # Start index of the first '{'
-            stack += 1  # Push to stack
-        elif c == '}':
-            stack -= 1  # Pop stack
-            if stack == 0:
-                # Return the substring from the start of the first '{' to the current '}'
-                return string[start_index:i + 1] if start_index is not None else ""
+    for candidate, complete in iter_json_candidates(string):
+        if complete and candidate.startswith('{'):
+            return candidate
 
     # If no complete set of braces is found, return an empty string
     return ""
 
 
+def repair_json(string: str) -> str:
+    """
+    Repair common mistakes in JSON produced by LLMs in a single pass:
+    - Trailing commas before a closing brace or bracket, e.g. {"a": [1, 2,],}
+    - Truncated output, by closing any open string, completing a dangling key or colon and adding the missing
+      closing braces and brackets
+    """
+    output = []  # Chunks of the repaired string
+    stack = []
+    in_string = False
+    escape_index = None  # Index in output of a backslash that the string was truncated after
+    string_start = 0
+    position = 0
+
+    def remove_trailing_comma():
+        # Strip whitespace from the end of the output, then drop a trailing comma if there is one
+        while output and not output[-1].strip():
+            output.pop()
+        if output:
+            output[-1] = output[-1].rstrip()
+            if output[-1].endswith(','):
+                output[-1] = output[-1][:-1]
+
+    while True:
+        match = (_STRING_CHARACTERS if in_string else _STRUCTURAL_CHARACTERS).search(string, position)
+        if not match:
+            output.append(string[position:])
+            break
+        i = match.start()
+        c = string[i]
+        output.append(string[position:i])
+        position = i + 1
+
+        if in_string:
+            if c == '\\':
+                if i + 1 >= len(string):
+                    escape_index = len(output)
+                output.append(string[i:i + 2])
+                position = i + 2
+                continue
+            if c == '"':
+                in_string = False
+            output.append(c)
+        elif c == '"':
+            in_string = True
+            string_start = len(output)
+            output.append(c)
+        elif c in '{[':
+            stack.append('}' if c == '{' else ']')
+            output.append(c)
+        elif c in '}]':
+            remove_trailing_comma()
+            if stack:
+                stack.pop()
+            output.append(c)
+        else:
+            output.append(c)
+
+    if not stack and not in_string:
+        return ''.join(output)
+
+    # The string was truncated, so close everything that is still open
+    preceding = ''.join(output[:string_start]).rstrip()  # Text before the last string that was opened
+    if in_string:
+        if escape_index is not None:
+            output[escape_index] = output[escape_index][:-1]
+        # Drop a \u escape that was cut off within its hex digits, then close the string
+        repaired = _PARTIAL_UNICODE_ESCAPE.sub(r'\1', ''.join(output)) + '"'
+    else:
+        repaired = ''.join(output).rstrip()
+        # Complete a literal that was cut off (e.g. `nul`) or drop the unfinished end of a number (e.g. `1.` or `-`)
+        token = _TRAILING_TOKEN.search(repaired)
+        if token:
+            literal = next((word for word in ('true', 'false', 'null') if word.startswith(token.group())), None)
+            repaired = repaired[:token.start()] + (literal or token.group().rstrip('.eE+-'))
+
+    # If the output ends with an object key (complete or not), give it a value
+    if stack and stack[-1] == '}' and repaired.endswith('"') and preceding.endswith(('{', ',')):
+        repaired += ': null'
+
+    repaired = repaired.rstrip()
+    if repaired.endswith(','):
+        repaired = repaired[:-1].rstrip()
+    if repaired.endswith(':'):
+        repaired += ' null'
+
+    return repaired + ''.join(reversed(stack))
+
+
 def parse_json_output(output: str) -> Any:
-    """Take a string output and parse it as JSON"""
+    """
+    Take a string output and parse it as JSON.
+
+    The output is parsed directly if it is valid JSON, or from its first opening brace if the JSON is followed by other
+    text. Otherwise the JSON objects (and then arrays) found in the output are tried in order of appearance - this covers JSON wrapped in code blocks or surrounded by other text. Candidates
+    that fail to parse are repaired (see repair_json) and tried again.
+    """
     # First try to load the string as JSON
     try:
         return json.loads(output)
-    except json.JSONDecodeError as e:
-        pass
-
-    # If that fails, assume that the output is in a code block - remove the code block markers and try again
-    parsed_output = output
-    parsed_output = parsed_output.split("```")[1]
-    parsed_output = parsed_output.split("```")[0]
-    if parsed_output.startswith("json") or parsed_output.startswith("JSON"):
-        parsed_output = parsed_output[4:].strip()
-    try:
-        return json.loads(parsed_output)
     except json.JSONDecodeError:
         pass
 
-    # As a last attempt, try to manually find the JSON object in the output and parse it
-    parsed_output = find_json_in_string(output)
-    if parsed_output:
+    # Most outputs are a single object wrapped in a code block or some text, which can be decoded in one go starting
+    # from the first opening brace (any text after the object is ignored)
+    first_brace = output.find('{')
+    if first_brace != -1:
         try:
-            return json.loads(parsed_output)
+            return _DECODER.raw_decode(output, first_brace)[0]
         except json.JSONDecodeError:
-            raise OutputParserError(f"Failed to parse output as JSON", output)
+            pass
+
+    # Otherwise try each JSON object or array found in the output, preferring objects
+    candidates = list(iter_json_candidates(output))
+    candidates.sort(key=lambda candidate: not candidate[0].startswith('{'))
+    for candidate, complete in candidates:
+        if complete:
+            try:
+                return json.loads(candidate)
+            except json.JSONDecodeError:
+                pass
+        try:
+            return json.loads(repair_json(candidate))
+        except json.JSONDecodeError:
+            continue
 
     # If all fails, raise an error
     raise OutputParserError(f"Failed to parse output as JSON", output)
@@ -82,6 +235,9 @@ def create_type_parser(type: BaseModel) -> Callable[[str], BaseModel]:
     def convert_json_string_to_type(output: str) -> BaseModel:
         """Take a string output and parse it as a Pydantic model"""
         output_dict = parse_json_output(output)
-        return type.model_validate(output_dict)
+        try:
+            return type.model_validate(output_dict)
+        except ValidationError as e:
+            raise OutputParserError(f"Output does not match the {type.__name__} schema: {str(e)}", output)
 
     return convert_json_string_to_type
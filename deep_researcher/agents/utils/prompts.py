@@ -0,0 +1,45 @@
+"""
+Helpers for assembling agent prompts in a way that makes the most of provider-side prompt (prefix) caching.
+
+Providers such as OpenAI, Anthropic and DeepSeek cache the processed prefix of recent requests, so a request that starts
+with the same bytes as an earlier one is cheaper and faster. To benefit from this, prompts are laid out with the content
+that stays the same across calls first (query, background context, history of the research so far - which only ever
+grows by appending) and the content that changes on every call last (iteration number, elapsed time, current task).
+"""
+from typing import List, Optional, Tuple
+from agents import RunResult
+
+PromptSection = Tuple[str, Optional[str]]
+
+
+def build_prompt(stable_sections: List[PromptSection], volatile_sections: Optional[List[PromptSection]] = None) -> str:
+    """
+    Assemble a prompt from labelled sections, stable sections first and volatile sections last.
+    Sections with empty content are left out. The same stable sections always produce the same bytes, so prompts that
+    share them also share a cacheable prefix.
+    """
+    return "\n\n".join(
+        f"{label}:\n{content}" for label, content in stable_sections + (volatile_sections or []) if content
+    ) + "\n"
+
+
+def get_token_usage(result: RunResult) -> Tuple[int, int]:
+    """Get the total number of input tokens and cached input tokens across all of the model responses in a run"""
+    input_tokens = 0
+    cached_tokens = 0
+    for response in result.raw_responses:
+        usage = response.usage
+        input_tokens += usage.input_tokens or 0
+        details = getattr(usage, "input_tokens_details", None)
+        cached_tokens += (getattr(details, "cached_tokens", 0) or 0) if details else 0
+    return input_tokens, cached_tokens
+
+
+def get_output_tokens(result: RunResult) -> int:
+    """Get the total number of output tokens across all of the model responses in a run"""
+    return sum(response.usage.output_tokens or 0 for response in result.raw_responses)
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of tokens in a text (about 4 characters per token for English)"""
+    return (len(text) + 3) // 4
@@ -0,0 +1,218 @@
+"""
+Agents used to proofread a long report draft in overlapping windows of sections, as a faster and more robust alternative
+to sending the whole draft to the ProofreaderAgent in a single call.
+
+The WindowProofreaderAgent takes as input a string in the following format:
+===========================================================
+QUERY: <original user query>
+
+TABLE OF CONTENTS: <numbered list of all section titles in the report>
+
+PRECEDING SECTIONS (CONTEXT ONLY): <drafts of the sections just before the window>
+
+SECTIONS TO PROOFREAD: <drafts of the sections in the window, in ReportDraft format>
+
+FOLLOWING SECTIONS (CONTEXT ONLY): <drafts of the sections just after the window>
+===========================================================
+
+The Agent then outputs the proofread markdown for the sections in the window along with their references.
+
+The ReportSummaryAgent is given the query, the report title and short digests of the proofread sections, and writes
+the summary that goes at the start of the report. The table of contents is built from the section titles.
+"""
+import asyncio
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+from pydantic import BaseModel, Field
+from .baseclass import ResearchAgent, ResearchRunner
+from .long_writer_agent import LongWriterOutput, add_section_to_report, create_section_digest
+from .proofreader_agent import ReportDraft, ReportDraftSection
+from .utils.citations import CitationIndex
+from .utils.parse_output import create_type_parser
+from .utils.prompts import build_prompt
+from ..events import emit_log
+from ..llm_client import LLMConfig, get_default_config, model_supports_structured_output
+
+
+class ProofreadWindowOutput(BaseModel):
+    """Output from the Window Proofreader Agent"""
+    sections_markdown: str = Field(description="The proofread sections in markdown format, each starting with its section title as a heading")
+    references: List[str] = Field(description="A list of URLs and their corresponding reference numbers for the sections")
+
+
+def build_window_proofreader_instructions() -> str:
+    return f"""
+You are a research expert who proofreads and edits research reports.
+Today's date is {datetime.now().strftime("%Y-%m-%d")}.
+
+The report is being proofread in parts. You are given:
+1. The original query topic for the report
+2. The table of contents of the full report
+3. The sections you need to proofread, in ReportDraft format
+4. Drafts of the sections immediately before and after these sections, which are proofread separately and are only
+   provided as context (there may be none)
+
+Your task is to:
+1. **Add section titles:** Start each of the sections you are proofreading with its title as a level-2 markdown heading (matching the table of contents)
+2. **De-duplicate:** Remove content that repeats what is said in the other sections you are given, or that belongs in another section per the table of contents
+3. **Refine wording:** Edit the wording to be polished, concise and punchy, but **without eliminating any detail** or large chunks of text
+4. **Fix headings:** Remove or reformat any redundant or excessive headings, and ensure that the nesting of heading levels is correct
+5. **Preserve sources:** Keep the numbered citations in square brackets in the body of the text and list the URL of each
+   citation in the references, numbered from 1 in order of appearance (e.g. "[1] https://example.com")
+
+Guidelines:
+- Only output the sections you were asked to proofread, in the same order - DO NOT output the context sections
+- Do not add a title, summary, table of contents or references heading - these are added when the report is assembled
+- Do not add any new facts or data
+- Do not remove any content unless it is very clearly wrong, contradictory or irrelevant
+
+Only output JSON. Follow the JSON schema below. Do not output anything else. I will be parsing this with Pydantic so output valid JSON only:
+{ProofreadWindowOutput.model_json_schema()}
+"""
+
+
+def build_report_summary_instructions() -> str:
+    return f"""
+You are a research expert who writes the summary at the start of research reports.
+Today's date is {datetime.now().strftime("%Y-%m-%d")}.
+
+You are given the original query, the title of the report and a short digest of each section of the report.
+Write a short summary (1-2 paragraphs) that gives an overview of the sections of the report and what is discussed.
+
+Guidelines:
+- Only use information from the digests, do not add any new facts or data
+- Output the summary as plain markdown text without a heading (do not wrap it in a code block)
+"""
+
+
+def init_window_proofreader_agent(config: LLMConfig) -> ResearchAgent:
+    selected_model = config.main_model
+
+    return ResearchAgent(
+        name="WindowProofreaderAgent",
+        instructions=build_window_proofreader_instructions(),
+        model=selected_model,
+        output_type=ProofreadWindowOutput if model_supports_structured_output(selected_model) else None,
+        output_parser=create_type_parser(ProofreadWindowOutput) if not model_supports_structured_output(selected_model) else None,
+        backup_model=config.backup_model
+    )
+
+
+def init_report_summary_agent(config: LLMConfig) -> ResearchAgent:
+    return ResearchAgent(
+        name="ReportSummaryAgent",
+        instructions=build_report_summary_instructions(),
+        model=config.fast_model,
+        backup_model=config.backup_model
+    )
+
+
+def split_into_windows(num_sections: int, window_size: int = 3, overlap: int = 1) -> List[Tuple[range, range, range]]:
+    """
+    Split the sections of a report into windows. Each window is a tuple of the sections it proofreads and the sections
+    either side of it that are given as context, so that the windows overlap by up to `overlap` sections on each side.
+    Every section is proofread in exactly one window.
+    """
+    window_size = max(1, window_size)
+    windows = []
+    for start in range(0, num_sections, window_size):
+        end = min(start + window_size, num_sections)
+        windows.append((
+            range(start, end),
+            range(max(0, start - overlap), start),
+            range(end, min(num_sections, end + overlap)),
+        ))
+    return windows
+
+
+async def proofread_report(
+    query: str,
+    report_title: str,
+    report_draft: ReportDraft,
+    config: Optional[LLMConfig] = None,
+    window_size: int = 3,
+    overlap: int = 1,
+    citation_index: Optional[CitationIndex] = None,
+) -> str:
+    """
+    Proofread the report draft in overlapping windows of sections that run concurrently, then stitch the windows
+    together in order (renumbering the references and rebasing the headings in the same way as the long writer) and
+    add a summary and table of contents in a final, cheap pass over digests of the sections.
+    """
+    config = config or get_default_config()
+    window_agent = init_window_proofreader_agent(config)
+    sections = report_draft.sections
+    table_of_contents = "\n".join(f"{i+1}. {section.section_title}" for i, section in enumerate(sections))
+
+    def format_context(indices: range) -> Optional[str]:
+        return "\n\n".join(f"## {sections[i].section_title}\n{sections[i].section_content}" for i in indices) or None
+
+    async def proofread_window(owned: range, before: range, after: range) -> List[LongWriterOutput]:
+        user_prompt = build_prompt(
+            [("QUERY", query), ("TABLE OF CONTENTS", table_of_contents)],
+            [
+                ("PRECEDING SECTIONS (CONTEXT ONLY)", format_context(before)),
+                ("SECTIONS TO PROOFREAD", ReportDraft(sections=[sections[i] for i in owned]).model_dump_json()),
+                ("FOLLOWING SECTIONS (CONTEXT ONLY)", format_context(after)),
+            ]
+        )
+        try:
+            result = await ResearchRunner.run(window_agent, user_prompt)
+            output = result.final_output_as(ProofreadWindowOutput)
+            return [LongWriterOutput(next_section_markdown=output.sections_markdown, references=output.references)]
+        except Exception as e:
+            # Fall back to the unedited drafts so that one failed window doesn't fail the whole report
+            _log_error(f"Error proofreading sections {owned.start + 1}-{owned.stop}, using their drafts instead: {str(e)}")
+            return [unedited_section(sections[i]) for i in owned]
+
+    window_outputs = await asyncio.gather(
+        *(proofread_window(owned, before, after) for owned, before, after in split_into_windows(len(sections), window_size, overlap))
+    )
+
+    # Stitch the windows together in document order, renumbering the references across the whole report
+    body = ""
+    citation_index = citation_index or CitationIndex()
+    for window_output in window_outputs:
+        for section_output in window_output:
+            body = add_section_to_report(body, section_output, citation_index)
+
+    summary = await write_report_summary(query, report_title, body, config)
+
+    return (
+        f"# {report_title}\n\n"
+        + (f"## Summary\n\n{summary}\n\n" if summary else "")
+        + f"## Table of Contents\n\n{table_of_contents}\n\n"
+        + body
+        + '## References:\n\n' + citation_index.render_references()
+    )
+
+
+async def write_report_summary(query: str, report_title: str, report_body: str, config: LLMConfig) -> str:
+    """Write the summary for the start of the report from digests of its sections (returns an empty string on failure)"""
+    section_texts = re.split(r'^(?=## )', report_body, flags=re.MULTILINE)
+    digests = "\n\n".join(create_section_digest(text) for text in section_texts if text.strip())
+    user_prompt = build_prompt([("QUERY", query), ("REPORT TITLE", report_title), ("SECTION DIGESTS", digests)])
+    try:
+        result = await ResearchRunner.run(init_report_summary_agent(config), user_prompt)
+        return str(result.final_output).strip()
+    except Exception as e:
+        _log_error(f"Error writing the report summary: {str(e)}")
+        return ""
+
+
+def _log_error(message: str) -> None:
+    """Send an error to the event stream of the run (printed in verbose mode), printing it only outside of a run"""
+    if not emit_log(message):
+        print(message)
+
+
+def unedited_section(section: ReportDraftSection) -> LongWriterOutput:
+    """Use the draft of a section as it is, collecting its inline citations as references"""
+    references = {}
+    for number, url in re.findall(r'\[(\d+)\]\((https?://[^)\s]+)\)', section.section_content):
+        references.setdefault(number, url)
+    return LongWriterOutput(
+        next_section_markdown=f"## {section.section_title}\n{section.section_content}",
+        references=[f"[{number}] {url}" for number, url in references.items()],
+    )
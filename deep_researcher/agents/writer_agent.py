@@ -21,10 +21,11 @@ The Agent then:
 The WriterAgent defined here generates the final structured report in markdown format.
 """
 from .baseclass import ResearchAgent
-from ..llm_client import main_model
+from ..llm_client import LLMConfig, get_default_config
 from datetime import datetime
 
-INSTRUCTIONS = f"""
+def build_instructions() -> str:
+    return f"""
 You are a senior researcher tasked with comprehensively answering a research query. 
 Today's date is {datetime.now().strftime('%Y-%m-%d')}.
 You will be provided with the original query along with research findings put together by a research assistant.
@@ -47,8 +48,18 @@ GUIDELINES:
 * If any additional guidelines are provided in the user prompt, follow them exactly and give them precedence over these system instructions.
 """
 
-writer_agent = ResearchAgent(
-    name="WriterAgent",
-    instructions=INSTRUCTIONS,
-    model=main_model,
-)
+def init_writer_agent(config: LLMConfig) -> ResearchAgent:
+    return ResearchAgent(
+        name="WriterAgent",
+        instructions=build_instructions(),
+        model=config.main_model,
+        backup_model=config.backup_model
+    )
+
+
+def __getattr__(name: str):
+    if name == "writer_agent":
+        agent = init_writer_agent(get_default_config())
+        globals()[name] = agent
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
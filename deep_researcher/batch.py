@@ -0,0 +1,242 @@
+"""
+Batch mode for running many research jobs in one process.
+
+Jobs are read from a JSONL file (one object per line) or a CSV file (with a header row) with the fields:
+- query (required)
+- mode: "deep" (default) or "simple"
+- output_length, output_instructions: as on the command line (simple mode only)
+- max_iterations, max_time_minutes: override the batch defaults for the job
+- id: a unique ID for the job (defaults to a hash of the other fields, so that it stays the same across restarts)
+
+All jobs run concurrently in one event loop, up to a cap on the number of jobs in flight. They share one LLM config,
+and so one pool of API clients, the agents built from the config and the HTTP session used for searches and crawls.
+With --share-findings they also share a FindingsBlackboard, so that jobs on related topics reuse each other's search
+and crawl results. As each job finishes, its report and stats are written to the output
+directory and a line is appended to `results.jsonl`. When the batch is run again, jobs that already completed are
+skipped, and with a checkpoint store, deep research jobs that were interrupted resume from their last checkpoint.
+
+Usage:
+    deep-researcher batch jobs.jsonl [--output-dir batch_output] [--max-concurrent-jobs 4] [--share-findings]
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import time
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
+from .blackboard import FindingsBlackboard
+from .checkpoint import CheckpointStore, open_checkpoint_store
+from .llm_client import LLMConfig, get_default_config
+
+
+class BatchJob(BaseModel):
+    """A research job in a batch"""
+    id: str = ""
+    query: str
+    mode: Literal["deep", "simple"] = "deep"
+    output_length: str = ""
+    output_instructions: str = ""
+    max_iterations: Optional[int] = None  # Overrides the default of the batch
+    max_time_minutes: Optional[int] = None  # Overrides the default of the batch
+
+    @model_validator(mode="after")
+    def set_default_id(self) -> "BatchJob":
+        if not self.id:
+            fields = self.model_dump_json(exclude={"id"})
+            self.id = hashlib.sha1(fields.encode("utf-8")).hexdigest()[:12]
+        return self
+
+
+class BatchResult(BaseModel):
+    """Outcome of a job, as written to results.jsonl"""
+    id: str
+    query: str
+    status: Literal["completed", "failed"]
+    report_file: Optional[str] = None
+    stats_file: Optional[str] = None
+    error: Optional[str] = None
+    elapsed_seconds: float = 0.0
+    llm_calls: int = 0
+    cost: float = 0.0
+    finished_at: float = Field(default_factory=time.time)
+
+
+def load_jobs(path: str) -> List[BatchJob]:
+    """Load jobs from a JSONL or CSV file (by extension), leaving out empty lines and empty CSV cells"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            rows = [{key: value for key, value in row.items() if value not in (None, "")} for row in csv.DictReader(f)]
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    jobs = [BatchJob(**row) for row in rows]
+    duplicates = {job.id for job in jobs if sum(other.id == job.id for other in jobs) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate job IDs in {path}: {', '.join(sorted(duplicates))}")
+    return jobs
+
+
+class BatchRunner:
+    """Runs the jobs of a batch concurrently, writing the results of each job as it finishes."""
+
+    def __init__(
+        self,
+        output_dir: str = "batch_output",
+        max_concurrent_jobs: int = 4,
+        max_iterations: int = 5,
+        max_time_minutes: int = 10,
+        max_concurrent_sections: Optional[int] = 4,
+        share_findings: bool = False,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        config: Optional[LLMConfig] = None,
+        verbose: bool = False,
+    ):
+        self.output_dir = output_dir
+        self.max_concurrent_jobs = max_concurrent_jobs  # Number of jobs that run at the same time
+        self.max_iterations = max_iterations
+        self.max_time_minutes = max_time_minutes
+        self.max_concurrent_sections = max_concurrent_sections  # Per deep research job
+        self.blackboard: Optional[FindingsBlackboard] = FindingsBlackboard() if share_findings else None  # Shared by all jobs
+        self.checkpoint_store = checkpoint_store  # If set, deep research jobs are checkpointed under their job ID
+        self.config = config or get_default_config()  # Shared by all jobs, so they draw on the same client pools
+        self.verbose = verbose  # Print the progress of each research run (interleaved across jobs)
+        self.results_file = os.path.join(output_dir, "results.jsonl")
+
+    def completed_job_ids(self) -> set:
+        """Get the IDs of the jobs that completed in earlier runs of the batch"""
+        if not os.path.exists(self.results_file):
+            return set()
+        with open(self.results_file, encoding="utf-8") as f:
+            results = [BatchResult.model_validate_json(line) for line in f if line.strip()]
+        return {result.id for result in results if result.status == "completed"}
+
+    async def run(self, jobs: List[BatchJob]) -> List[BatchResult]:
+        """Run the jobs that haven't completed yet, returning their results"""
+        os.makedirs(os.path.join(self.output_dir, "reports"), exist_ok=True)
+        os.makedirs(os.path.join(self.output_dir, "stats"), exist_ok=True)
+        completed = self.completed_job_ids()
+        pending = [job for job in jobs if job.id not in completed]
+        print(f"Running {len(pending)} jobs ({len(jobs) - len(pending)} already completed), up to {self.max_concurrent_jobs} at a time")
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_jobs)
+        start_time = time.time()
+        finished = 0
+
+        async def run_job(job: BatchJob) -> BatchResult:
+            nonlocal finished
+            async with semaphore:
+                result = await self._run_job(job)
+            finished += 1
+            self._write_result(result)
+            outcome = f"in {result.elapsed_seconds:.0f}s, {result.llm_calls} LLM calls, ${result.cost:.4f}" if result.status == "completed" else f"failed: {result.error}"
+            print(f"[{finished}/{len(pending)}] Job {job.id} {outcome}")
+            return result
+
+        results = await asyncio.gather(*(run_job(job) for job in pending))
+        failed = sum(result.status == "failed" for result in results)
+        print(f"Batch finished in {time.time() - start_time:.0f}s: {len(results) - failed} completed, {failed} failed")
+        if self.blackboard:
+            print(self.blackboard.summary())
+        return results
+
+    async def _run_job(self, job: BatchJob) -> BatchResult:
+        from .deep_research import DeepResearcher
+        from .iterative_research import IterativeResearcher
+
+        start_time = time.time()
+        max_iterations = job.max_iterations or self.max_iterations
+        max_time_minutes = job.max_time_minutes or self.max_time_minutes
+        try:
+            if job.mode == "deep":
+                researcher = DeepResearcher(
+                    max_iterations=max_iterations,
+                    max_time_minutes=max_time_minutes,
+                    verbose=self.verbose,
+                    config=self.config,
+                    max_concurrent_sections=self.max_concurrent_sections,
+                    shared_blackboard=self.blackboard,
+                    checkpoint_store=self.checkpoint_store,
+                )
+                report, stats = await researcher.run(job.query, return_stats=True, run_id=job.id if self.checkpoint_store else None)
+            else:
+                researcher = IterativeResearcher(
+                    max_iterations=max_iterations,
+                    max_time_minutes=max_time_minutes,
+                    verbose=self.verbose,
+                    config=self.config,
+                    blackboard=self.blackboard,
+                )
+                report, stats = await researcher.run(
+                    job.query,
+                    output_length=job.output_length,
+                    output_instructions=job.output_instructions,
+                    return_stats=True,
+                )
+        except Exception as e:
+            return BatchResult(
+                id=job.id, query=job.query, status="failed", error=f"{type(e).__name__}: {e}", elapsed_seconds=time.time() - start_time
+            )
+
+        report_file = os.path.join(self.output_dir, "reports", f"{job.id}.md")
+        with open(report_file, "w", encoding="utf-8") as f:
+            f.write(report)
+        stats_file = os.path.join(self.output_dir, "stats", f"{job.id}.json")
+        with open(stats_file, "w", encoding="utf-8") as f:
+            f.write(stats.model_dump_json(indent=2))
+        total = stats.total
+        return BatchResult(
+            id=job.id,
+            query=job.query,
+            status="completed",
+            report_file=report_file,
+            stats_file=stats_file,
+            elapsed_seconds=time.time() - start_time,
+            llm_calls=total.calls,
+            cost=total.cost,
+        )
+
+    def _write_result(self, result: BatchResult) -> None:
+        with open(self.results_file, "a", encoding="utf-8") as f:
+            f.write(result.model_dump_json() + "\n")
+
+
+async def batch_main(argv: Optional[List[str]] = None) -> None:
+    """Entry point for `deep-researcher batch`"""
+    parser = argparse.ArgumentParser(prog="deep-researcher batch", description="Run a batch of research jobs from a JSONL or CSV file")
+    parser.add_argument("jobs_file", help="JSONL or CSV file of jobs, each with a query and optionally an id, mode, output_length, output_instructions, max_iterations and max_time_minutes")
+    parser.add_argument("--output-dir", default="batch_output",
+                        help="Directory for the reports, stats and results.jsonl of the batch (default: batch_output)")
+    parser.add_argument("--max-concurrent-jobs", type=int, default=4,
+                        help="Maximum number of jobs that run at the same time (default: 4)")
+    parser.add_argument("--max-iterations", type=int, default=5,
+                        help="Maximum number of iterations of each research loop, unless set for a job")
+    parser.add_argument("--max-time", type=int, default=10,
+                        help="Maximum time in minutes of each research loop, unless set for a job")
+    parser.add_argument("--max-concurrent-sections", type=int, default=4,
+                        help="Maximum number of sections researched at once in each deep research job, 0 for no limit")
+    parser.add_argument("--share-findings", action="store_true",
+                        help="Let jobs and sections reuse each other's search and crawl results")
+    parser.add_argument("--checkpoint", nargs="?", const="checkpoints", default=None, metavar="PATH",
+                        help="Checkpoint deep research jobs so that interrupted jobs resume when the batch is run again (default: checkpoints)")
+    parser.add_argument("--verbose", action="store_true", help="Print the progress of each job")
+    args = parser.parse_args(argv)
+
+    checkpoint_store = open_checkpoint_store(args.checkpoint) if args.checkpoint else None
+    runner = BatchRunner(
+        output_dir=args.output_dir,
+        max_concurrent_jobs=args.max_concurrent_jobs,
+        max_iterations=args.max_iterations,
+        max_time_minutes=args.max_time,
+        max_concurrent_sections=args.max_concurrent_sections or None,
+        share_findings=args.share_findings,
+        checkpoint_store=checkpoint_store,
+        verbose=args.verbose,
+    )
+    try:
+        await runner.run(load_jobs(args.jobs_file))
+    finally:
+        await runner.config.registry.aclose()
+        if checkpoint_store is not None:
+            checkpoint_store.close()
@@ -0,0 +1,162 @@
+"""
+Blackboard of findings shared by the sections of a DeepResearcher run.
+
+Each section runs its own research loop, so sections on overlapping themes tend to send the same searches and crawls.
+With a FindingsBlackboard, the output of every tool call is published along with the task that produced it. Before a
+section runs a task, it looks for a published task that asks for the same thing - the same agent, a query with mostly
+the same terms and (for the site crawler) the same website - and reuses its findings instead of calling the tool again.
+
+Lookups go through a local inverted index over the terms of the published queries and the hosts of their sources, so
+no LLM calls are needed. Tasks that are still running are shared too: a section that asks for a query another section
+is already running waits for that result rather than starting a second call.
+"""
+import asyncio
+import re
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+from agents import custom_span
+
+if TYPE_CHECKING:
+    from .agents.tool_agents import ToolAgentOutput
+    from .agents.tool_selector_agent import AgentTask
+
+SITE_CRAWLER_AGENT = "SiteCrawlerAgent"
+
+_TERM_PATTERN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or the to what when where which who why with".split()
+)
+
+
+def query_terms(query: str) -> Set[str]:
+    """Get the set of lowercased terms in a query, without stopwords"""
+    return {term for term in _TERM_PATTERN.findall(query.lower()) if term not in _STOPWORDS}
+
+
+def url_host(url: Optional[str]) -> Optional[str]:
+    """Get the host of a URL without the www. prefix (the URL may be given without a scheme)"""
+    if not url:
+        return None
+    if "://" not in url:
+        url = "https://" + url
+    try:
+        host = (urlsplit(url.strip()).hostname or "").lower()
+    except ValueError:
+        return None
+    return host[4:] if host.startswith("www.") else host or None
+
+
+class BlackboardEntry:
+    """A tool call published to the blackboard"""
+
+    def __init__(self, task: "AgentTask", output: "ToolAgentOutput", section: str):
+        self.task = task
+        self.output = output
+        self.section = section  # Section that ran the tool call
+        self.terms: Set[str] = query_terms(task.query)
+        self.site: Optional[str] = url_host(task.entity_website)
+
+
+class FindingsBlackboard:
+    """Findings and sources published by the research loops of all sections, indexed by query terms and source hosts."""
+
+    def __init__(self, min_similarity: float = 0.6):
+        self.min_similarity = min_similarity  # Share of query terms two tasks must have in common for one to answer the other
+        self.entries: List[BlackboardEntry] = []
+        self.term_index: Dict[str, Set[int]] = {}  # Query term -> ids of the entries whose query contains it
+        self.source_index: Dict[str, Set[int]] = {}  # Source host -> ids of the entries with a source on that host
+        self.pending: Dict[Tuple[str, str, Optional[str]], asyncio.Future] = {}  # Tool calls that are still running
+        self.lookups: int = 0
+        self.hits: int = 0
+        self.hits_by_section: Dict[str, int] = {}
+
+    def publish(self, task: "AgentTask", output: "ToolAgentOutput", section: str = "") -> None:
+        """Add the output of a tool call to the blackboard"""
+        entry_id = len(self.entries)
+        entry = BlackboardEntry(task, output, section)
+        self.entries.append(entry)
+        for term in entry.terms:
+            self.term_index.setdefault(term, set()).add(entry_id)
+        for host in {url_host(source) for source in output.sources}:
+            if host:
+                self.source_index.setdefault(host, set()).add(entry_id)
+
+    def find(self, task: "AgentTask") -> Optional[BlackboardEntry]:
+        """Find the published entry that best answers a task, if any is similar enough"""
+        terms = query_terms(task.query)
+        site = url_host(task.entity_website)
+        if task.agent == SITE_CRAWLER_AGENT and site:
+            # A crawl can only be answered by an earlier crawl of the same site
+            candidates = self.source_index.get(site, set())
+        else:
+            candidates = set().union(*(self.term_index.get(term, set()) for term in terms)) if terms else set()
+
+        best_entry, best_similarity = None, 0.0
+        for entry_id in candidates:
+            entry = self.entries[entry_id]
+            if entry.task.agent != task.agent or entry.site != site:
+                continue
+            union = len(terms | entry.terms)
+            similarity = len(terms & entry.terms) / union if union else 1.0
+            if similarity > best_similarity:
+                best_entry, best_similarity = entry, similarity
+        return best_entry if best_similarity >= self.min_similarity else None
+
+    async def run_task(
+        self,
+        task: "AgentTask",
+        run: Callable[[], Awaitable["ToolAgentOutput"]],
+        section: str = "",
+    ) -> Tuple["ToolAgentOutput", bool]:
+        """
+        Get the output for a task from the blackboard, or run it and publish its output if no section has run it yet.
+        Returns the output and whether it was reused. Outputs that `run` returns without sources are not published,
+        so that errors aren't shared with other sections.
+        """
+        self.lookups += 1
+        key = (task.agent, " ".join(sorted(query_terms(task.query))), url_host(task.entity_website))
+        with custom_span("blackboard_lookup", data={"agent": task.agent, "query": task.query}) as span:
+            output = None
+            while True:
+                entry = self.find(task)
+                if entry is not None:
+                    output = entry.output
+                    break
+                if key not in self.pending:
+                    break
+                output = await asyncio.shield(self.pending[key])
+                if output is not None:
+                    break
+                # The call failed, so run the task here unless another waiting section has already taken it over
+            span.span_data.data["hit"] = output is not None
+        if output is not None:
+            self._record_hit(section)
+            return output, True
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        output = None
+        try:
+            output = await run()
+            if output.sources:
+                self.publish(task, output, section)
+            return output, False
+        finally:
+            # Sections waiting on this call get its output, or None if it failed so that one of them runs the task
+            future.set_result(output if output is not None and output.sources else None)
+            if self.pending.get(key) is future:
+                del self.pending[key]
+
+    def _record_hit(self, section: str) -> None:
+        self.hits += 1
+        self.hits_by_section[section] = self.hits_by_section.get(section, 0) + 1
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def summary(self) -> str:
+        """Human readable summary of how often the blackboard saved a tool call"""
+        lines = [f"Shared findings: {self.hits} of {self.lookups} tool calls reused ({self.hit_rate:.0%}), {len(self.entries)} published"]
+        lines.extend(f"- {section}: {hits} reused" for section, hits in self.hits_by_section.items())
+        return "\n".join(lines)
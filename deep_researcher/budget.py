@@ -0,0 +1,149 @@
+"""
+Shared research budget for a DeepResearcher run.
+
+Without a shared budget every section gets the same fixed number of iterations and minutes. With a ResearchBudget,
+each section still starts with that allowance, but iterations and time that a section does not use (because the
+knowledge gap agent marked it complete early) are released into a shared pool. Sections that reach the end of their
+allowance while still incomplete can then borrow from the pool to keep researching.
+
+The budget also keeps track of the number of LLM calls made during the run so that a global ceiling can be applied.
+The count is recorded by ResearchRunner for whichever budget is active in the current async context.
+"""
+from contextvars import ContextVar
+from typing import List, Optional
+
+# A section can at most extend its allowance to this multiple of the base allowance by borrowing from the pool
+MAX_ALLOWANCE_FACTOR = 2
+
+_current_budget: ContextVar[Optional["ResearchBudget"]] = ContextVar("current_budget", default=None)
+
+
+class ResearchBudget:
+    """Pool of iterations, time and LLM calls shared by all of the sections of a report."""
+
+    def __init__(
+        self,
+        max_iterations: int,
+        max_time_minutes: float,
+        max_llm_calls: Optional[int] = None,
+        reserved_llm_calls: int = 0,
+        share_unused: bool = True,
+    ):
+        self.max_iterations = max_iterations  # Base iteration allowance per section
+        self.max_time_minutes = max_time_minutes  # Base time allowance per section
+        self.max_llm_calls = max_llm_calls  # Ceiling on the total number of LLM calls for the run (None = unlimited)
+        self.reserved_llm_calls = reserved_llm_calls  # Calls held back for writing the report once research is done
+        self.share_unused = share_unused  # Whether sections can borrow the iterations/time left over by other sections
+        self.llm_calls: int = 0
+        self.iteration_pool: int = 0
+        self.time_pool_minutes: float = 0.0
+        self.sections: List["SectionBudget"] = []
+
+    def create_section_budget(self, name: str) -> "SectionBudget":
+        """Register a section with the budget and return its allowance"""
+        section_budget = SectionBudget(self, name)
+        self.sections.append(section_budget)
+        return section_budget
+
+    def record_llm_calls(self, num_calls: int = 1) -> None:
+        self.llm_calls += num_calls
+
+    def llm_calls_exhausted(self) -> bool:
+        """Whether the research phase has used up all of the LLM calls that are not reserved for writing"""
+        if self.max_llm_calls is None:
+            return False
+        return self.llm_calls + self.reserved_llm_calls >= self.max_llm_calls
+
+    def summary(self) -> str:
+        """Human readable summary of how the budget was used"""
+        calls = f"{self.llm_calls}/{self.max_llm_calls}" if self.max_llm_calls is not None else f"{self.llm_calls}"
+        sections = '\n'.join(
+            f"- {section.name}: {section.iterations_used} iterations, {section.minutes_used:.2f} minutes "
+            f"(allowance {section.max_iterations} iterations, {section.max_time_minutes:.2f} minutes)"
+            for section in self.sections
+        )
+        return f"LLM calls: {calls}\n{sections}"
+
+    def activate(self):
+        """Make this the budget that LLM calls in the current async context are recorded against"""
+        return _current_budget.set(self)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        _current_budget.reset(token)
+
+
+class SectionBudget:
+    """The allowance of a single section (i.e. a single IterativeResearcher) within a shared ResearchBudget."""
+
+    def __init__(self, pool: ResearchBudget, name: str):
+        self.pool = pool
+        self.name = name
+        self.max_iterations: int = pool.max_iterations
+        self.max_time_minutes: float = pool.max_time_minutes
+        self.iterations_used: int = 0
+        self.minutes_used: float = 0.0
+        self.finished: bool = False
+
+    def can_continue(self, iteration: int, elapsed_minutes: float) -> tuple[bool, str]:
+        """
+        Check whether the section can run another iteration, borrowing from the shared pool if it has reached the end of
+        its own allowance. Returns a tuple of (can_continue, reason) where the reason explains why the loop must stop.
+        """
+        self.iterations_used = iteration
+        self.minutes_used = elapsed_minutes
+
+        if self.pool.llm_calls_exhausted():
+            return False, f"Reached the maximum number of LLM calls for the report ({self.pool.max_llm_calls})"
+
+        if iteration >= self.max_iterations and not self._borrow_iteration():
+            return False, f"Reached maximum iterations ({self.max_iterations})"
+
+        if elapsed_minutes >= self.max_time_minutes and not self._borrow_time(elapsed_minutes):
+            return False, f"Reached maximum time ({self.max_time_minutes:.2f} minutes)"
+
+        return True, ""
+
+    def release(self, iterations_used: int, elapsed_minutes: float) -> None:
+        """Return the unused part of the allowance to the shared pool once the section has finished researching"""
+        if self.finished:
+            return
+        self.finished = True
+        self.iterations_used = iterations_used
+        self.minutes_used = elapsed_minutes
+        self.pool.iteration_pool += max(0, self.max_iterations - iterations_used)
+        self.pool.time_pool_minutes += max(0.0, self.max_time_minutes - elapsed_minutes)
+
+    def _borrow_iteration(self) -> bool:
+        if not self.pool.share_unused:
+            return False
+        if self.pool.iteration_pool <= 0 or self.max_iterations >= self.pool.max_iterations * MAX_ALLOWANCE_FACTOR:
+            return False
+        self.pool.iteration_pool -= 1
+        self.max_iterations += 1
+        return True
+
+    def _borrow_time(self, elapsed_minutes: float) -> bool:
+        if not self.pool.share_unused:
+            return False
+        limit = self.pool.max_time_minutes * MAX_ALLOWANCE_FACTOR
+        # Borrow enough time for roughly one more iteration, based on the average iteration time so far
+        needed = (elapsed_minutes - self.max_time_minutes) + elapsed_minutes / max(1, self.iterations_used)
+        amount = min(needed, self.pool.time_pool_minutes, limit - self.max_time_minutes)
+        if self.max_time_minutes + amount <= elapsed_minutes:
+            return False
+        self.pool.time_pool_minutes -= amount
+        self.max_time_minutes += amount
+        return True
+
+
+def get_current_budget() -> Optional[ResearchBudget]:
+    """Get the budget that is active in the current async context (if any)"""
+    return _current_budget.get()
+
+
+def record_llm_calls(num_calls: int = 1) -> None:
+    """Record LLM calls against the budget that is active in the current async context (if any)"""
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.record_llm_calls(num_calls)
@@ -0,0 +1,138 @@
+"""
+Checkpoints for resuming DeepResearcher runs that were interrupted.
+
+A RunCheckpoint holds everything a run has paid LLM calls for: the report plan, the conversation of each section's
+research loop (saved after every iteration), each section draft and each section of the final report written by the
+long writer. The DeepResearcher saves the checkpoint to a CheckpointStore after each of these steps, keyed by the run
+ID. Running again with the same run ID picks up from the last saved step: finished steps are loaded instead of being
+repeated, and a section that was interrupted mid-iteration restarts that iteration. The checkpoint of a finished run
+is also the starting point for refreshing its report (see `DeepResearcher.refresh`).
+
+Checkpoints are stored either as one JSON file per run in a directory or in a SQLite database (for paths ending in
+.db, .sqlite or .sqlite3), see `open_checkpoint_store`.
+"""
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+import time
+import uuid
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from .agents.long_writer_agent import LongWriterOutput
+from .agents.planner_agent import ReportPlan
+from .freshness import SourceValidator
+from .iterative_research import IterationData
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+
+class SectionCheckpoint(BaseModel):
+    """Progress of the research loop for a section of the report"""
+    iterations: List[IterationData] = Field(default_factory=list)  # Completed iterations of the research loop
+    sources: List[str] = Field(default_factory=list)  # URLs retrieved by the tool agents in those iterations
+    research_complete: bool = False  # Whether the research loop has finished (the draft may still need writing)
+    draft: Optional[str] = None
+    researched_at: Optional[float] = None  # When the draft was written, used to find sections that are too old when refreshing
+
+
+class RunCheckpoint(BaseModel):
+    """Saved progress of a DeepResearcher run"""
+    run_id: str
+    query: str
+    created_at: float = Field(default_factory=time.time)
+    updated_at: float = Field(default_factory=time.time)
+    report_plan: Optional[ReportPlan] = None
+    sections: Dict[int, SectionCheckpoint] = Field(default_factory=dict)  # Position of the section in the plan -> progress
+    written_sections: Dict[int, LongWriterOutput] = Field(default_factory=dict)  # Sections of the final report written so far
+    final_report: Optional[str] = None
+    source_validators: Dict[str, SourceValidator] = Field(default_factory=dict)  # ETag/Last-Modified of the fetched sources
+    refreshed_from: Optional[str] = None  # ID of the run whose report this run refreshes
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+class CheckpointStore(ABC):
+    """Base class for the stores that run checkpoints are saved to"""
+
+    @abstractmethod
+    def load(self, run_id: str) -> Optional[RunCheckpoint]:
+        ...
+
+    @abstractmethod
+    def save(self, checkpoint: RunCheckpoint) -> None:
+        ...
+
+    @abstractmethod
+    def list_runs(self) -> List[str]:
+        ...
+
+    def close(self) -> None:
+        """Release the resources held by the store (nothing to release by default)"""
+
+
+class FileCheckpointStore(CheckpointStore):
+    """Stores each run as `<run_id>.json` in a directory. Files are replaced atomically, so a crash never leaves a partial checkpoint."""
+
+    def __init__(self, directory: str = "checkpoints"):
+        self.directory = directory
+
+    def _path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{run_id}.json")
+
+    def load(self, run_id: str) -> Optional[RunCheckpoint]:
+        try:
+            with open(self._path(run_id), encoding="utf-8") as f:
+                return RunCheckpoint.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def save(self, checkpoint: RunCheckpoint) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(checkpoint.run_id)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(checkpoint.model_dump_json())
+        os.replace(temp_path, path)
+
+    def list_runs(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-len(".json")] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Stores runs in a single SQLite database, one row per run"""
+
+    def __init__(self, path: str = "checkpoints.db"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints (run_id TEXT PRIMARY KEY, query TEXT, updated_at REAL, data TEXT)"
+        )
+        self.connection.commit()
+
+    def load(self, run_id: str) -> Optional[RunCheckpoint]:
+        row = self.connection.execute("SELECT data FROM checkpoints WHERE run_id = ?", (run_id,)).fetchone()
+        return RunCheckpoint.model_validate_json(row[0]) if row else None
+
+    def save(self, checkpoint: RunCheckpoint) -> None:
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, query, updated_at, data) VALUES (?, ?, ?, ?)",
+                (checkpoint.run_id, checkpoint.query, checkpoint.updated_at, checkpoint.model_dump_json()),
+            )
+
+    def list_runs(self) -> List[str]:
+        return [row[0] for row in self.connection.execute("SELECT run_id FROM checkpoints ORDER BY updated_at")]
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def open_checkpoint_store(location: str = "checkpoints") -> CheckpointStore:
+    """Open a SQLite store if the location is a database file (.db, .sqlite or .sqlite3), otherwise a directory of JSON files"""
+    if location.endswith(SQLITE_EXTENSIONS):
+        return SQLiteCheckpointStore(location)
+    return FileCheckpointStore(location)
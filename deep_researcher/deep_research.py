@@ -1,11 +1,27 @@
 import asyncio
 import time
 from .iterative_research import IterativeResearcher
-from .agents.planner_agent import planner_agent, ReportPlan, ReportPlanSection
-from .agents.proofreader_agent import ReportDraftSection, ReportDraft, proofreader_agent
-from .agents.long_writer_agent import write_report
+from .agents.planner_agent import init_planner_agent, prefetch_search_results, ReportPlan, ReportPlanSection
+from .agents.proofreader_agent import ReportDraftSection, ReportDraft
+from .agents.window_proofreader_agent import proofread_report
+from .agents.utils.citations import CitationIndex, canonicalize_url
+from .agents.long_writer_agent import (
+    DEFAULT_CONTEXT_TOKENS, write_report, write_report_as_sections_complete, write_report_in_parallel
+)
 from .agents.baseclass import ResearchRunner
-from typing import List
+from .blackboard import FindingsBlackboard
+from .checkpoint import CheckpointStore, RunCheckpoint, SectionCheckpoint, new_run_id
+from .freshness import SourceValidator, check_sources, collect_validators, get_validator, stop_collecting_validators
+from .budget import ResearchBudget
+from .events import (
+    MAX_QUEUED_EVENTS, PlanCreatedEvent, ReportChunkEvent, ResearchDoneEvent, ResearchEvent, SectionDoneEvent,
+    collect_report, emit, emit_log, stream_events
+)
+from .scheduler import SectionScheduler
+from .profiling import profiling_enabled
+from .stats import RunStats
+from .llm_client import LLMConfig, get_default_config
+from typing import AsyncIterator, List, Optional, Tuple, Union
 from agents.tracing import trace, gen_trace_id, custom_span
 
 class DeepResearcher:
@@ -17,68 +33,295 @@ class DeepResearcher:
             max_iterations: int = 5,
             max_time_minutes: int = 10,
             verbose: bool = True,
-            tracing: bool = False
+            tracing: bool = False,
+            share_budget: bool = True,
+            max_llm_calls: Optional[int] = None,
+            min_novelty: float = 0.0,
+            config: Optional[LLMConfig] = None,
+            pipeline_writing: bool = True,
+            parallel_writing: bool = False,
+            writer_context_tokens: Optional[int] = DEFAULT_CONTEXT_TOKENS,
+            use_long_writer: bool = True,
+            proofread_window_size: int = 3,
+            share_findings: bool = False,
+            prefetch_planning: bool = True,
+            max_concurrent_sections: Optional[int] = 4,
+            checkpoint_store: Optional[CheckpointStore] = None,
+            shared_blackboard: Optional[FindingsBlackboard] = None,
+            stream_report: bool = False
         ):
         self.max_iterations = max_iterations
         self.max_time_minutes = max_time_minutes
         self.verbose = verbose
         self.tracing = tracing
+        self.share_budget = share_budget  # Let sections that are still incomplete use the iterations/time left over by finished sections
+        self.max_llm_calls = max_llm_calls  # Ceiling on the total number of LLM calls for the report
+        self.min_novelty = min_novelty  # Stop a section's research loop once its findings stop adding new information
+        self.budget: Optional[ResearchBudget] = None
+        self.citation_index: Optional[CitationIndex] = None
+        self.config = config or get_default_config()  # Models (and the pooled clients behind them) used by all agents in the run
+        self.pipeline_writing = pipeline_writing  # Write each section of the final report as soon as it and the sections before it are researched
+        self.parallel_writing = parallel_writing  # Write all sections of the final report concurrently rather than one after the other
+        self.writer_context_tokens = writer_context_tokens  # Limit on the report context sent when writing each section (None to send the full report so far)
+        self.use_long_writer = use_long_writer  # If False, the final report is produced by proofreading the section drafts instead
+        self.proofread_window_size = proofread_window_size  # Number of sections proofread together when not using the long writer
+        self.share_findings = share_findings  # Let sections reuse the tool outputs of other sections instead of repeating the same searches
+        self.blackboard: Optional[FindingsBlackboard] = None
+        self.shared_blackboard = shared_blackboard  # Blackboard shared with other runs (e.g. the jobs of a batch), used in place of a new one for each run
+        self.max_concurrent_sections = max_concurrent_sections  # Limit on the number of sections researched at once (None for no limit)
+        self.scheduler: Optional[SectionScheduler] = None
+        self.stats: Optional[RunStats] = None  # Token, cost and latency accounting for the last run
+        self.prefetch_planning = prefetch_planning  # Search for the query directly and give the results to a tool-less planner, rather than letting the planner run tool agents
+        self.checkpoint_store = checkpoint_store  # If set, progress is saved after each step so that an interrupted run can be resumed
+        self.checkpoint: Optional[RunCheckpoint] = None
+        self.run_id: Optional[str] = None
+        self.stream_report = stream_report  # Emit each section of the final report token by token as the long writer generates it (sequential writing only)
 
-        if not self.tracing:
+        if not self.tracing and not profiling_enabled():
             from agents import set_tracing_disabled
             set_tracing_disabled(True)
 
-    async def run(self, query: str) -> str:
-        """Run the deep research workflow"""
+    @property
+    def trace_spans(self) -> bool:
+        """Whether to record spans for the run, either for the OpenAI platform or for local profiling"""
+        return self.tracing or profiling_enabled()
+
+    async def run(self, query: str, return_stats: bool = False, run_id: Optional[str] = None) -> Union[str, Tuple[str, RunStats]]:
+        """
+        Run the deep research workflow, optionally returning the RunStats of the run along with the report. With a
+        checkpoint store, the run is saved under run_id (a new ID if not given), and if a checkpoint for run_id already
+        exists the run resumes from it.
+        """
+        final_report = await collect_report(self.run_stream(query, run_id), verbose=self.verbose)
+        return (final_report, self.stats) if return_stats else final_report
+
+    async def run_stream(
+        self, query: str, run_id: Optional[str] = None, max_queued_events: int = MAX_QUEUED_EVENTS
+    ) -> AsyncIterator[ResearchEvent]:
+        """Run the deep research workflow like `run`, yielding its progress events (see events.py) as they happen."""
+        async def research() -> None:
+            final_report = await self._run(query, run_id)
+            await emit(ResearchDoneEvent(report=final_report, stats=self.stats))
+
+        async for event in stream_events(research(), max_queued_events):
+            yield event
+
+    async def _run(self, query: str, run_id: Optional[str] = None) -> str:
         start_time = time.time()
+        self._load_checkpoint(query, run_id)
+        if self.checkpoint and self.checkpoint.final_report is not None:
+            self._log_message(f"Run {self.run_id} has already completed, returning its saved report")
+            self.stats = RunStats()
+            await emit(ReportChunkEvent(text=self.checkpoint.final_report))
+            return self.checkpoint.final_report
 
-        if self.tracing:
+        if self.trace_spans:
             trace_id = gen_trace_id()
             workflow_trace = trace("deep_researcher", trace_id=trace_id)
-            print(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
+            if self.tracing:
+                print(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
             workflow_trace.start(mark_as_current=True)
 
-        # First build the report plan which outlines the sections and compiles any relevant background context on the query
-        report_plan: ReportPlan = await self._build_report_plan(query)
+        # Set up the budget shared by all sections so that every LLM call made during the run is counted against it
+        self.budget = ResearchBudget(
+            max_iterations=self.max_iterations,
+            max_time_minutes=self.max_time_minutes,
+            max_llm_calls=self.max_llm_calls,
+            share_unused=self.share_budget,
+        )
+        budget_token = self.budget.activate()
+        self.stats = RunStats()
+        stats_token = self.stats.activate()
+        # Keep the validators of the fetched sources with the checkpoint, so that the report can be refreshed later
+        validators_token = collect_validators(self.checkpoint.source_validators) if self.checkpoint else None
+
+        # Collect the sources found by each section so that the citations in the final report can be checked against them
+        self.citation_index = CitationIndex()
+        if self.shared_blackboard is not None:
+            self.blackboard = self.shared_blackboard
+        else:
+            self.blackboard = FindingsBlackboard() if self.share_findings else None
+        self.scheduler = SectionScheduler(self.max_concurrent_sections)
 
-        # Run the independent research loops concurrently for each section and gather the results
-        research_results: List[str] = await self._run_research_loops(report_plan)
+        try:
+            # First build the report plan which outlines the sections and compiles any relevant background context on the query
+            report_plan: ReportPlan = await self._build_report_plan(query)
 
-        # Create the final report from the original report plan and the drafts of each section
-        final_report: str = await self._create_final_report(query, report_plan, research_results)
+            # Hold back one call per section for the section draft and one for the long writer so the report can always be written
+            self.budget.reserved_llm_calls = 2 * len(report_plan.report_outline)
+
+            if self.pipeline_writing and self.use_long_writer:
+                # Run the research loops concurrently and write each section of the report as the research completes
+                final_report: str = await self._research_and_write_report(query, report_plan)
+            else:
+                # Run the independent research loops concurrently for each section and gather the results
+                research_results: List[str] = await self._run_research_loops(report_plan)
+
+                # Create the final report from the original report plan and the drafts of each section
+                final_report: str = await self._create_final_report(
+                    query, report_plan, research_results, use_long_writer=self.use_long_writer
+                )
+            if self.checkpoint:
+                self.checkpoint.final_report = final_report
+                self._save_checkpoint()
+        finally:
+            ResearchBudget.deactivate(budget_token)
+            RunStats.deactivate(stats_token)
+            if validators_token is not None:
+                stop_collecting_validators(validators_token)
+            self.stats.finish()
+            # Finish the trace of failed and interrupted runs too, as that is when a profile is most needed
+            if self.trace_spans:
+                workflow_trace.finish(reset_current=True)
+
+        self._log_message(f"Research budget usage:\n{self.budget.summary()}")
+        self._log_message(self.scheduler.summary())
+        if self.blackboard:
+            self._log_message(self.blackboard.summary())
+        if self.citation_index.unverified:
+            self._log_message(
+                f"{len(self.citation_index.unverified)} cited URLs were not among the sources found during research:\n"
+                + "\n".join(sorted(self.citation_index.unverified))
+            )
 
         elapsed_time = time.time() - start_time
         self._log_message(f"DeepResearcher completed in {int(elapsed_time // 60)} minutes and {int(elapsed_time % 60)} seconds")
 
-        if self.tracing:
-            workflow_trace.finish(reset_current=True)
-
         return final_report
 
+    async def refresh(
+        self,
+        previous_run_id: str,
+        max_age_days: Optional[float] = None,
+        run_id: Optional[str] = None,
+        return_stats: bool = False,
+    ) -> Union[str, Tuple[str, RunStats]]:
+        """
+        Refresh the report of a previous run, re-researching only the sections that are stale: those with a source that
+        has changed since it was fetched, or that were researched more than max_age_days ago. The other sections are
+        reused as they are, both their drafts and their sections of the final report. The refresh is saved as a new run
+        (run_id, or a new ID if not given), which can be resumed like any other run.
+        """
+        if self.checkpoint_store is None:
+            raise ValueError("Refreshing a report needs a checkpoint store")
+        previous = self.checkpoint_store.load(previous_run_id)
+        if previous is None or previous.report_plan is None:
+            raise ValueError(f"No report plan was saved for run {previous_run_id}")
+
+        run_id = run_id or new_run_id()
+        checkpoint = await self._plan_refresh(previous, run_id, max_age_days)
+        self.checkpoint_store.save(checkpoint)
+        return await self.run(previous.query, return_stats=return_stats, run_id=run_id)
+
+    async def _plan_refresh(self, previous: RunCheckpoint, run_id: str, max_age_days: Optional[float]) -> RunCheckpoint:
+        """Create the checkpoint for a refresh of a previous run, keeping the sections whose sources are still fresh"""
+        self._log_message(f"=== Checking the Sources of Run {previous.run_id} ===")
+        outline = previous.report_plan.report_outline
+        stale_reasons = {}
+        for position in range(len(outline)):
+            section = previous.sections.get(position)
+            if section is None or section.draft is None:
+                stale_reasons[position] = "it was not finished in the previous run"
+            elif max_age_days is not None and (section.researched_at is None or time.time() - section.researched_at > max_age_days * 86400):
+                stale_reasons[position] = f"it was researched more than {max_age_days:g} days ago"
+
+        # Check each source of the remaining sections once, against the validators from when it was fetched
+        validators = {}
+        for position, section in previous.sections.items():
+            if position in stale_reasons:
+                continue
+            for url in section.sources:
+                validators[url] = (
+                    get_validator(previous.source_validators, url)
+                    or SourceValidator(fetched_at=section.researched_at or previous.updated_at)
+                )
+        checks = await check_sources(validators, validators) if validators else {}
+        for position, section in previous.sections.items():
+            if position in stale_reasons:
+                continue
+            changed = [url for url in dict.fromkeys(section.sources) if checks[url].changed]
+            if changed:
+                stale_reasons[position] = f"{len(changed)} of {len(set(section.sources))} sources changed"
+
+        checkpoint = RunCheckpoint(run_id=run_id, query=previous.query, report_plan=previous.report_plan, refreshed_from=previous.run_id)
+        for position, section_plan in enumerate(outline):
+            if position in stale_reasons:
+                self._log_message(f"Re-researching section '{section_plan.title}', as {stale_reasons[position]}")
+                continue
+            section = previous.sections[position]
+            checkpoint.sections[position] = section.model_copy(deep=True)
+            if position in previous.written_sections:
+                checkpoint.written_sections[position] = previous.written_sections[position]
+            for url in section.sources:
+                validator = get_validator(previous.source_validators, url)
+                if validator is not None:
+                    checkpoint.source_validators[canonicalize_url(url)] = validator
+        unchecked = sum(1 for check in checks.values() if check.changed is None)
+        self._log_message(
+            f"{len(stale_reasons)} of {len(outline)} sections are stale, {len(checks)} sources checked"
+            + (f" ({unchecked} could not be checked and are assumed unchanged)" if unchecked else "")
+        )
+        return checkpoint
+
+    def _load_checkpoint(self, query: str, run_id: Optional[str] = None) -> None:
+        """Load the checkpoint of the run from the checkpoint store, or start a new one"""
+        if self.checkpoint_store is None:
+            self.checkpoint = None
+            self.run_id = run_id
+            return
+        self.run_id = run_id or new_run_id()
+        self.checkpoint = self.checkpoint_store.load(self.run_id)
+        if self.checkpoint is None:
+            self.checkpoint = RunCheckpoint(run_id=self.run_id, query=query)
+            self._log_message(f"Saving checkpoints for run {self.run_id}")
+        elif self.checkpoint.query != query:
+            raise ValueError(f"Run {self.run_id} was started for a different query: {self.checkpoint.query}")
+        else:
+            self._log_message(f"Resuming run {self.run_id} from its last checkpoint")
+
+    def _save_checkpoint(self) -> None:
+        if self.checkpoint_store is not None and self.checkpoint is not None:
+            self.checkpoint.updated_at = time.time()
+            self.checkpoint_store.save(self.checkpoint)
+
     async def _build_report_plan(self, query: str) -> ReportPlan:
         """Build the initial report plan including the report outline (sections and key questions) and background context"""
-        if self.tracing:
+        if self.checkpoint and self.checkpoint.report_plan:
+            self._log_message("Using the report plan from the checkpoint")
+            return self.checkpoint.report_plan
+
+        if self.trace_spans:
             span = custom_span(name="build_report_plan")
             span.start(mark_as_current=True)
 
         self._log_message("=== Building Report Plan ===")
-        user_message = f"QUERY: {query}"
+        start_time = time.time()
+        search_results = await prefetch_search_results(query, self.config) if self.prefetch_planning else None
+        if search_results:
+            # The planner only needs a single call to turn the prefetched results into a plan
+            planner_agent = init_planner_agent(self.config, use_tools=False)
+            user_message = f"QUERY: {query}\n\nSEARCH RESULTS:\n{search_results}"
+        else:
+            planner_agent = init_planner_agent(self.config)
+            user_message = f"QUERY: {query}"
         result = await ResearchRunner.run(
             planner_agent,
             user_message
         )
         report_plan = result.final_output_as(ReportPlan)
+        self._log_message(f"Report plan built in {time.time() - start_time:.1f} seconds")
+        await emit(PlanCreatedEvent(
+            report_title=report_plan.report_title,
+            section_titles=[section.title for section in report_plan.report_outline],
+            key_questions=[section.key_question for section in report_plan.report_outline],
+            background_context=report_plan.background_context,
+        ))
 
-        if self.verbose:
-            num_sections = len(report_plan.report_outline)
-            message_log = '\n\n'.join(f"Section: {section.title}\nKey question: {section.key_question}" for section in report_plan.report_outline)
-            if report_plan.background_context:
-                message_log += f"\n\nThe following background context has been included for the report build:\n{report_plan.background_context}"
-            else:
-                message_log += "\n\nNo background context was provided for the report build.\n"
-            self._log_message(f"Report plan created with {num_sections} sections:\n{message_log}")
+        if self.checkpoint:
+            self.checkpoint.report_plan = report_plan
+            self._save_checkpoint()
 
-        if self.tracing:
+        if self.trace_spans:
             span.finish(reset_current=True)
 
         return report_plan
@@ -88,37 +331,125 @@ class DeepResearcher:
         report_plan: ReportPlan
     ) -> List[str]:
         """For a given ReportPlan, run a research loop concurrently for each section and gather the results"""
-        async def run_research_for_section(section: ReportPlanSection):
-            iterative_researcher = IterativeResearcher(
-                max_iterations=self.max_iterations,
-                max_time_minutes=self.max_time_minutes,
-                verbose=self.verbose,
-                tracing=False  # Do not trace as this will conflict with the tracing we already have set up for the deep researcher
-            )
-            args = {
-                "query": section.key_question,
-                "output_length": "",
-                "output_instructions": "",
-                "background_context": report_plan.background_context,
-            }
-            
-            # Only use custom span if tracing is enabled
-            if self.tracing:
-                with custom_span(
-                    name=f"iterative_researcher:{section.title}", 
-                    data={"key_question": section.key_question}
-                ):
-                    return await iterative_researcher.run(**args)
-            else:
-                return await iterative_researcher.run(**args)
-        
         self._log_message("=== Initializing Research Loops ===")
         # Run all research loops concurrently in a single gather call
         research_results = await asyncio.gather(
-            *(run_research_for_section(section) for section in report_plan.report_outline)
+            *(self._run_research_for_section(report_plan, section, position) for position, section in enumerate(report_plan.report_outline))
         )
         return research_results
 
+    async def _research_and_write_report(self, query: str, report_plan: ReportPlan) -> str:
+        """
+        For a given ReportPlan, run a research loop concurrently for each section and write the final report with the
+        long writer, starting on each section as soon as the research for it and all of the sections before it is done
+        """
+        self._log_message("=== Initializing Research Loops ===")
+        research_tasks = [
+            asyncio.create_task(self._run_research_for_section(report_plan, section, position))
+            for position, section in enumerate(report_plan.report_outline)
+        ]
+
+        if self.trace_spans:
+            span = custom_span(name="create_final_report")
+            span.start(mark_as_current=True)
+
+        self._log_message("\n=== Building Final Report (as sections complete) ===")
+        section_titles = [section.title for section in report_plan.report_outline]
+        try:
+            if self.parallel_writing:
+                final_output = await write_report_in_parallel(
+                    query,
+                    report_plan.report_title,
+                    section_titles,
+                    research_tasks,
+                    config=self.config,
+                    citation_index=self.citation_index,
+                    **self._written_sections_args(),
+                )
+            else:
+                final_output = await write_report_as_sections_complete(
+                    query,
+                    report_plan.report_title,
+                    section_titles,
+                    research_tasks,
+                    config=self.config,
+                    max_context_tokens=self.writer_context_tokens,
+                    citation_index=self.citation_index,
+                    stream=self.stream_report,
+                    **self._written_sections_args(),
+                )
+        finally:
+            # If writing the report failed, don't leave the remaining research loops running
+            for task in research_tasks:
+                task.cancel()
+
+        self._log_message(f"Final report completed")
+
+        if self.trace_spans:
+            span.finish(reset_current=True)
+
+        return final_output
+
+    async def _run_research_for_section(self, report_plan: ReportPlan, section: ReportPlanSection, position: int = 0) -> str:
+        """
+        Run the iterative research loop for a single section of the report plan, once the scheduler admits it (sections
+        earlier in the report are admitted first)
+        """
+        checkpoint = None
+        if self.checkpoint:
+            checkpoint = self.checkpoint.sections.setdefault(position, SectionCheckpoint())
+            if checkpoint.draft is not None:
+                # The section was finished before the run was interrupted
+                if self.citation_index:
+                    self.citation_index.add_sources(checkpoint.sources)
+                await emit(SectionDoneEvent(section=section.title, draft=checkpoint.draft))
+                return checkpoint.draft
+
+        if self.scheduler is None:
+            return await self._research_section(report_plan, section, checkpoint)
+        async with self.scheduler.slot(section.title, priority=position) as section_run:
+            if section_run.wait_seconds >= 1:
+                self._log_message(f"Starting research for section '{section.title}' after {section_run.wait_seconds:.1f}s in the queue")
+            return await self._research_section(report_plan, section, checkpoint)
+
+    async def _research_section(
+        self, report_plan: ReportPlan, section: ReportPlanSection, checkpoint: Optional[SectionCheckpoint] = None
+    ) -> str:
+        """Run the iterative research loop for a section and return its draft"""
+        iterative_researcher = IterativeResearcher(
+            max_iterations=self.max_iterations,
+            max_time_minutes=self.max_time_minutes,
+            verbose=self.verbose,
+            tracing=False,  # Do not trace as this will conflict with the tracing we already have set up for the deep researcher
+            budget=self.budget.create_section_budget(section.title) if self.budget else None,
+            min_novelty=self.min_novelty,
+            config=self.config,
+            blackboard=self.blackboard,
+            checkpoint=checkpoint,
+            on_checkpoint=self._save_checkpoint
+        )
+        args = {
+            "query": section.key_question,
+            "output_length": "",
+            "output_instructions": "",
+            "background_context": report_plan.background_context,
+        }
+        
+        # Only use custom span if tracing is enabled
+        if self.trace_spans:
+            with custom_span(
+                name=f"iterative_researcher:{section.title}", 
+                data={"key_question": section.key_question}
+            ):
+                section_draft = await iterative_researcher.run(**args)
+        else:
+            section_draft = await iterative_researcher.run(**args)
+
+        if self.citation_index:
+            self.citation_index.add_sources(iterative_researcher.sources)
+        await emit(SectionDoneEvent(section=section.title, draft=section_draft))
+        return section_draft
+
     async def _create_final_report(
         self, 
         query: str, 
@@ -127,7 +458,7 @@ class DeepResearcher:
         use_long_writer: bool = True
     ) -> str:
         """Create the final report from the original report plan and the drafts of each section"""
-        if self.tracing:
+        if self.trace_spans:
             span = custom_span(name="create_final_report")
             span.start(mark_as_current=True)
 
@@ -147,24 +478,44 @@ class DeepResearcher:
         self._log_message("\n=== Building Final Report ===")
 
         if use_long_writer:
-            final_output = await write_report(query, report_plan.report_title, report_draft)
+            final_output = await write_report(
+                query,
+                report_plan.report_title,
+                report_draft,
+                config=self.config,
+                parallel=self.parallel_writing,
+                max_context_tokens=self.writer_context_tokens,
+                citation_index=self.citation_index,
+                stream=self.stream_report,
+                **self._written_sections_args(),
+            )
         else:
-            user_prompt = f"QUERY:\n{query}\n\nREPORT DRAFT:\n{report_draft.model_dump_json()}"
-            # Run the proofreader agent to produce the final report
-            final_report = await ResearchRunner.run(
-                proofreader_agent,
-                user_prompt
+            # Proofread the drafts in overlapping windows of sections concurrently and stitch them into the final report
+            final_output = await proofread_report(
+                query,
+                report_plan.report_title,
+                report_draft,
+                config=self.config,
+                window_size=self.proofread_window_size,
+                citation_index=self.citation_index,
             )
-            final_output = final_report.final_output
+            # The long writer streams the report as it writes each section, but the proofreader only has the whole report
+            await emit(ReportChunkEvent(text=final_output))
 
         self._log_message(f"Final report completed")
 
-        if self.tracing:
+        if self.trace_spans:
             span.finish(reset_current=True)
 
         return final_output
 
+    def _written_sections_args(self) -> dict:
+        """Arguments for the long writer to reuse the sections in the checkpoint and save each new one"""
+        if not self.checkpoint:
+            return {}
+        return {"written_sections": self.checkpoint.written_sections, "on_section_written": self._save_checkpoint}
+
     def _log_message(self, message: str) -> None:
-        """Log a message if verbose is True"""
-        if self.verbose:
+        """Emit a log message to the event stream of the run, or print it if verbose is True and there is no stream"""
+        if not emit_log(message) and self.verbose:
             print(message)
\ No newline at end of file
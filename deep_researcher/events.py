@@ -0,0 +1,245 @@
+"""
+Progress events of research runs, streamed while the run is in progress.
+
+`run_stream` on the IterativeResearcher and DeepResearcher runs the research in a background task and yields typed
+events as they happen: the report plan, the start of each iteration, the knowledge gap it addresses, each tool call as
+it starts and finishes, the findings it adds, each finished section draft, the text of the final report in chunks as it
+is written, and finally the whole report. Everything that used to be printed in verbose mode is also emitted (as a
+LogEvent if it has no event type of its own), and `run` prints the events of the stream when verbose is set.
+
+Events are passed to the consumer through a bounded queue. When the consumer falls behind and the queue is full, the
+research waits for it to catch up before emitting further typed events, so no progress is lost. Log messages are
+emitted from code that can't wait, so they are dropped instead (and counted) while the queue is full. If the consumer
+stops iterating, the research is cancelled.
+
+The stream is found through a context variable, so the research loops of all sections of a DeepResearcher emit into
+the stream of the run, with each event tagged with its section and iteration.
+"""
+import asyncio
+import sys
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, List, Literal, Optional, TextIO, Union
+from pydantic import BaseModel, Field
+from .stats import RunStats, get_scope
+
+MAX_QUEUED_EVENTS = 1000
+
+
+class ResearchEvent(BaseModel):
+    """Base class for the progress events of a research run"""
+    type: str
+    timestamp: float = Field(default_factory=time.time)
+    section: Optional[str] = None  # Section of the report that the event belongs to (None for the run as a whole)
+    iteration: Optional[int] = None  # Iteration of the section's research loop that the event belongs to
+
+
+class LogEvent(ResearchEvent):
+    """A progress message (printed in verbose mode)"""
+    type: Literal["log"] = "log"
+    message: str
+
+
+class PlanCreatedEvent(ResearchEvent):
+    """The report plan of a DeepResearcher run has been created"""
+    type: Literal["plan_created"] = "plan_created"
+    report_title: str
+    section_titles: List[str]
+    key_questions: List[str]
+    background_context: str = ""
+
+
+class IterationStartedEvent(ResearchEvent):
+    type: Literal["iteration_started"] = "iteration_started"
+
+
+class GapChosenEvent(ResearchEvent):
+    """The knowledge gap that an iteration will address"""
+    type: Literal["gap_chosen"] = "gap_chosen"
+    gap: str
+
+
+class ToolStartedEvent(ResearchEvent):
+    type: Literal["tool_started"] = "tool_started"
+    agent: str
+    query: str
+    entity_website: Optional[str] = None
+
+
+class ToolFinishedEvent(ResearchEvent):
+    type: Literal["tool_finished"] = "tool_finished"
+    agent: str
+    query: str
+    sources: List[str] = Field(default_factory=list)
+    reused: bool = False  # Whether the findings of the same call by another section were reused
+    failed: bool = False
+
+
+class FindingsAddedEvent(ResearchEvent):
+    """The findings of the tool calls of an iteration have been added to the research"""
+    type: Literal["findings_added"] = "findings_added"
+    findings: List[str]
+    novelty: Optional[float] = None  # Share of the findings that did not repeat earlier findings
+
+
+class SectionDoneEvent(ResearchEvent):
+    """The research loop of a section has finished and its draft is written"""
+    type: Literal["section_done"] = "section_done"
+    draft: str
+
+
+class ReportChunkEvent(ResearchEvent):
+    """The next piece of the final report, in order: the chunks of a run add up to the full report"""
+    type: Literal["report_chunk"] = "report_chunk"
+    text: str
+
+
+class ResearchDoneEvent(ResearchEvent):
+    """The run has finished; this is always the last event of a stream"""
+    type: Literal["research_done"] = "research_done"
+    report: str
+    stats: Optional[RunStats] = None
+
+
+AnyResearchEvent = Union[
+    LogEvent, PlanCreatedEvent, IterationStartedEvent, GapChosenEvent, ToolStartedEvent, ToolFinishedEvent,
+    FindingsAddedEvent, SectionDoneEvent, ReportChunkEvent, ResearchDoneEvent,
+]
+
+
+class EventStream:
+    """Bounded queue of the events of a run, read by the consumer of the stream"""
+
+    def __init__(self, max_queued_events: int = MAX_QUEUED_EVENTS):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued_events)
+        self.dropped_log_events: int = 0  # Log messages dropped because the consumer had fallen behind
+
+    async def emit(self, event: ResearchEvent) -> None:
+        """Add an event, waiting for room in the queue if the consumer has fallen behind"""
+        await self.queue.put(event)
+
+    def emit_nowait(self, event: ResearchEvent) -> bool:
+        """Add an event if there is room in the queue, returning whether it was added"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.dropped_log_events += 1
+            return False
+
+    async def iterate(self, producer: asyncio.Task) -> AsyncIterator[ResearchEvent]:
+        """Yield the events until the producer has finished, then raise its exception (if any)"""
+        while True:
+            next_event = asyncio.ensure_future(self.queue.get())
+            await asyncio.wait([next_event, producer], return_when=asyncio.FIRST_COMPLETED)
+            if next_event.done():
+                yield next_event.result()
+                continue
+            next_event.cancel()
+            break
+        while not self.queue.empty():
+            yield self.queue.get_nowait()
+        producer.result()
+
+
+_current_stream: ContextVar[Optional[EventStream]] = ContextVar("current_event_stream", default=None)
+
+
+def get_current_stream() -> Optional[EventStream]:
+    return _current_stream.get()
+
+
+def _tag(event: ResearchEvent) -> ResearchEvent:
+    if event.section is None and event.iteration is None:
+        event.section, event.iteration = get_scope()
+    return event
+
+
+async def emit(event: ResearchEvent) -> None:
+    """Emit an event to the stream of the current run (if any), tagged with the current section and iteration"""
+    stream = _current_stream.get()
+    if stream is not None:
+        await stream.emit(_tag(event))
+
+
+def emit_log(message: str) -> bool:
+    """Emit a log message to the stream of the current run, returning False if there is no stream to emit it to"""
+    stream = _current_stream.get()
+    if stream is None:
+        return False
+    stream.emit_nowait(_tag(LogEvent(message=message)))
+    return True
+
+
+async def stream_events(research: Awaitable[None], max_queued_events: int = MAX_QUEUED_EVENTS) -> AsyncIterator[ResearchEvent]:
+    """Run the research in a background task with a new event stream, yielding its events as they are emitted"""
+    stream = EventStream(max_queued_events)
+    # The task copies the current context, so the research (and every task it starts) emits into the new stream
+    token = _current_stream.set(stream)
+    try:
+        producer = asyncio.ensure_future(research)
+    finally:
+        _current_stream.reset(token)
+    try:
+        async for event in stream.iterate(producer):
+            yield event
+    finally:
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+
+def format_event(event: ResearchEvent) -> Optional[str]:
+    """Format an event as it is printed in verbose mode (None for events that aren't printed)"""
+    if isinstance(event, LogEvent):
+        return event.message
+    if isinstance(event, PlanCreatedEvent):
+        message_log = '\n\n'.join(
+            f"Section: {title}\nKey question: {question}" for title, question in zip(event.section_titles, event.key_questions)
+        )
+        if event.background_context:
+            message_log += f"\n\nThe following background context has been included for the report build:\n{event.background_context}"
+        else:
+            message_log += "\n\nNo background context was provided for the report build.\n"
+        return f"Report plan created with {len(event.section_titles)} sections:\n{message_log}"
+    if isinstance(event, IterationStartedEvent):
+        return f"\n=== Starting Iteration {event.iteration} ==="
+    if isinstance(event, GapChosenEvent):
+        return f"<task>\nAddress this knowledge gap: {event.gap}\n</task>"
+    if isinstance(event, ToolFinishedEvent) and event.reused:
+        return f"<reuse>\nReusing shared findings for {event.agent} query: {event.query}\n</reuse>"
+    if isinstance(event, FindingsAddedEvent) and event.novelty is not None:
+        return f"<novelty>\nShare of new information in findings: {event.novelty:.2f}\n</novelty>"
+    return None
+
+
+async def collect_report(events: AsyncIterator[ResearchEvent], verbose: bool = False) -> str:
+    """Consume a stream of events, printing them if verbose is set, and return the final report"""
+    report = None
+    async for event in events:
+        if verbose:
+            message = format_event(event)
+            if message is not None:
+                print(message)
+        if isinstance(event, ResearchDoneEvent):
+            report = event.report
+    return report
+
+
+async def write_report_chunks(events: AsyncIterator[ResearchEvent], output: TextIO, verbose: bool = False) -> str:
+    """
+    Consume a stream of events, writing the chunks of the report to output as they arrive, and return the final report.
+    If verbose is set the other events are printed, to stderr if the report is being written to stdout.
+    """
+    report = None
+    async for event in events:
+        if isinstance(event, ReportChunkEvent):
+            output.write(event.text)
+            output.flush()
+        elif verbose:
+            message = format_event(event)
+            if message is not None:
+                print(message, file=sys.stderr if output is sys.stdout else sys.stdout)
+        if isinstance(event, ResearchDoneEvent):
+            report = event.report
+    return report
@@ -0,0 +1,128 @@
+"""
+Freshness checks for the sources of a report, used to refresh a report by re-researching only its stale sections.
+
+While a run is being checkpointed, the ETag and Last-Modified headers of every page the tool agents fetch are collected
+into a SourceValidators map that is active in the current async context. The map is keyed by canonical URL (see
+`canonicalize_url`), as the sources that the tool agents report often differ from the fetched URL by scheme, trailing
+slash or tracking parameters. When the report is refreshed, each source is
+checked with a conditional HEAD request (If-None-Match / If-Modified-Since), falling back to a conditional GET for
+servers that don't allow HEAD. A 304 response, or a 200 response with the same validators, means the source has not
+changed. Sources that return an error are treated as changed, since the findings taken from them may no longer hold.
+Servers that give no validators and ignore conditional requests can't be checked, so their sections only go stale by
+age (see `max_age_days` in `DeepResearcher.refresh`).
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from email.utils import formatdate
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional
+from pydantic import BaseModel, Field
+from .agents.utils.citations import canonicalize_url
+
+if TYPE_CHECKING:
+    import aiohttp
+
+CHECK_TIMEOUT_SECONDS = 8
+MAX_CONCURRENT_CHECKS = 20
+
+
+class SourceValidator(BaseModel):
+    """Validators of a fetched source, used to check whether it has changed since"""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = Field(default_factory=time.time)
+
+
+class SourceCheck(BaseModel):
+    """Result of checking whether a source has changed"""
+    url: str
+    changed: Optional[bool]  # None if the server gave no way of telling
+    status: Optional[int] = None
+    error: Optional[str] = None
+
+
+_current_validators: ContextVar[Optional[Dict[str, SourceValidator]]] = ContextVar("current_validators", default=None)
+
+
+def collect_validators(validators: Dict[str, SourceValidator]):
+    """Record the validators of the pages fetched in the current async context into the given map"""
+    return _current_validators.set(validators)
+
+
+def stop_collecting_validators(token) -> None:
+    _current_validators.reset(token)
+
+
+def record_validators(url: str, headers: Mapping[str, str], final_url: Optional[str] = None) -> None:
+    """
+    Record the ETag and Last-Modified headers of a fetched page, if validators are being collected. If the request was
+    redirected, they are also recorded for the final URL, which may be the one the page is cited by.
+    """
+    validators = _current_validators.get()
+    if validators is not None:
+        validator = SourceValidator(etag=headers.get("ETag"), last_modified=headers.get("Last-Modified"))
+        for fetched_url in dict.fromkeys(filter(None, [url, final_url])):
+            validators[canonicalize_url(fetched_url)] = validator
+
+
+def get_validator(validators: Mapping[str, SourceValidator], url: str) -> Optional[SourceValidator]:
+    """Get the validators recorded for a source (checkpoints from before they were keyed by canonical URL use the URL as is)"""
+    return validators.get(canonicalize_url(url)) or validators.get(url)
+
+
+def _conditional_headers(validator: SourceValidator) -> Dict[str, str]:
+    if validator.etag:
+        return {"If-None-Match": validator.etag}
+    # Without a Last-Modified date, ask whether the page has changed since it was fetched
+    return {"If-Modified-Since": validator.last_modified or formatdate(validator.fetched_at, usegmt=True)}
+
+
+def _compare(url: str, status: int, headers: Mapping[str, str], validator: SourceValidator) -> SourceCheck:
+    if status == 304:
+        return SourceCheck(url=url, changed=False, status=status)
+    if status >= 400:
+        return SourceCheck(url=url, changed=True, status=status)
+    etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+    if validator.etag and etag:
+        return SourceCheck(url=url, changed=etag != validator.etag, status=status)
+    if validator.last_modified and last_modified:
+        return SourceCheck(url=url, changed=last_modified != validator.last_modified, status=status)
+    return SourceCheck(url=url, changed=None, status=status)
+
+
+async def check_source(session: "aiohttp.ClientSession", url: str, validator: Optional[SourceValidator]) -> SourceCheck:
+    """Check whether a source has changed since it was fetched, with a conditional HEAD (or GET) request"""
+    if validator is None:
+        return SourceCheck(url=url, changed=None)
+    headers = _conditional_headers(validator)
+    try:
+        async with session.head(url, headers=headers, timeout=CHECK_TIMEOUT_SECONDS, allow_redirects=True) as response:
+            status, response_headers = response.status, response.headers
+        if status in (405, 501):
+            # HEAD isn't supported, so use a GET - the body isn't read unless the page has changed
+            async with session.get(url, headers=headers, timeout=CHECK_TIMEOUT_SECONDS) as response:
+                status, response_headers = response.status, response.headers
+        return _compare(url, status, response_headers, validator)
+    except Exception as e:
+        return SourceCheck(url=url, changed=True, error=str(e) or type(e).__name__)
+
+
+async def check_sources(
+    urls: Iterable[str],
+    validators: Dict[str, SourceValidator],
+    max_concurrent: int = MAX_CONCURRENT_CHECKS,
+) -> Dict[str, SourceCheck]:
+    """Check a set of sources concurrently, returning the result of the check for each URL"""
+    import aiohttp
+    from .tools.web_search import get_ssl_context
+
+    urls = list(dict.fromkeys(urls))
+    semaphore = asyncio.Semaphore(max_concurrent)
+    connector = aiohttp.TCPConnector(ssl=get_ssl_context())
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def check(url: str) -> SourceCheck:
+            async with semaphore:
+                return await check_source(session, url, validators.get(url))
+
+        results: List[SourceCheck] = await asyncio.gather(*(check(url) for url in urls))
+    return {result.url: result for result in results}
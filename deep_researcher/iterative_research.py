@@ -1,23 +1,38 @@
 from __future__ import annotations
 import asyncio
 import time
-from typing import Dict, List, Optional
-from agents import custom_span, gen_trace_id, trace
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+from agents import custom_span, gen_trace_id, get_current_trace, trace
 from .agents.baseclass import ResearchRunner
-from .agents.writer_agent import writer_agent
-from .agents.knowledge_gap_agent import KnowledgeGapOutput, knowledge_gap_agent
-from .agents.tool_selector_agent import AgentTask, AgentSelectionPlan, tool_selector_agent
-from .agents.thinking_agent import thinking_agent
-from .agents.tool_agents import TOOL_AGENTS, ToolAgentOutput
+from .agents.writer_agent import init_writer_agent
+from .agents.knowledge_gap_agent import KnowledgeGapOutput, init_knowledge_gap_agent
+from .agents.tool_selector_agent import AgentTask, AgentSelectionPlan, init_tool_selector_agent
+from .agents.thinking_agent import init_thinking_agent
+from .agents.tool_agents import ToolAgentOutput, init_tool_agents
+from .agents.utils.prompts import PromptSection, build_prompt, get_token_usage
+from .blackboard import FindingsBlackboard
+from .budget import SectionBudget
+from .events import (
+    MAX_QUEUED_EVENTS, FindingsAddedEvent, GapChosenEvent, IterationStartedEvent, ReportChunkEvent, ResearchDoneEvent,
+    ResearchEvent, ToolFinishedEvent, ToolStartedEvent, collect_report, emit, emit_log, get_current_stream, stream_events
+)
+from .llm_client import LLMConfig, get_default_config
+from .novelty import NoveltyDetector
+from .profiling import profiling_enabled
+from .stats import RunStats, SectionStats, get_current_stats, reset_scope, set_scope
 from pydantic import BaseModel, Field
 
+if TYPE_CHECKING:
+    from .checkpoint import SectionCheckpoint
+
 
 class IterationData(BaseModel):
     """Data for a single iteration of the research loop."""
-    gap: str = Field(description="The gap addressed in the iteration", default_factory=list)
+    gap: str = Field(description="The gap addressed in the iteration", default="")
     tool_calls: List[str] = Field(description="The tool calls made", default_factory=list)
     findings: List[str] = Field(description="The findings collected from tool calls", default_factory=list)
-    thought: List[str] = Field(description="The thinking done to reflect on the success of the iteration and next steps", default_factory=list)
+    thought: str = Field(description="The thinking done to reflect on the success of the iteration and next steps", default="")
+    novelty: Optional[float] = Field(description="Share of the findings that did not repeat findings from previous iterations", default=None)
 
 
 class Conversation(BaseModel):
@@ -41,6 +56,9 @@ class Conversation(BaseModel):
     def set_latest_thought(self, thought: str):
         self.history[-1].thought = thought
 
+    def set_latest_novelty(self, novelty: float):
+        self.history[-1].novelty = novelty
+
     def get_latest_gap(self) -> str:
         return self.history[-1].gap
     
@@ -126,7 +144,15 @@ class IterativeResearcher:
         max_iterations: int = 5,
         max_time_minutes: int = 10,
         verbose: bool = True,
-        tracing: bool = False
+        tracing: bool = False,
+        budget: Optional[SectionBudget] = None,
+        min_novelty: float = 0.0,
+        novelty_patience: int = 1,
+        config: Optional[LLMConfig] = None,
+        blackboard: Optional[FindingsBlackboard] = None,
+        checkpoint: Optional[SectionCheckpoint] = None,
+        on_checkpoint: Optional[Callable[[], None]] = None,
+        stream_report: bool = False
     ):
         self.max_iterations: int = max_iterations
         self.max_time_minutes: int = max_time_minutes
@@ -136,6 +162,28 @@ class IterativeResearcher:
         self.should_continue: bool = True
         self.verbose: bool = verbose
         self.tracing: bool = tracing
+        self.budget: Optional[SectionBudget] = budget  # If set, the iteration and time limits are drawn from a shared budget
+        self.min_novelty: float = min_novelty  # Stop once the findings of an iteration are less novel than this (0 = disabled)
+        self.novelty_patience: int = novelty_patience  # Number of consecutive low-novelty iterations before stopping
+        self.novelty_detector: NoveltyDetector = NoveltyDetector()
+        self.input_tokens: int = 0  # Input tokens sent to the research loop agents
+        self.cached_input_tokens: int = 0  # Input tokens that were served from the provider's prompt cache
+        self.sources: List[str] = []  # URLs of all sources retrieved by the tool agents, used to validate citations
+        self.blackboard: Optional[FindingsBlackboard] = blackboard  # If set, tool outputs are shared with the other sections of the report
+        self.reused_tool_calls: int = 0  # Tool calls answered from the blackboard instead of running the tool agent
+        self.stats: Optional[RunStats] = None  # Token, cost and latency accounting (shared with the DeepResearcher if run as a section)
+        self.checkpoint: Optional[SectionCheckpoint] = checkpoint  # If set, the research loop resumes from it and records its progress in it
+        self.on_checkpoint: Optional[Callable[[], None]] = on_checkpoint  # Called to save the checkpoint after each step
+        self.stream_report: bool = stream_report  # Emit the final report to the event stream token by token as the writer generates it
+
+        # Agents are created from the LLM config, so that researchers with different configs can run in the same process.
+        # They are built once per config and shared by its researchers (e.g. all sections of a DeepResearcher)
+        self.config: LLMConfig = config or get_default_config()
+        self.knowledge_gap_agent = self.config.get_agent("KnowledgeGapAgent", init_knowledge_gap_agent)
+        self.tool_selector_agent = self.config.get_agent("ToolSelectorAgent", init_tool_selector_agent)
+        self.thinking_agent = self.config.get_agent("ThinkingAgent", init_thinking_agent)
+        self.writer_agent = self.config.get_agent("WriterAgent", init_writer_agent)
+        self.tool_agents = self.config.get_agent("ToolAgents", init_tool_agents)
         
     async def run(
             self, 
@@ -143,22 +191,88 @@ class IterativeResearcher:
             output_length: str = "",  # A text description of the desired output length, can be left blank
             output_instructions: str = "",  # Instructions for the final report (e.g. don't include any headings, just a couple of paragraphs of text)
             background_context: str = "",
-        ) -> str:
+            return_stats: bool = False,  # If True, return a tuple of the report and the RunStats for the run
+        ) -> Union[str, Tuple[str, RunStats]]:
         """Run the deep research workflow for a given query."""
-        self.start_time = time.time()
+        if get_current_stream() is not None:
+            # This is part of a larger run (e.g. a section of a DeepResearcher), whose stream gets the events
+            report = await self._run_with_stats(query, output_length, output_instructions, background_context)
+        else:
+            report = await collect_report(
+                self.run_stream(query, output_length, output_instructions, background_context), verbose=self.verbose
+            )
+        return (report, self.stats) if return_stats else report
 
-        if self.tracing:
-            trace_id = gen_trace_id()
-            workflow_trace = trace("iterative_researcher", trace_id=trace_id)
-            print(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
-            workflow_trace.start(mark_as_current=True)
+    async def run_stream(
+            self,
+            query: str,
+            output_length: str = "",
+            output_instructions: str = "",
+            background_context: str = "",
+            max_queued_events: int = MAX_QUEUED_EVENTS,
+        ) -> AsyncIterator[ResearchEvent]:
+        """Run the research workflow for a given query, yielding its progress events (see events.py) as they happen."""
+        async def research() -> None:
+            report = await self._run_with_stats(
+                query, output_length, output_instructions, background_context, stream_report=self.stream_report
+            )
+            if not self.stream_report:
+                await emit(ReportChunkEvent(text=report))
+            await emit(ResearchDoneEvent(report=report, stats=self.stats))
+
+        async for event in stream_events(research(), max_queued_events):
+            yield event
+
+    async def _run_with_stats(
+            self,
+            query: str,
+            output_length: str,
+            output_instructions: str,
+            background_context: str,
+            stream_report: bool = False,
+        ) -> str:
+        """Run the research, recording its LLM calls in the stats of the run"""
+        # Record the LLM calls of the run against the stats of the DeepResearcher if this is a section of a report
+        self.stats = get_current_stats()
+        stats_token = None
+        if self.stats is None:
+            self.stats = RunStats()
+            stats_token = self.stats.activate()
+        section_name = self.budget.name if self.budget else "research"
+        scope_token = set_scope(section_name)
+        workflow_trace = self._start_trace()
+        try:
+            report = await self._run(query, output_length, output_instructions, background_context, section_name, stream_report)
+        finally:
+            if workflow_trace is not None:
+                workflow_trace.finish(reset_current=True)
+            reset_scope(scope_token)
+            if stats_token is not None:
+                RunStats.deactivate(stats_token)
+                self.stats.finish()
+        return report
+
+    async def _run(
+            self,
+            query: str,
+            output_length: str,
+            output_instructions: str,
+            background_context: str,
+            section_name: str,
+            stream_report: bool = False,
+        ) -> str:
+        """Run the research loop and write the final report, tagging LLM calls with the section and iteration"""
+        self.start_time = time.time()
 
         self._log_message("=== Starting Iterative Research Workflow ===")
+        if self.checkpoint is not None and self.checkpoint.iterations:
+            self._restore_checkpoint()
         
         # Iterative research loop
         while self.should_continue and self._check_constraints():
             self.iteration += 1
-            self._log_message(f"\n=== Starting Iteration {self.iteration} ===")
+            set_scope(section_name, self.iteration)
+            await emit(IterationStartedEvent())
 
             # Set up blank IterationData for this iteration
             self.conversation.add_iteration()
@@ -178,23 +292,96 @@ class IterativeResearcher:
 
                 # 4. Run the selected agents to gather information
                 results: Dict[str, ToolAgentOutput] = await self._execute_tools(selection_plan.tasks)
+
+                # 5. Stop early if the new findings mostly repeat what we already know
+                stalled = self._findings_stalled()
+                await emit(FindingsAddedEvent(
+                    findings=self.conversation.get_latest_findings(), novelty=self.conversation.history[-1].novelty
+                ))
+                if stalled:
+                    self.should_continue = False
+                    self._log_message("=== IterativeResearcher Stopped Finding New Information - Finalizing Output ===")
             else:
                 self.should_continue = False
                 self._log_message("=== IterativeResearcher Marked As Complete - Finalizing Output ===")
+
+            self._save_checkpoint()
         
+        # Return any unused iterations and time to the shared budget so that other sections can use them
+        if self.budget:
+            self.budget.release(self.iteration, (time.time() - self.start_time) / 60)
+
         # Create final report
-        report = await self._create_final_report(query, length=output_length, instructions=output_instructions)
+        set_scope(section_name)
+        if self.checkpoint is not None and not self.checkpoint.research_complete:
+            self._save_checkpoint(research_complete=True)
+        if stream_report:
+            report = await self._stream_final_report(query, length=output_length, instructions=output_instructions)
+        else:
+            report = await self._create_final_report(query, length=output_length, instructions=output_instructions)
+        if self.checkpoint is not None:
+            self.checkpoint.draft = report
+            self.checkpoint.researched_at = time.time()
+            self._save_checkpoint(research_complete=True)
         
         elapsed_time = time.time() - self.start_time
         self._log_message(f"IterativeResearcher completed in {int(elapsed_time // 60)} minutes and {int(elapsed_time % 60)} seconds after {self.iteration} iterations.")
-        
-        if self.tracing:
-            workflow_trace.finish(reset_current=True)
+        if self.input_tokens:
+            self._log_message(f"Prompt cache: {self.cached_input_tokens} of {self.input_tokens} input tokens were cached ({self.cached_input_tokens / self.input_tokens:.0%})")
+        if self.reused_tool_calls:
+            self._log_message(f"Reused the findings of {self.reused_tool_calls} tool calls that were already run for this report")
+        if self.novelty_detector.scores:
+            self._log_message(f"Novelty of findings by iteration: {', '.join(f'{score:.2f}' for score in self.novelty_detector.scores)}")
+        self.stats.sections.append(SectionStats(
+            name=section_name,
+            iterations=self.iteration,
+            elapsed_seconds=elapsed_time,
+            novelty_scores=self.novelty_detector.scores,
+            reused_tool_calls=self.reused_tool_calls,
+        ))
 
         return report
+
+    def _start_trace(self):
+        """When tracing or profiling, start a trace unless the researcher is running as part of a DeepResearcher trace"""
+        if not (self.tracing or (profiling_enabled() and get_current_trace() is None)):
+            return None
+        trace_id = gen_trace_id()
+        workflow_trace = trace("iterative_researcher", trace_id=trace_id)
+        if self.tracing:
+            print(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
+        workflow_trace.start(mark_as_current=True)
+        return workflow_trace
     
+    def _restore_checkpoint(self) -> None:
+        """Pick up the research loop after the last iteration saved in the checkpoint"""
+        self.conversation.history = list(self.checkpoint.iterations)
+        self.iteration = len(self.conversation.history)
+        self.sources = list(self.checkpoint.sources)
+        for iteration_data in self.conversation.history:
+            self.novelty_detector.add(iteration_data.findings)
+        self.should_continue = not self.checkpoint.research_complete
+        self._log_message(f"Resuming from checkpoint after {self.iteration} completed iterations")
+
+    def _save_checkpoint(self, research_complete: bool = False) -> None:
+        """Record the completed iterations in the checkpoint and save it"""
+        if self.checkpoint is None:
+            return
+        self.checkpoint.iterations = list(self.conversation.history)
+        self.checkpoint.sources = list(self.sources)
+        self.checkpoint.research_complete = research_complete or not self.should_continue
+        if self.on_checkpoint:
+            self.on_checkpoint()
+
     def _check_constraints(self) -> bool:
         """Check if we've exceeded our constraints (max iterations or time)."""
+        if self.budget:
+            can_continue, reason = self.budget.can_continue(self.iteration, (time.time() - self.start_time) / 60)
+            if not can_continue:
+                self._log_message("\n=== Ending Research Loop ===")
+                self._log_message(reason)
+            return can_continue
+
         if self.iteration >= self.max_iterations:
             self._log_message("\n=== Ending Research Loop ===")
             self._log_message(f"Reached maximum iterations ({self.max_iterations})")
@@ -208,6 +395,17 @@ class IterativeResearcher:
         
         return True
     
+    def _findings_stalled(self) -> bool:
+        """Score the novelty of the latest findings and check whether the last few iterations have added little that is new."""
+        novelty = self.novelty_detector.add(self.conversation.get_latest_findings())
+        self.conversation.set_latest_novelty(novelty)
+
+        if self.min_novelty <= 0:
+            return False
+        # The first iteration is always novel, so only look at the scores from later iterations
+        recent_scores = self.novelty_detector.scores[1:][-self.novelty_patience:]
+        return len(recent_scores) >= self.novelty_patience and all(score < self.min_novelty for score in recent_scores)
+
     async def _evaluate_gaps(
         self, 
         query: str,
@@ -215,32 +413,26 @@ class IterativeResearcher:
     ) -> KnowledgeGapOutput:
         """Evaluate the current state of research and identify knowledge gaps."""
 
-        background = f"BACKGROUND CONTEXT:\n{background_context}" if background_context else ""
-
-        input_str = f"""
-        Current Iteration Number: {self.iteration}
-        Time Elapsed: {(time.time() - self.start_time) / 60:.2f} minutes of maximum {self.max_time_minutes} minutes
-
-        ORIGINAL QUERY:
-        {query}
-
-        {background}
-
-        HISTORY OF ACTIONS, FINDINGS AND THOUGHTS:
-        {self.conversation.compile_conversation_history() or "No previous actions, findings or thoughts available."}        
-        """
+        input_str = build_prompt(
+            self._stable_prompt_sections(query, background_context),
+            [
+                ("CURRENT ITERATION NUMBER", str(self.iteration)),
+                ("TIME ELAPSED", f"{(time.time() - self.start_time) / 60:.2f} minutes of maximum {self.budget.max_time_minutes if self.budget else self.max_time_minutes} minutes"),
+            ]
+        )
 
         result = await ResearchRunner.run(
-            knowledge_gap_agent,
+            self.knowledge_gap_agent,
             input_str,
         )
+        self._record_token_usage(result)
         
         evaluation = result.final_output_as(KnowledgeGapOutput)
 
         if not evaluation.research_complete:
             next_gap = evaluation.outstanding_gaps[0]
             self.conversation.set_latest_gap(next_gap)
-            self._log_message(self.conversation.latest_task_string())
+            await emit(GapChosenEvent(gap=next_gap))
         
         return evaluation
     
@@ -252,25 +444,16 @@ class IterativeResearcher:
     ) -> AgentSelectionPlan:
         """Select agents to address the identified knowledge gap."""
         
-        background = f"BACKGROUND CONTEXT:\n{background_context}" if background_context else ""
-
-        input_str = f"""
-        ORIGINAL QUERY:
-        {query}
-
-        KNOWLEDGE GAP TO ADDRESS:
-        {gap}
-
-        {background}
-
-        HISTORY OF ACTIONS, FINDINGS AND THOUGHTS:
-        {self.conversation.compile_conversation_history() or "No previous actions, findings or thoughts available."}
-        """
+        input_str = build_prompt(
+            self._stable_prompt_sections(query, background_context),
+            [("KNOWLEDGE GAP TO ADDRESS", gap)]
+        )
         
         result = await ResearchRunner.run(
-            tool_selector_agent,
+            self.tool_selector_agent,
             input_str,
         )
+        self._record_token_usage(result)
         
         selection_plan = result.final_output_as(AgentSelectionPlan)
 
@@ -303,54 +486,58 @@ class IterativeResearcher:
             findings = []
             for tool_output in results.values():
                 findings.append(tool_output.output)
+                self.sources.extend(tool_output.sources)
             self.conversation.set_latest_findings(findings)
 
             return results
     
     async def _run_agent_task(self, task: AgentTask) -> tuple[str, str, ToolAgentOutput]:
-        """Run a single agent task and return the result."""
+        """Run a single agent task and return the result, reusing the findings of another section if possible."""
+        await emit(ToolStartedEvent(agent=task.agent, query=task.query, entity_website=task.entity_website))
+        reused = False
         try:
-            agent_name = task.agent
-            agent = TOOL_AGENTS.get(agent_name)
-            if agent:
-                result = await ResearchRunner.run(
-                    agent,
-                    task.model_dump_json(),
-                )
-                # Extract ToolAgentOutput from RunResult
-                output = result.final_output_as(ToolAgentOutput)
+            if self.blackboard is None or task.agent not in self.tool_agents:
+                output = await self._run_tool_agent(task)
             else:
-                output = ToolAgentOutput(
-                    output=f"No implementation found for agent {agent_name}",
-                    sources=[]
+                output, reused = await self.blackboard.run_task(
+                    task, lambda: self._run_tool_agent(task), section=self.budget.name if self.budget else ""
                 )
-            
-            return task.gap, agent_name, output
+                if reused:
+                    self.reused_tool_calls += 1
         except Exception as e:
             error_output = ToolAgentOutput(
                 output=f"Error executing {task.agent} for gap '{task.gap}': {str(e)}",
                 sources=[]
             )
+            await emit(ToolFinishedEvent(agent=task.agent, query=task.query, failed=True))
             return task.gap, task.agent, error_output
+        await emit(ToolFinishedEvent(agent=task.agent, query=task.query, sources=output.sources, reused=reused))
+        return task.gap, task.agent, output
+
+    async def _run_tool_agent(self, task: AgentTask) -> ToolAgentOutput:
+        """Run the tool agent for a task"""
+        agent = self.tool_agents.get(task.agent)
+        if not agent:
+            return ToolAgentOutput(
+                output=f"No implementation found for agent {task.agent}",
+                sources=[]
+            )
+        result = await ResearchRunner.run(
+            agent,
+            task.model_dump_json(),
+        )
+        # Extract ToolAgentOutput from RunResult
+        return result.final_output_as(ToolAgentOutput)
         
     async def _generate_observations(self, query: str, background_context: str = "") -> str:
         """Generate observations from the current state of the research."""
                 
-        background = f"BACKGROUND CONTEXT:\n{background_context}" if background_context else ""
-
-        input_str = f"""
-        ORIGINAL QUERY:
-        {query}
-
-        {background}
-
-        HISTORY OF ACTIONS, FINDINGS AND THOUGHTS:
-        {self.conversation.compile_conversation_history() or "No previous actions, findings or thoughts available."}
-        """
+        input_str = build_prompt(self._stable_prompt_sections(query, background_context))
         result = await ResearchRunner.run(
-            thinking_agent,
+            self.thinking_agent,
             input_str,
         )
+        self._record_token_usage(result)
 
         # Add the observations to the conversation
         observations = result.final_output
@@ -358,6 +545,23 @@ class IterativeResearcher:
         self._log_message(self.conversation.latest_thought_string())
         return observations
 
+    def _stable_prompt_sections(self, query: str, background_context: str = "") -> List[PromptSection]:
+        """
+        The sections shared by the prompts of all agents in the research loop. These go first in every prompt and only
+        grow by appending from one iteration to the next, so the providers can reuse their cached prompt prefix.
+        """
+        return [
+            ("ORIGINAL QUERY", query),
+            ("BACKGROUND CONTEXT", background_context),
+            ("HISTORY OF ACTIONS, FINDINGS AND THOUGHTS", self.conversation.compile_conversation_history() or "No previous actions, findings or thoughts available."),
+        ]
+
+    def _record_token_usage(self, result) -> None:
+        """Keep track of how many of the input tokens of the research loop agents were served from the prompt cache"""
+        input_tokens, cached_tokens = get_token_usage(result)
+        self.input_tokens += input_tokens
+        self.cached_input_tokens += cached_tokens
+
     async def _create_final_report(
         self, 
         query: str,
@@ -367,13 +571,48 @@ class IterativeResearcher:
         """Create the final response from the completed draft."""
         self._log_message("=== Drafting Final Response ===")
 
+        result = await ResearchRunner.run(
+            self.writer_agent,
+            self._final_report_input(query, length, instructions),
+        )
+        
+        self._log_message("Final response from IterativeResearcher created successfully")
+        
+        return result.final_output
+
+    async def _stream_final_report(self, query: str, length: str = "", instructions: str = "") -> str:
+        """Create the final response like _create_final_report, emitting it to the event stream as the writer generates it"""
+        self._log_message("=== Drafting Final Response ===")
+        streamed_text = []
+
+        async def on_text_delta(delta: str) -> None:
+            streamed_text.append(delta)
+            await emit(ReportChunkEvent(text=delta))
+
+        result = await ResearchRunner.run_streamed_text(
+            self.writer_agent, self._final_report_input(query, length, instructions), on_text_delta
+        )
+        # The chunks must add up to the report, so emit anything the deltas didn't cover
+        streamed = ''.join(streamed_text)
+        if result.final_output.startswith(streamed):
+            if len(result.final_output) > len(streamed):
+                await emit(ReportChunkEvent(text=result.final_output[len(streamed):]))
+        else:
+            self._log_message("Streamed text of the final response does not match the final output of the writer")
+
+        self._log_message("Final response from IterativeResearcher created successfully")
+
+        return result.final_output
+
+    def _final_report_input(self, query: str, length: str, instructions: str) -> str:
+        """Build the input for the writer agent from the query, the guidelines for the report and all findings"""
         length_str = f"* The full response should be approximately {length}.\n" if length else ""
         instructions_str = f"* {instructions}" if instructions else ""
         guidelines_str = ("\n\nGUIDELINES:\n" + length_str + instructions_str).strip('\n') if length or instructions else ""
 
         all_findings = '\n\n'.join(self.conversation.get_all_findings()) or "No findings available yet."
 
-        input_str = f"""
+        return f"""
         Provide a response based on the query and findings below with as much detail as possible. {guidelines_str}
 
         QUERY: {query}
@@ -381,17 +620,8 @@ class IterativeResearcher:
         FINDINGS:
         {all_findings}
         """
-
-        result = await ResearchRunner.run(
-            writer_agent,
-            input_str,
-        )
-        
-        self._log_message("Final response from IterativeResearcher created successfully")
-        
-        return result.final_output
     
     def _log_message(self, message: str) -> None:
-        """Log a message if verbose is True"""
-        if self.verbose:
+        """Emit a log message to the event stream of the run, or print it if verbose is True and there is no stream"""
+        if not emit_log(message) and self.verbose:
             print(message)
\ No newline at end of file
@@ -1,9 +1,15 @@
+import asyncio
 import os
-from typing import Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple, Union
 from openai import AsyncOpenAI
 from agents import OpenAIChatCompletionsModel, OpenAIResponsesModel, set_tracing_export_api_key, set_tracing_disabled
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    import aiohttp
+    import httpx
+
+# The .env file is loaded once here, before any settings are read from the environment
 load_dotenv(override=True)
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -21,6 +27,14 @@ MAIN_MODEL_PROVIDER=os.getenv("MAIN_MODEL_PROVIDER", "openai")
 MAIN_MODEL=os.getenv("MAIN_MODEL", "gpt-4o")
 FAST_MODEL_PROVIDER=os.getenv("FAST_MODEL_PROVIDER", "openai")
 FAST_MODEL=os.getenv("FAST_MODEL", "gpt-4o-mini")
+BACKUP_MODEL_PROVIDER=os.getenv("BACKUP_MODEL_PROVIDER")  # Optional model to fail over to while a provider is down
+BACKUP_MODEL=os.getenv("BACKUP_MODEL")
+SEARCH_PROVIDER=os.getenv("SEARCH_PROVIDER", "serper").lower()
+
+# Connection pool settings shared by all clients that talk to the same provider endpoint
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
 
 supported_providers = ["openai", "deepseek", "openrouter", "gemini", "anthropic", "perplexity", "huggingface", "local"]
 
@@ -67,12 +81,170 @@ provider_mapping = {
     }
 }
 
-if REASONING_MODEL_PROVIDER not in supported_providers:
-    raise ValueError(f"Invalid model provider: {REASONING_MODEL_PROVIDER}")
-if MAIN_MODEL_PROVIDER not in supported_providers:
-    raise ValueError(f"Invalid model provider: {MAIN_MODEL_PROVIDER}")
-if FAST_MODEL_PROVIDER not in supported_providers:
-    raise ValueError(f"Invalid model provider: {FAST_MODEL_PROVIDER}")
+def http2_available() -> bool:
+    """HTTP/2 support for httpx needs the h2 package (installed with httpx[http2], which is in the requirements)"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ClientRegistry:
+    """
+    Registry of AsyncOpenAI clients that are shared across models, agents and research jobs.
+
+    Clients are keyed by (provider, base_url, api_key), so the reasoning, main and fast models share a single client if
+    they use the same provider. All clients that talk to the same endpoint (e.g. for different API keys) also share one
+    httpx connection pool, which uses HTTP/2 where available and keeps connections alive between calls. Web searches,
+    scrapes and crawls share one aiohttp session (see get_http_session), and so one pool of connections to websites.
+
+    The pooled httpx connections are tied to the event loop that opened them, so the clients of a registry should only
+    be used from one event loop (e.g. a single asyncio.run, as in the CLI, batch and service entry points). Call aclose()
+    from that loop once it is done with them.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive_connections: int = LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY,
+        http2: Optional[bool] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2  # Defaults to using HTTP/2 if it is available (checked when the first client is created)
+        self.clients: Dict[Tuple[str, Optional[str], Optional[str]], AsyncOpenAI] = {}
+        self.http_clients: Dict[Optional[str], "httpx.AsyncClient"] = {}
+        self.http_session: Optional["aiohttp.ClientSession"] = None
+        self.http_session_loop: Optional[asyncio.AbstractEventLoop] = None  # The event loop the session belongs to
+
+    def get_client(self, provider: str, base_url: Optional[str] = None, api_key: Optional[str] = None) -> AsyncOpenAI:
+        """Get the shared client for a provider, creating it on first use"""
+        key = (provider, base_url, api_key)
+        if key not in self.clients:
+            if base_url not in self.http_clients:
+                import httpx
+                if self.http2 is None:
+                    self.http2 = http2_available()
+                self.http_clients[base_url] = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive_connections,
+                        keepalive_expiry=self.keepalive_expiry,
+                    ),
+                    http2=self.http2,
+                    timeout=httpx.Timeout(600.0, connect=10.0),
+                    follow_redirects=True,
+                )
+            self.clients[key] = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=self.http_clients[base_url],
+            )
+        return self.clients[key]
+
+    def get_http_session(self) -> "aiohttp.ClientSession":
+        """
+        Get the aiohttp session for web searches, scrapes and crawls, creating it on first use. The session belongs to
+        the running event loop, so a new one is created if it is used from another loop (e.g. a later asyncio.run).
+        """
+        import aiohttp
+        from .tools.web_search import get_ssl_context
+        loop = asyncio.get_running_loop()
+        if self.http_session is None or self.http_session.closed or self.http_session_loop is not loop:
+            if self.http_session is not None and not self.http_session.closed:
+                # A session of another loop can't be closed from this one, it is only let go of
+                self.http_session.detach()
+            connector = aiohttp.TCPConnector(ssl=get_ssl_context(), limit=self.max_connections)
+            self.http_session = aiohttp.ClientSession(connector=connector)
+            self.http_session_loop = loop
+        return self.http_session
+
+    async def prewarm(self) -> None:
+        """Open a connection to each registered endpoint ahead of the first LLM call (failures are ignored)"""
+        async def warm(client: AsyncOpenAI):
+            try:
+                await client._client.head(str(client.base_url), timeout=5.0)
+            except Exception:
+                pass
+        await asyncio.gather(*(warm(client) for client in self.clients.values()))
+
+    async def aclose(self) -> None:
+        """Close all of the connection pools"""
+        await asyncio.gather(*(http_client.aclose() for http_client in self.http_clients.values()))
+        self.clients.clear()
+        self.http_clients.clear()
+        if self.http_session is not None and self.http_session_loop is asyncio.get_running_loop():
+            await self.http_session.close()
+        self.http_session = None
+        self.http_session_loop = None
+
+
+client_registry = ClientRegistry()
+
+
+class LLMConfig:
+    """
+    Model configuration for a research job: the provider and model name for each of the reasoning, main and fast models
+    (plus an optional backup model) and the search provider. API keys and base URLs default to the values from the
+    environment, but can be overridden per config so that one process can serve jobs for different providers/accounts.
+    All models are created through the shared ClientRegistry, so configs that use the same provider share connections.
+    Agents built from a config are cached on it (see get_agent), so researchers that use the same config share them.
+    """
+
+    def __init__(
+        self,
+        reasoning_model_provider: str = REASONING_MODEL_PROVIDER,
+        reasoning_model: str = REASONING_MODEL,
+        main_model_provider: str = MAIN_MODEL_PROVIDER,
+        main_model: str = MAIN_MODEL,
+        fast_model_provider: str = FAST_MODEL_PROVIDER,
+        fast_model: str = FAST_MODEL,
+        backup_model_provider: Optional[str] = BACKUP_MODEL_PROVIDER,
+        backup_model: Optional[str] = BACKUP_MODEL,
+        search_provider: str = SEARCH_PROVIDER,
+        api_keys: Optional[Dict[str, str]] = None,
+        base_urls: Optional[Dict[str, str]] = None,
+        registry: Optional[ClientRegistry] = None,
+    ):
+        for provider in [reasoning_model_provider, main_model_provider, fast_model_provider, backup_model_provider]:
+            if provider and provider not in supported_providers:
+                raise ValueError(f"Invalid model provider: {provider}")
+
+        self.search_provider = search_provider
+        self.api_keys = api_keys or {}
+        self.base_urls = base_urls or {}
+        self.registry = registry or client_registry
+
+        self.reasoning_model = self.create_model(reasoning_model_provider, reasoning_model)
+        self.main_model = self.create_model(main_model_provider, main_model)
+        self.fast_model = self.create_model(fast_model_provider, fast_model)
+        self.backup_model = None
+        if backup_model_provider and backup_model:
+            self.backup_model = self.create_model(backup_model_provider, backup_model)
+
+        self.agents: Dict[str, Any] = {}  # Agents, tool sets and API clients built from this config, keyed by name
+
+    def get_agent(self, name: str, factory: Callable[["LLMConfig"], Any]) -> Any:
+        """Get the agent with the given name, building it with factory(config) on first use"""
+        if name not in self.agents:
+            self.agents[name] = factory(self)
+        return self.agents[name]
+
+    def create_model(self, provider: str, model_name: str) -> Union[OpenAIChatCompletionsModel, OpenAIResponsesModel]:
+        """Create a model for the given provider using a client from the shared registry"""
+        client = self.registry.get_client(
+            provider,
+            base_url=self.base_urls.get(provider, provider_mapping[provider]["base_url"]),
+            api_key=self.api_keys.get(provider, provider_mapping[provider]["api_key"]),
+        )
+        return provider_mapping[provider]["model"](
+            model=model_name,
+            openai_client=client
+        )
+
 
 if OPENAI_API_KEY:
     set_tracing_export_api_key(OPENAI_API_KEY)
@@ -80,41 +252,26 @@ else:
     # If no OpenAI API key is provided, disable tracing
     set_tracing_disabled(True)
 
-# ------- SET UP REASONING MODEL -------
-
-reasoning_client = AsyncOpenAI(
-    api_key=provider_mapping[REASONING_MODEL_PROVIDER]["api_key"],
-    base_url=provider_mapping[REASONING_MODEL_PROVIDER]["base_url"],
-)
-
-reasoning_model = provider_mapping[REASONING_MODEL_PROVIDER]["model"](
-    model=REASONING_MODEL,
-    openai_client=reasoning_client
-)
-
-# ------- SET UP MAIN MODEL -------
+# ------- SET UP DEFAULT MODELS FROM THE ENVIRONMENT -------
 
-main_client = AsyncOpenAI(
-    api_key=provider_mapping[MAIN_MODEL_PROVIDER]["api_key"],
-    base_url=provider_mapping[MAIN_MODEL_PROVIDER]["base_url"],
-)
+_default_config: Optional[LLMConfig] = None
 
-main_model = provider_mapping[MAIN_MODEL_PROVIDER]["model"](
-    model=MAIN_MODEL,
-    openai_client=main_client
-)
 
-# ------- SET UP FAST MODEL -------
+def get_default_config() -> LLMConfig:
+    """Get the config for the models set in the environment, creating it on first use"""
+    global _default_config
+    if _default_config is None:
+        _default_config = LLMConfig()
+    return _default_config
 
-fast_client = AsyncOpenAI(
-    api_key=provider_mapping[FAST_MODEL_PROVIDER]["api_key"],
-    base_url=provider_mapping[FAST_MODEL_PROVIDER]["base_url"],
-)
 
-fast_model = provider_mapping[FAST_MODEL_PROVIDER]["model"](
-    model=FAST_MODEL,
-    openai_client=fast_client
-)
+def __getattr__(name: str):
+    # The default config and models are created lazily, so that importing this module doesn't set up any clients
+    if name == "default_config":
+        return get_default_config()
+    if name in ("reasoning_model", "main_model", "fast_model", "backup_model"):
+        return getattr(get_default_config(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_base_url(model: Union[OpenAIChatCompletionsModel, OpenAIResponsesModel]) -> str:
@@ -128,4 +285,16 @@ def model_supports_structured_output(model: Union[OpenAIChatCompletionsModel, Op
     return any(provider in get_base_url(model) for provider in structured_output_providers)
 
 
-__all__ = ["reasoning_model", "main_model", "fast_model", "get_base_url", "model_supports_structured_output"]
+__all__ = [
+    "LLMConfig",
+    "ClientRegistry",
+    "client_registry",
+    "default_config",
+    "get_default_config",
+    "reasoning_model",
+    "main_model",
+    "fast_model",
+    "backup_model",
+    "get_base_url",
+    "model_supports_structured_output",
+]
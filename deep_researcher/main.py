@@ -1,13 +1,12 @@
 import asyncio
 import argparse
-from .iterative_research import IterativeResearcher
-from .deep_research import DeepResearcher
-from typing import Literal
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Literal, Optional
 import os
+import sys
 from datetime import datetime
 
-load_dotenv(override=True)
+if TYPE_CHECKING:
+    from .checkpoint import CheckpointStore
 
 def save_report_to_file(report: str, query: str) -> str:
     """Save the report to a markdown file with a timestamp in the filename."""
@@ -36,6 +35,10 @@ async def main() -> None:
                        help="Maximum number of iterations for deep research")
     parser.add_argument("--max-time", type=int, default=10,
                        help="Maximum time in minutes for deep research")
+    parser.add_argument("--max-llm-calls", type=int, default=None,
+                       help="Maximum number of LLM calls for the full report (deep mode only)")
+    parser.add_argument("--min-novelty", type=float, default=0.0,
+                       help="Stop a research loop once the share of new information in an iteration's findings falls below this (0-1, 0 to disable)")
     parser.add_argument("--output-length", type=str, default="5 pages",
                        help="Desired output length for the report")
     parser.add_argument("--output-instructions", type=str, default="",
@@ -44,40 +47,148 @@ async def main() -> None:
                        help="Print status updates to the console")
     parser.add_argument("--tracing", action="store_true",
                        help="Enable tracing for the research (only valid for OpenAI models)")
+    parser.add_argument("--profile", nargs="?", const="profiles", default=None, metavar="DIR",
+                       help="Write a local trace of the run (JSONL and Chrome trace format) to this directory (default: profiles)")
     parser.add_argument("--save-to-file", action="store_true",
                        help="Save the report to a markdown file")
+    parser.add_argument("--no-pipeline-writing", action="store_true",
+                       help="Wait for all sections to finish researching before writing the report (deep mode only)")
+    parser.add_argument("--parallel-writing", action="store_true",
+                       help="Write all sections of the report concurrently instead of one after the other (deep mode only)")
+    parser.add_argument("--use-proofreader", action="store_true",
+                       help="Produce the final report by proofreading the section drafts in windows instead of rewriting each section (deep mode only)")
+    parser.add_argument("--max-concurrent-sections", type=int, default=4,
+                       help="Maximum number of sections researched at once, 0 for no limit (deep mode only)")
+    parser.add_argument("--no-plan-prefetch", action="store_true",
+                       help="Let the planner run its own searches instead of planning from prefetched search results (deep mode only)")
+    parser.add_argument("--share-findings", action="store_true",
+                       help="Let sections reuse the search and crawl results of other sections instead of repeating them (deep mode only)")
+    parser.add_argument("--writer-context-tokens", type=int, default=6000,
+                       help="Limit on the report context sent when writing each section, 0 to send the full report so far (deep mode only)")
+    parser.add_argument("--checkpoint", nargs="?", const="checkpoints", default=None, metavar="PATH",
+                       help="Save the progress of the run after each step to this directory, or to a SQLite database if the path ends in .db (default: checkpoints, deep mode only)")
+    parser.add_argument("--resume", type=str, default=None, metavar="RUN_ID",
+                       help="Resume an interrupted run from its checkpoint in the --checkpoint location (deep mode only)")
+    parser.add_argument("--refresh", type=str, default=None, metavar="RUN_ID",
+                       help="Refresh the report of a finished run, re-researching only the sections whose sources changed (deep mode only)")
+    parser.add_argument("--max-age-days", type=float, default=None,
+                       help="With --refresh, also re-research sections that were researched more than this many days ago")
+    parser.add_argument("--stream", nargs="?", const="-", default=None, metavar="FILE",
+                       help="Write the final report to stdout (or to FILE) as it is generated, instead of printing it at the end")
     
     args = parser.parse_args()
-    
-    # If no query is provided via command line, prompt the user
-    query = args.query if args.query else input("What would you like to research? ")
+    if (args.checkpoint or args.resume or args.refresh) and args.model != "deep":
+        parser.error("--checkpoint, --resume and --refresh are only supported in deep mode")
+    if args.resume and args.refresh:
+        parser.error("--resume and --refresh can't be used together")
+    if args.stream and args.refresh:
+        parser.error("--stream can't be used with --refresh")
+
+    profiler = None
+    if args.profile:
+        from .profiling import enable_profiling
+        profiler = enable_profiling(args.profile, export_to_openai=args.tracing)
+
+    checkpoint_store = None
+    if args.checkpoint or args.resume or args.refresh:
+        from .checkpoint import open_checkpoint_store
+        checkpoint_store = open_checkpoint_store(args.checkpoint or "checkpoints")
+
+    try:
+        await run_research(parser, args, checkpoint_store)
+    finally:
+        from .llm_client import client_registry
+        await client_registry.aclose()
+        if checkpoint_store is not None:
+            checkpoint_store.close()
+        # Write out the spans of failed and interrupted runs too
+        if profiler:
+            profiler.force_flush()
+            print(f"\nProfile written to: {', '.join(profiler.written_files)}")
+
+async def run_research(parser: argparse.ArgumentParser, args: argparse.Namespace, checkpoint_store: Optional["CheckpointStore"] = None) -> None:
+    """Run the research requested on the command line and print or save the report"""
+    # The research modules (and the agents SDK) are imported after parsing the arguments so that --help returns quickly
+    from .deep_research import DeepResearcher
+    from .events import write_report_chunks
+    from .iterative_research import IterativeResearcher
+
+    run_id = None
+    if checkpoint_store is not None:
+        from .checkpoint import new_run_id
+        run_id = args.resume or new_run_id()
+
+    if args.resume or args.refresh:
+        # Resumed and refreshed runs use the query of the run they continue
+        checkpoint = checkpoint_store.load(args.resume or args.refresh)
+        if checkpoint is None:
+            parser.error(f"No checkpoint found for run {args.resume or args.refresh}")
+        query = checkpoint.query
+    else:
+        # If no query is provided via command line, prompt the user
+        query = args.query if args.query else input("What would you like to research? ")
     
     print(f"Starting deep research on: {query}")
     print(f"Max iterations: {args.max_iterations}, Max time: {args.max_time} minutes")
+    if run_id:
+        print(f"Run ID: {run_id} (if the run is interrupted, continue it with --resume {run_id})")
     
     if args.model == "deep":
         manager = DeepResearcher(
             max_iterations=args.max_iterations,
             max_time_minutes=args.max_time,
             verbose=args.verbose,
-            tracing=args.tracing
+            tracing=args.tracing,
+            max_llm_calls=args.max_llm_calls,
+            min_novelty=args.min_novelty,
+            pipeline_writing=not args.no_pipeline_writing,
+            parallel_writing=args.parallel_writing,
+            writer_context_tokens=args.writer_context_tokens or None,
+            use_long_writer=not args.use_proofreader,
+            share_findings=args.share_findings,
+            prefetch_planning=not args.no_plan_prefetch,
+            max_concurrent_sections=args.max_concurrent_sections or None,
+            checkpoint_store=checkpoint_store,
+            stream_report=bool(args.stream)
         )
-        report = await manager.run(query)
+        if args.refresh:
+            report = await manager.refresh(args.refresh, max_age_days=args.max_age_days, run_id=run_id)
+        elif not args.stream:
+            report = await manager.run(query, run_id=run_id)
+        else:
+            events = manager.run_stream(query, run_id=run_id)
     else:
         manager = IterativeResearcher(
             max_iterations=args.max_iterations,
             max_time_minutes=args.max_time,
             verbose=args.verbose,
-            tracing=args.tracing
-        )
-        report = await manager.run(
-            query, 
-            output_length=args.output_length, 
-            output_instructions=args.output_instructions
+            tracing=args.tracing,
+            min_novelty=args.min_novelty,
+            stream_report=bool(args.stream)
         )
+        if not args.stream:
+            report = await manager.run(
+                query, 
+                output_length=args.output_length, 
+                output_instructions=args.output_instructions
+            )
+        else:
+            events = manager.run_stream(query, output_length=args.output_length, output_instructions=args.output_instructions)
+
+    if args.stream == "-":
+        print("\n=== Final Report ===")
+        report = await write_report_chunks(events, sys.stdout, verbose=args.verbose)
+        print()
+    elif args.stream:
+        with open(args.stream, "w", encoding="utf-8") as f:
+            report = await write_report_chunks(events, f, verbose=args.verbose)
+        print(f"\nReport streamed to: {args.stream}")
+    else:
+        print("\n=== Final Report ===")
+        print(report)
 
-    print("\n=== Final Report ===")
-    print(report)
+    print("\n=== Run Stats ===")
+    print(manager.stats.summary())
     
     if args.save_to_file:
         filename = save_report_to_file(report, query)
@@ -86,6 +197,14 @@ async def main() -> None:
 # Command line entry point
 def cli_entry():
     """Entry point for the command-line interface."""
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from .batch import batch_main
+        asyncio.run(batch_main(sys.argv[2:]))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from .service import serve_main
+        asyncio.run(serve_main(sys.argv[2:]))
+        return
     asyncio.run(main())
 
 if __name__ == "__main__":
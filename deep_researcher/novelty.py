@@ -0,0 +1,63 @@
+"""
+Local novelty detection for the findings gathered in each iteration of the research loop.
+
+The findings of each iteration are broken into word shingles (overlapping n-grams of words), which are hashed into a
+NumPy array. The novelty of an iteration is the share of its shingles that have not been seen in any previous
+iteration - a score of 1.0 means the findings are entirely new and a score close to 0.0 means they mostly repeat what
+has already been found. No LLM calls are needed to compute the score.
+"""
+import re
+from typing import List
+import numpy as np
+
+_WORD_PATTERN = re.compile(r"\w+")
+_HASH_MULTIPLIER = np.uint64(1099511628211)  # FNV prime, used to combine word hashes into a shingle hash
+
+
+def shingle_hashes(text: str, shingle_size: int = 3) -> np.ndarray:
+    """Get the unique hashes of all of the word shingles of a given size in the text"""
+    words = _WORD_PATTERN.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+
+    word_hashes = np.fromiter((hash(word) for word in words), dtype=np.int64, count=len(words)).view(np.uint64)
+    if len(word_hashes) < shingle_size:
+        # Treat short texts as a single shingle
+        shingle_size = len(word_hashes)
+
+    # Combine the hashes of each window of consecutive words in a single vectorized pass
+    num_shingles = len(word_hashes) - shingle_size + 1
+    combined = word_hashes[:num_shingles].copy()
+    with np.errstate(over="ignore"):
+        for offset in range(1, shingle_size):
+            combined = combined * _HASH_MULTIPLIER ^ word_hashes[offset:offset + num_shingles]
+    return np.unique(combined)
+
+
+class NoveltyDetector:
+    """Keeps track of all shingles seen so far and scores how novel each new set of findings is."""
+
+    def __init__(self, shingle_size: int = 3):
+        self.shingle_size = shingle_size
+        self.seen: np.ndarray = np.empty(0, dtype=np.uint64)  # Sorted unique shingle hashes from all previous findings
+        self.scores: List[float] = []
+
+    def score(self, findings: List[str]) -> float:
+        """Score the novelty of the findings against all previous findings (without adding them)"""
+        return self._score_hashes(shingle_hashes("\n".join(findings), self.shingle_size))
+
+    def add(self, findings: List[str]) -> float:
+        """Score the novelty of the findings and add them to the set of previous findings"""
+        new = shingle_hashes("\n".join(findings), self.shingle_size)
+        novelty = self._score_hashes(new)
+        self.seen = np.union1d(self.seen, new)
+        self.scores.append(novelty)
+        return novelty
+
+    def _score_hashes(self, new: np.ndarray) -> float:
+        if len(new) == 0:
+            return 0.0
+        if len(self.seen) == 0:
+            return 1.0
+        already_seen = np.isin(new, self.seen, assume_unique=True)
+        return float(1.0 - already_seen.mean())
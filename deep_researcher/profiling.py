@@ -0,0 +1,195 @@
+"""
+Local trace exporter for profiling research runs without sending traces to the OpenAI platform.
+
+The LocalTraceProcessor plugs into the tracing of the agents SDK, so it sees the agent runs, model calls and tool calls
+of the SDK along with the custom spans we add for HTTP fetches, HTML extraction and blackboard lookups. Spans are timed
+with a monotonic clock when they start and end and kept in memory, with only a few small fields of their data, to keep
+the overhead low. When a trace ends, its spans are written to the output directory as:
+- `<trace_id>.jsonl`: one JSON object per span (ids, parent, type, name, start and duration in microseconds, data)
+- `<trace_id>.trace.json`: Chrome trace-event format, which can be opened in chrome://tracing or https://ui.perfetto.dev
+  to see the timeline of a run. Each asyncio task gets its own lane, so concurrent sections and tool calls are shown
+  side by side and the critical path of the run can be followed from lane to lane.
+
+Profiling is enabled with `enable_profiling()` (or `--profile` on the command line), which works for any model provider.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+from agents.tracing import Span, Trace, TracingProcessor, add_trace_processor, set_trace_processors, set_tracing_disabled
+from agents.tracing.processors import default_processor
+
+_MAX_VALUE_LENGTH = 200  # Longer span data values are truncated so that the profile stays small
+
+_profiler: Optional["LocalTraceProcessor"] = None
+
+
+class LocalTraceProcessor(TracingProcessor):
+    """Collects the spans of each trace and writes them to JSONL and Chrome trace files when the trace ends."""
+
+    def __init__(self, output_dir: str = "profiles"):
+        self.output_dir = output_dir
+        self.origin_ns = time.perf_counter_ns()  # Timestamps are relative to when the processor was created
+        self.trace_names: Dict[str, str] = {}
+        self.span_starts: Dict[str, int] = {}  # Span id -> start time of the spans that are still open
+        self.events: Dict[str, List[Dict[str, Any]]] = {}  # Trace id -> finished spans
+        self.lanes: "weakref.WeakKeyDictionary[asyncio.Task, int]" = weakref.WeakKeyDictionary()
+        self.lane_names: Dict[int, str] = {}
+        self.written_files: List[str] = []
+        self._lock = threading.Lock()
+
+    def on_trace_start(self, trace: Trace) -> None:
+        self.trace_names[trace.trace_id] = trace.name
+        self.events.setdefault(trace.trace_id, [])
+
+    def on_trace_end(self, trace: Trace) -> None:
+        self._write_trace(trace.trace_id)
+        with self._lock:
+            self.events.pop(trace.trace_id, None)
+
+    def on_span_start(self, span: Span[Any]) -> None:
+        self.span_starts[span.span_id] = time.perf_counter_ns()
+
+    def on_span_end(self, span: Span[Any]) -> None:
+        end_ns = time.perf_counter_ns()
+        start_ns = self.span_starts.pop(span.span_id, end_ns)
+        span_data = span.span_data
+        event = {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "type": span_data.type,
+            "name": _get_span_name(span_data),
+            "start_us": (start_ns - self.origin_ns) // 1000,
+            "duration_us": (end_ns - start_ns) // 1000,
+            "lane": self._get_lane(),
+            "data": _get_span_details(span_data),
+        }
+        if span.error:
+            event["error"] = span.error.get("message") if isinstance(span.error, dict) else str(span.error)
+        with self._lock:
+            self.events.setdefault(span.trace_id, []).append(event)
+
+    def shutdown(self) -> None:
+        self.force_flush()
+
+    def force_flush(self) -> None:
+        # Traces that are still open keep their spans, so that their files are rewritten in full when they end
+        for trace_id in list(self.events):
+            self._write_trace(trace_id)
+
+    def _get_lane(self) -> int:
+        """Get the lane for the current asyncio task (or thread, outside of an event loop)"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        with self._lock:
+            if task is None:
+                lane = -threading.get_ident()
+                self.lane_names.setdefault(lane, threading.current_thread().name)
+                return lane
+            if task not in self.lanes:
+                self.lanes[task] = len(self.lane_names) + 1
+                self.lane_names[self.lanes[task]] = task.get_name()
+            return self.lanes[task]
+
+    def _write_trace(self, trace_id: str) -> None:
+        with self._lock:
+            events = sorted(self.events.get(trace_id, []), key=lambda event: event["start_us"])
+        if not events:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        base_path = os.path.join(self.output_dir, trace_id)
+
+        with open(f"{base_path}.jsonl", "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+
+        lanes = {event["lane"] for event in events}
+        trace_events = [
+            {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": self.trace_names.get(trace_id, trace_id)}},
+            *(
+                {"name": "thread_name", "ph": "M", "pid": 1, "tid": lane, "args": {"name": self.lane_names.get(lane, str(lane))}}
+                for lane in lanes
+            ),
+            *(
+                {
+                    "name": event["name"],
+                    "cat": event["type"],
+                    "ph": "X",
+                    "ts": event["start_us"],
+                    "dur": event["duration_us"],
+                    "pid": 1,
+                    "tid": event["lane"],
+                    "args": event["data"],
+                }
+                for event in events
+            ),
+        ]
+        with open(f"{base_path}.trace.json", "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+        for path in (f"{base_path}.jsonl", f"{base_path}.trace.json"):
+            if path not in self.written_files:
+                self.written_files.append(path)
+
+
+def _get_span_name(span_data: Any) -> str:
+    name = getattr(span_data, "name", None)
+    if name:
+        return str(name)
+    model = getattr(span_data, "model", None)
+    return f"{span_data.type}:{model}" if model else span_data.type
+
+
+def _get_span_details(span_data: Any) -> Dict[str, Any]:
+    """Keep a few small fields of the span data (the inputs and outputs of model and tool calls are left out)"""
+    details: Dict[str, Any] = {}
+    if span_data.type == "custom":
+        details.update(span_data.data)
+    elif span_data.type == "generation":
+        details["model"] = span_data.model
+        details["usage"] = span_data.usage
+    elif span_data.type == "response" and getattr(span_data, "response", None) is not None:
+        usage = getattr(span_data.response, "usage", None)
+        details["model"] = getattr(span_data.response, "model", None)
+        if usage is not None:
+            details["input_tokens"] = usage.input_tokens
+            details["output_tokens"] = usage.output_tokens
+    elif span_data.type == "agent":
+        details["tools"] = span_data.tools
+    return {
+        key: value if isinstance(value, (int, float, bool)) or value is None else str(value)[:_MAX_VALUE_LENGTH]
+        for key, value in details.items()
+    }
+
+
+def enable_profiling(output_dir: str = "profiles", export_to_openai: bool = False) -> LocalTraceProcessor:
+    """
+    Turn on tracing with a LocalTraceProcessor that writes the traces of all runs to the output directory. Unless
+    export_to_openai is set, the local processor replaces the default one, so no traces are sent to the OpenAI platform.
+    """
+    global _profiler
+    _profiler = LocalTraceProcessor(output_dir)
+    if export_to_openai:
+        add_trace_processor(_profiler)
+    else:
+        set_trace_processors([_profiler])
+    set_tracing_disabled(False)
+    return _profiler
+
+
+def disable_profiling() -> None:
+    """Write out any traces that are still open and go back to the default trace processor"""
+    global _profiler
+    if _profiler is not None:
+        _profiler.force_flush()
+        _profiler = None
+        set_trace_processors([default_processor()])
+
+
+def profiling_enabled() -> bool:
+    return _profiler is not None
@@ -0,0 +1,182 @@
+"""
+Retries, backoff and circuit breaking for calls to LLM providers and search APIs.
+
+Transient failures (rate limits, 5xx responses, dropped connections and timeouts) are retried with jittered exponential
+backoff. Each provider also has a circuit breaker: after a run of consecutive failures the breaker opens and further
+calls fail fast (or are sent to a backup model, see ResearchRunner) until a cool-down period has passed, after which a
+single trial call is let through to check whether the provider has recovered.
+
+A process-wide limit on the number of LLM calls in flight can also be set, so that concurrent research jobs (e.g. in the
+research service) queue for the provider rather than all running into its rate limits at once.
+"""
+import asyncio
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+import openai
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Exception raised when a call is rejected because the circuit breaker for its provider is open."""
+    def __init__(self, provider: str):
+        self.provider = provider
+        super().__init__(f"Circuit breaker for provider '{provider}' is open after repeated failures")
+
+
+class RetryPolicy:
+    """How many times to attempt a call and how long to wait between attempts."""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, attempt: int) -> float:
+        """Get the delay before the next attempt using exponential backoff with full jitter (attempt starts at 1)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Tracks consecutive failures for a provider and rejects calls while the provider appears to be down."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout  # Seconds to wait before letting a trial call through once the breaker opens
+        self.consecutive_failures: int = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_progress: bool = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow_request(self) -> bool:
+        """Whether a call to the provider should be attempted"""
+        if self.opened_at is None:
+            return True
+        # Once the cool-down has passed, let a single trial call through (half-open state)
+        if not self.trial_in_progress and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.trial_in_progress = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.trial_in_progress or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.trial_in_progress = False
+
+    def release_trial(self) -> None:
+        """Let another trial call through after one that ended without an outcome (e.g. it was cancelled)"""
+        self.trial_in_progress = False
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """Get the (process-wide) circuit breaker for a provider, creating it if needed"""
+    if provider not in _circuit_breakers:
+        _circuit_breakers[provider] = CircuitBreaker(provider)
+    return _circuit_breakers[provider]
+
+
+_llm_call_limiter: Optional[asyncio.Semaphore] = None
+_holding_llm_call_slot: ContextVar[bool] = ContextVar("holding_llm_call_slot", default=False)
+
+
+def set_max_concurrent_llm_calls(max_concurrent: Optional[int]) -> None:
+    """Limit the number of LLM calls in flight across the whole process (None for no limit)"""
+    global _llm_call_limiter
+    _llm_call_limiter = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+
+
+@asynccontextmanager
+async def llm_call_slot() -> AsyncIterator[None]:
+    """
+    Wait for a free slot under the process-wide limit on LLM calls, if one is set. Calls made from within a call that
+    holds a slot (e.g. by the tools of an agent) run in its slot, as they would otherwise wait on their own parent.
+    """
+    limiter = _llm_call_limiter
+    if limiter is None or _holding_llm_call_slot.get():
+        yield
+        return
+    async with limiter:
+        token = _holding_llm_call_slot.set(True)
+        try:
+            yield
+        finally:
+            _holding_llm_call_slot.reset(token)
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether an error raised by an LLM or search API call is transient and worth retrying"""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    # aiohttp is only imported once a search or crawl has been run, and its errors can't be raised before then
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp is not None:
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in RETRYABLE_STATUS_CODES
+        if isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError)):
+            return True
+    return False
+
+
+async def call_with_retries(
+    func: Callable[[], Awaitable[T]],
+    policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+    breaker: Optional[CircuitBreaker] = None,
+    is_retryable: Callable[[BaseException], bool] = is_retryable_error,
+) -> T:
+    """
+    Call an async function, retrying it with jittered exponential backoff if it raises a retryable error.
+    If a circuit breaker is given, the call fails fast with a CircuitOpenError while the breaker is open, and the
+    outcome of each attempt is recorded on the breaker.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        if breaker and not breaker.allow_request():
+            raise CircuitOpenError(breaker.name)
+        try:
+            result = await func()
+        except Exception as e:
+            if not is_retryable(e):
+                # The provider responded, so the error says nothing about its health
+                if breaker:
+                    breaker.record_success()
+                raise
+            if breaker:
+                breaker.record_failure()
+            if attempt >= policy.max_attempts:
+                raise
+            await asyncio.sleep(policy.get_delay(attempt))
+            continue
+        except BaseException:
+            # A cancelled call says nothing about the provider, but a trial call must not hold the breaker open
+            if breaker:
+                breaker.release_trial()
+            raise
+        if breaker:
+            breaker.record_success()
+        return result
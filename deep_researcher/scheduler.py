@@ -0,0 +1,100 @@
+"""
+Scheduler for the research loops of the sections of a DeepResearcher run.
+
+Starting a research loop for every section at once means that with a long outline, all of the sections compete for the
+same rate-limited provider and network, each progresses slowly and none finishes early. The SectionScheduler admits
+at most `max_concurrent` sections at a time. The rest wait in a queue that is ordered by priority (the position of the
+section in the report, so the first sections finish first and pipelined writing can start early). The time each section
+spends waiting in the queue and running is recorded.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+
+
+class SectionRun:
+    """Timings of a single section that went through the scheduler"""
+
+    def __init__(self, name: str, priority: int):
+        self.name = name
+        self.priority = priority
+        self.queued_at: float = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def wait_seconds(self) -> float:
+        return (self.started_at or time.time()) - self.queued_at
+
+    @property
+    def run_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class SectionScheduler:
+    """Limits the number of sections that are researched concurrently, admitting queued sections in order of priority."""
+
+    def __init__(self, max_concurrent: Optional[int] = None):
+        self.max_concurrent = max_concurrent  # Maximum number of sections running at once (None = unlimited)
+        self.active: int = 0
+        self.waiting: List[Tuple[int, int, asyncio.Future]] = []  # Heap of (priority, arrival order, future) for queued sections
+        self.runs: List[SectionRun] = []
+        self._arrivals = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, name: str, priority: int = 0) -> AsyncIterator[SectionRun]:
+        """Wait for a free slot (lower priorities are admitted first) and hold it for the duration of the block"""
+        run = SectionRun(name, priority)
+        self.runs.append(run)
+        await self._acquire(priority)
+        run.started_at = time.time()
+        try:
+            yield run
+        finally:
+            run.finished_at = time.time()
+            self._release()
+
+    async def _acquire(self, priority: int) -> None:
+        if self.max_concurrent is None or (self.active < self.max_concurrent and not self.waiting):
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiting, (priority, next(self._arrivals), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # If the slot was handed over just before the section was cancelled, pass it on to the next section
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        # Hand the slot straight to the next queued section that is still waiting (cancelled sections are skipped)
+        while self.waiting:
+            _, _, future = heapq.heappop(self.waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def summary(self) -> str:
+        """Human readable summary of the queue wait and run time of each section"""
+        if not self.runs:
+            return "Section scheduling: no sections were run"
+        finished = [run for run in self.runs if run.finished_at is not None]
+        waits = [run.wait_seconds for run in self.runs]
+        limit = self.max_concurrent if self.max_concurrent is not None else "unlimited"
+        lines = [f"Section scheduling (max {limit} concurrent): mean wait {sum(waits) / len(waits):.1f}s, max wait {max(waits):.1f}s"]
+        if finished:
+            elapsed = max(run.finished_at for run in finished) - min(run.queued_at for run in self.runs)
+            lines[0] += f", {len(finished) / max(elapsed, 1e-9) * 60:.1f} sections/minute"
+        lines.extend(
+            f"- {run.name}: waited {run.wait_seconds:.1f}s, ran {run.run_seconds:.1f}s"
+            for run in sorted(self.runs, key=lambda run: run.priority)
+        )
+        return "\n".join(lines)
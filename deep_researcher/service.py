@@ -0,0 +1,414 @@
+"""
+Long-running research service with an HTTP API, for running many research jobs on one box.
+
+Jobs are submitted over HTTP into a bounded queue and picked up by a fixed pool of workers, each running one job at a
+time in the same event loop. All jobs share one LLM config, and so one pool of API clients, the agents built from the
+config and the HTTP session used for searches and crawls. They also share the process-wide circuit breakers and limit
+on LLM calls in flight, and optionally (with --share-findings) a FindingsBlackboard of search and crawl results. Each job runs
+within a budget: the iterations, minutes and LLM calls it asks for are capped at the limits of the service, and a job
+that runs past the job timeout is stopped. When the queue is full, new jobs are rejected with a 503 so that clients
+can back off.
+
+Endpoints:
+    POST   /jobs              Submit a job: {"query": ..., "mode": "deep" | "simple", "output_length": ...,
+                              "output_instructions": ..., "max_iterations": ..., "max_time_minutes": ...,
+                              "max_llm_calls": ...}. Returns the status of the job (202).
+    GET    /jobs              Status of all jobs that are queued, running or recently finished
+    GET    /jobs/{id}         Status of a job
+    GET    /jobs/{id}/result  Report and stats of a completed job (409 if the job hasn't completed)
+    DELETE /jobs/{id}         Cancel a job that is queued or running
+    GET    /health            Number of workers and of queued, running and finished jobs
+
+Usage:
+    deep-researcher serve [--host 127.0.0.1] [--port 8080] [--workers 4] [--queue-size 100]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Literal, Optional, Tuple
+from aiohttp import web
+from pydantic import BaseModel, Field, ValidationError
+from .blackboard import FindingsBlackboard
+from .budget import ResearchBudget
+from .llm_client import LLMConfig, get_default_config
+from .resilience import set_max_concurrent_llm_calls
+from .stats import RunStats
+
+JobState = Literal["queued", "running", "completed", "failed", "cancelled"]
+FINISHED_STATES = ("completed", "failed", "cancelled")
+
+
+class JobRequest(BaseModel):
+    """A research job submitted to the service"""
+    query: str = Field(min_length=1)
+    mode: Literal["deep", "simple"] = "deep"
+    output_length: str = ""
+    output_instructions: str = ""
+    max_iterations: Optional[int] = Field(default=None, ge=1)  # Capped at the limit of the service
+    max_time_minutes: Optional[float] = Field(default=None, gt=0)  # Capped at the limit of the service
+    max_llm_calls: Optional[int] = Field(default=None, ge=1)  # Capped at the limit of the service
+
+
+class JobStatus(BaseModel):
+    """Status of a job, as returned by the API"""
+    id: str
+    query: str
+    mode: str
+    status: JobState
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    queue_position: Optional[int] = None  # Number of jobs ahead of this one in the queue
+    error: Optional[str] = None
+    llm_calls: int = 0
+    cost: float = 0.0
+
+
+class QueueFullError(Exception):
+    """Exception raised when a job is submitted while the job queue is full."""
+
+
+class ServiceJob:
+    """A job and its state while it is queued, running and once it has finished"""
+
+    def __init__(self, request: JobRequest):
+        self.id = uuid.uuid4().hex[:12]
+        self.request = request
+        self.state: JobState = "queued"
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.report: Optional[str] = None
+        self.stats: Optional[RunStats] = None
+        self.task: Optional[asyncio.Task] = None  # The running research, so that it can be cancelled
+
+    def finish(self, state: JobState, error: Optional[str] = None) -> None:
+        self.state = state
+        self.error = error
+        self.finished_at = time.time()
+
+
+class ResearchService:
+    """Runs submitted research jobs from a bounded queue on a pool of workers that share one LLM config and its clients."""
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queue_size: int = 100,
+        max_iterations: int = 5,
+        max_time_minutes: float = 10,
+        max_llm_calls: Optional[int] = None,
+        job_timeout_minutes: Optional[float] = None,
+        max_concurrent_sections: Optional[int] = 4,
+        max_concurrent_llm_calls: Optional[int] = None,
+        share_findings: bool = False,
+        max_finished_jobs: int = 1000,
+        config: Optional[LLMConfig] = None,
+        verbose: bool = False,
+    ):
+        self.max_workers = max_workers  # Number of jobs that run at the same time
+        self.max_queue_size = max_queue_size  # Number of jobs that can wait for a worker before new jobs are rejected
+        self.max_iterations = max_iterations  # Default and upper limit for the iterations of each research loop
+        self.max_time_minutes = max_time_minutes  # Default and upper limit for the time of each research loop
+        self.max_llm_calls = max_llm_calls  # Default and upper limit for the LLM calls of a job (None = unlimited)
+        self.job_timeout_minutes = job_timeout_minutes  # Jobs that run for longer than this are stopped (None = no timeout)
+        self.max_concurrent_sections = max_concurrent_sections  # Per deep research job
+        self.max_concurrent_llm_calls = max_concurrent_llm_calls  # Limit on LLM calls in flight across all jobs
+        self.blackboard: Optional[FindingsBlackboard] = FindingsBlackboard() if share_findings else None  # Shared by all jobs
+        self.max_finished_jobs = max_finished_jobs  # Finished jobs kept for their results, the oldest are dropped first
+        self.config: Optional[LLMConfig] = config  # Shared by all jobs, so they draw on the same client pools (default set in start)
+        self.verbose = verbose
+        self.jobs: "OrderedDict[str, ServiceJob]" = OrderedDict()
+        self.queue: Optional[asyncio.Queue] = None
+        self.queued_jobs: int = 0  # Jobs waiting for a worker (cancelled jobs still in the queue don't count)
+        self.workers: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the workers (in the running event loop)"""
+        # The default config is only created once the service starts, as it needs the API keys of the default providers
+        if self.config is None:
+            self.config = get_default_config()
+        set_max_concurrent_llm_calls(self.max_concurrent_llm_calls)
+        # The queue itself is unbounded, as cancelled jobs stay in it until a worker skips them - capacity is checked
+        # against the jobs that are still waiting instead
+        self.queue = asyncio.Queue()
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers, cancelling the jobs that are running and still queued"""
+        for job in self.jobs.values():
+            if job.state in ("queued", "running"):
+                self.cancel(job.id)
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def submit(self, request: JobRequest) -> ServiceJob:
+        """Add a job to the queue, raising a QueueFullError if there is no room for it"""
+        if self.queued_jobs >= self.max_queue_size:
+            raise QueueFullError(f"The job queue is full ({self.max_queue_size} jobs)")
+        job = ServiceJob(request)
+        self.queue.put_nowait(job)
+        self.queued_jobs += 1
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[ServiceJob]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[ServiceJob]:
+        """Cancel a job if it hasn't finished yet. Queued jobs are skipped by the workers when they reach them."""
+        job = self.jobs.get(job_id)
+        if job is None or job.state in FINISHED_STATES:
+            return job
+        if job.task is not None:
+            job.task.cancel()
+        if job.state == "queued":
+            self.queued_jobs -= 1
+        job.finish("cancelled")
+        return job
+
+    def status(self, job: ServiceJob) -> JobStatus:
+        queue_position = None
+        if job.state == "queued":
+            queue_position = sum(
+                1 for other in self.jobs.values() if other.state == "queued" and other.submitted_at < job.submitted_at
+            )
+        total = job.stats.total if job.stats else None
+        return JobStatus(
+            id=job.id,
+            query=job.request.query,
+            mode=job.request.mode,
+            status=job.state,
+            submitted_at=job.submitted_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            queue_position=queue_position,
+            error=job.error,
+            llm_calls=total.calls if total else 0,
+            cost=total.cost if total else 0.0,
+        )
+
+    def health(self) -> Dict[str, int]:
+        states = [job.state for job in self.jobs.values()]
+        return {
+            "workers": len(self.workers),
+            "queued": states.count("queued"),
+            "running": states.count("running"),
+            "finished": sum(state in FINISHED_STATES for state in states),
+            "max_queue_size": self.max_queue_size,
+        }
+
+    def job_limits(self, request: JobRequest) -> Tuple[int, float, Optional[int]]:
+        """Get the (max_iterations, max_time_minutes, max_llm_calls) of a job, capped at the limits of the service"""
+        def capped(requested, limit):
+            if requested is None:
+                return limit
+            return requested if limit is None else min(requested, limit)
+
+        return (
+            capped(request.max_iterations, self.max_iterations),
+            capped(request.max_time_minutes, self.max_time_minutes),
+            capped(request.max_llm_calls, self.max_llm_calls),
+        )
+
+    async def _worker(self) -> None:
+        while True:
+            job: ServiceJob = await self.queue.get()
+            try:
+                if job.state == "queued":
+                    self.queued_jobs -= 1
+                    await self._run_job(job)
+            finally:
+                self.queue.task_done()
+            self._drop_old_jobs()
+
+    async def _run_job(self, job: ServiceJob) -> None:
+        job.state = "running"
+        job.started_at = time.time()
+        job.task = asyncio.create_task(self._execute(job))
+        # Wait for the research without being cancelled along with it, so that cancelling a job leaves the worker running
+        await asyncio.wait([job.task])
+        task, job.task = job.task, None
+        if job.state != "running":
+            return  # Cancelled while it was running
+        if task.cancelled():
+            job.finish("cancelled")
+        elif isinstance(task.exception(), asyncio.TimeoutError):
+            job.finish("failed", f"Timed out after {self.job_timeout_minutes} minutes")
+        elif task.exception() is not None:
+            job.finish("failed", f"{type(task.exception()).__name__}: {task.exception()}")
+        else:
+            job.report, job.stats = task.result()
+            job.finish("completed")
+        if self.verbose:
+            print(f"Job {job.id} {job.state} in {job.finished_at - job.started_at:.0f}s{f': {job.error}' if job.error else ''}")
+
+    async def _execute(self, job: ServiceJob) -> Tuple[str, RunStats]:
+        research = self._research(job)
+        if self.job_timeout_minutes:
+            return await asyncio.wait_for(research, timeout=self.job_timeout_minutes * 60)
+        return await research
+
+    async def _research(self, job: ServiceJob) -> Tuple[str, RunStats]:
+        from .deep_research import DeepResearcher
+        from .iterative_research import IterativeResearcher
+
+        request = job.request
+        max_iterations, max_time_minutes, max_llm_calls = self.job_limits(request)
+        if request.mode == "deep":
+            researcher = DeepResearcher(
+                max_iterations=max_iterations,
+                max_time_minutes=max_time_minutes,
+                max_llm_calls=max_llm_calls,
+                verbose=self.verbose,
+                config=self.config,
+                max_concurrent_sections=self.max_concurrent_sections,
+                shared_blackboard=self.blackboard,
+            )
+            return await researcher.run(request.query, return_stats=True)
+
+        # A simple job is a single research loop, which gets the whole budget of the job (less a call for the report)
+        budget = ResearchBudget(max_iterations, max_time_minutes, max_llm_calls, reserved_llm_calls=1, share_unused=False)
+        budget_token = budget.activate()
+        try:
+            researcher = IterativeResearcher(
+                max_iterations=max_iterations,
+                max_time_minutes=max_time_minutes,
+                verbose=self.verbose,
+                config=self.config,
+                budget=budget.create_section_budget("research"),
+                blackboard=self.blackboard,
+            )
+            return await researcher.run(
+                request.query,
+                output_length=request.output_length,
+                output_instructions=request.output_instructions,
+                return_stats=True,
+            )
+        finally:
+            ResearchBudget.deactivate(budget_token)
+
+    def _drop_old_jobs(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    def create_app(self) -> web.Application:
+        """Create the aiohttp application for the HTTP API, which starts and stops the service with the app"""
+        app = web.Application()
+        app.router.add_post("/jobs", self._handle_submit)
+        app.router.add_get("/jobs", self._handle_list)
+        app.router.add_get("/jobs/{job_id}", self._handle_status)
+        app.router.add_get("/jobs/{job_id}/result", self._handle_result)
+        app.router.add_delete("/jobs/{job_id}", self._handle_cancel)
+        app.router.add_get("/health", self._handle_health)
+
+        async def start(app: web.Application) -> None:
+            await self.start()
+
+        async def stop(app: web.Application) -> None:
+            await self.stop()
+
+        app.on_startup.append(start)
+        app.on_cleanup.append(stop)
+        return app
+
+    def _json(self, model: BaseModel, status: int = 200) -> web.Response:
+        return web.Response(text=model.model_dump_json(), status=status, content_type="application/json")
+
+    def _get_job(self, request: web.Request) -> ServiceJob:
+        job = self.get(request.match_info["job_id"])
+        if job is None:
+            raise web.HTTPNotFound(text=f"No job with ID {request.match_info['job_id']}")
+        return job
+
+    async def _handle_submit(self, request: web.Request) -> web.Response:
+        try:
+            job_request = JobRequest.model_validate_json(await request.read())
+        except ValidationError as e:
+            return web.json_response({"error": "Invalid job", "details": e.errors(include_url=False)}, status=400)
+        try:
+            job = self.submit(job_request)
+        except QueueFullError as e:
+            return web.json_response({"error": str(e)}, status=503, headers={"Retry-After": "30"})
+        return self._json(self.status(job), status=202)
+
+    async def _handle_list(self, request: web.Request) -> web.Response:
+        return web.json_response([self.status(job).model_dump() for job in self.jobs.values()])
+
+    async def _handle_status(self, request: web.Request) -> web.Response:
+        return self._json(self.status(self._get_job(request)))
+
+    async def _handle_result(self, request: web.Request) -> web.Response:
+        job = self._get_job(request)
+        if job.state != "completed":
+            return web.json_response(
+                {"error": f"Job {job.id} is {job.state}", "status": self.status(job).model_dump()}, status=409
+            )
+        return web.json_response({"id": job.id, "report": job.report, "stats": job.stats.model_dump(mode="json")})
+
+    async def _handle_cancel(self, request: web.Request) -> web.Response:
+        job = self._get_job(request)
+        if job.state in FINISHED_STATES:
+            return web.json_response(
+                {"error": f"Job {job.id} has already finished", "status": self.status(job).model_dump()}, status=409
+            )
+        return self._json(self.status(self.cancel(job.id)))
+
+    async def _handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response(self.health())
+
+
+async def serve_main(argv: Optional[List[str]] = None) -> None:
+    """Entry point for `deep-researcher serve`"""
+    parser = argparse.ArgumentParser(prog="deep-researcher serve", description="Run the research service with an HTTP API")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--workers", type=int, default=4, help="Number of jobs that run at the same time (default: 4)")
+    parser.add_argument("--queue-size", type=int, default=100,
+                        help="Number of jobs that can wait for a worker before new jobs are rejected (default: 100)")
+    parser.add_argument("--max-iterations", type=int, default=5,
+                        help="Default and maximum number of iterations of each research loop of a job")
+    parser.add_argument("--max-time", type=float, default=10,
+                        help="Default and maximum time in minutes of each research loop of a job")
+    parser.add_argument("--max-llm-calls", type=int, default=None,
+                        help="Default and maximum number of LLM calls of a job")
+    parser.add_argument("--job-timeout", type=float, default=None,
+                        help="Stop jobs that run for longer than this many minutes")
+    parser.add_argument("--max-concurrent-sections", type=int, default=4,
+                        help="Maximum number of sections researched at once in each deep research job, 0 for no limit")
+    parser.add_argument("--max-concurrent-llm-calls", type=int, default=None,
+                        help="Maximum number of LLM calls in flight across all jobs")
+    parser.add_argument("--share-findings", action="store_true",
+                        help="Let jobs and sections reuse each other's search and crawl results")
+    parser.add_argument("--verbose", action="store_true", help="Print the progress of each job")
+    args = parser.parse_args(argv)
+
+    service = ResearchService(
+        max_workers=args.workers,
+        max_queue_size=args.queue_size,
+        max_iterations=args.max_iterations,
+        max_time_minutes=args.max_time,
+        max_llm_calls=args.max_llm_calls,
+        job_timeout_minutes=args.job_timeout,
+        max_concurrent_sections=args.max_concurrent_sections or None,
+        max_concurrent_llm_calls=args.max_concurrent_llm_calls,
+        share_findings=args.share_findings,
+        verbose=args.verbose,
+    )
+    runner = web.AppRunner(service.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, args.host, args.port)
+    await site.start()
+    print(f"Research service listening on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        if service.config is not None:
+            await service.config.registry.aclose()
@@ -0,0 +1,236 @@
+"""
+Token, cost and latency accounting for research runs.
+
+ResearchRunner records every LLM call (the agent, model, input/output/cached tokens from the SDK's usage data, wall
+time and the time spent waiting on retries before the successful attempt) against the RunStats that is active in the
+current async context. Calls are tagged with the section and iteration of the research loop that made them, so the
+stats can be rolled up by agent, section or iteration to see which part of a run dominates its cost and latency.
+
+Costs are computed from a table of prices per million tokens. The defaults can be overridden or extended with a JSON
+file given by the MODEL_PRICES_FILE environment variable (or passed to `load_prices`), in the format:
+    {"gpt-4o": {"input": 2.5, "cached_input": 1.25, "output": 10.0}}
+"""
+import json
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+
+
+class ModelPrice(BaseModel):
+    """Price of a model in USD per million tokens"""
+    input: float
+    cached_input: Optional[float] = None  # Defaults to the input price if the provider has no cache discount
+    output: float
+
+
+DEFAULT_PRICES: Dict[str, ModelPrice] = {
+    "gpt-4o": ModelPrice(input=2.5, cached_input=1.25, output=10.0),
+    "gpt-4o-mini": ModelPrice(input=0.15, cached_input=0.075, output=0.6),
+    "gpt-4.1": ModelPrice(input=2.0, cached_input=0.5, output=8.0),
+    "gpt-4.1-mini": ModelPrice(input=0.4, cached_input=0.1, output=1.6),
+    "gpt-4.1-nano": ModelPrice(input=0.1, cached_input=0.025, output=0.4),
+    "o1": ModelPrice(input=15.0, cached_input=7.5, output=60.0),
+    "o3-mini": ModelPrice(input=1.1, cached_input=0.55, output=4.4),
+    "o4-mini": ModelPrice(input=1.1, cached_input=0.275, output=4.4),
+    "deepseek-chat": ModelPrice(input=0.27, cached_input=0.07, output=1.1),
+    "deepseek-reasoner": ModelPrice(input=0.55, cached_input=0.14, output=2.19),
+}
+
+_current_stats: ContextVar[Optional["RunStats"]] = ContextVar("current_stats", default=None)
+_current_scope: ContextVar[Tuple[Optional[str], Optional[int]]] = ContextVar("current_scope", default=(None, None))
+
+
+def load_prices(path: Optional[str] = None) -> Dict[str, ModelPrice]:
+    """Get the default price table, updated with the prices in a JSON file (defaults to MODEL_PRICES_FILE, if set)"""
+    prices = dict(DEFAULT_PRICES)
+    path = path or os.getenv("MODEL_PRICES_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            prices.update({model: ModelPrice(**price) for model, price in json.load(f).items()})
+    return prices
+
+
+def get_price(model: str, prices: Dict[str, ModelPrice]) -> Optional[ModelPrice]:
+    """Get the price of a model, matching dated versions (e.g. gpt-4o-2024-08-06) to the longest matching model name"""
+    if model in prices:
+        return prices[model]
+    matches = [name for name in prices if model.startswith(name + "-")]
+    return prices[max(matches, key=len)] if matches else None
+
+
+class LLMCallStats(BaseModel):
+    """Usage and timing of a single ResearchRunner call"""
+    agent: str
+    model: str
+    section: Optional[str] = None  # Section whose research loop made the call (None for planning and writing the report)
+    iteration: Optional[int] = None  # Iteration of the research loop that made the call
+    model_calls: int = 1  # Number of model responses in the run (more than one if the agent called tools)
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    cost: Optional[float] = None  # USD, None if the model is not in the price table
+    wall_seconds: float = 0.0
+    queue_seconds: float = 0.0  # Time spent on failed attempts and backoff before the successful attempt started
+
+
+class UsageTotals(BaseModel):
+    """Usage and timing summed over a group of calls"""
+    calls: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+    unpriced_calls: int = 0  # Calls to models that are not in the price table (not included in the cost)
+    wall_seconds: float = 0.0
+    queue_seconds: float = 0.0
+
+    def add(self, call: LLMCallStats) -> None:
+        self.calls += call.model_calls
+        self.input_tokens += call.input_tokens
+        self.cached_tokens += call.cached_tokens
+        self.output_tokens += call.output_tokens
+        if call.cost is None:
+            self.unpriced_calls += call.model_calls
+        else:
+            self.cost += call.cost
+        self.wall_seconds += call.wall_seconds
+        self.queue_seconds += call.queue_seconds
+
+
+class SectionStats(BaseModel):
+    """Outcome of the research loop for a section"""
+    name: str
+    iterations: int = 0
+    elapsed_seconds: float = 0.0
+    novelty_scores: List[float] = Field(default_factory=list)
+    reused_tool_calls: int = 0
+
+
+class RunStats(BaseModel):
+    """Token, cost and latency accounting for a research run, with roll-ups by agent, section and iteration"""
+    started_at: float = Field(default_factory=time.time)
+    elapsed_seconds: float = 0.0
+    calls: List[LLMCallStats] = Field(default_factory=list)
+    sections: List[SectionStats] = Field(default_factory=list)
+    prices: Dict[str, ModelPrice] = Field(default_factory=load_prices, exclude=True)
+
+    def record_call(
+        self,
+        agent: str,
+        model: str,
+        usage: Tuple[int, int, int],
+        model_calls: int = 1,
+        wall_seconds: float = 0.0,
+        queue_seconds: float = 0.0,
+    ) -> LLMCallStats:
+        """Record a call with the given (input, cached, output) token usage, tagged with the current section and iteration"""
+        input_tokens, cached_tokens, output_tokens = usage
+        section, iteration = _current_scope.get()
+        price = get_price(model, self.prices)
+        cost = None
+        if price is not None:
+            cached_price = price.cached_input if price.cached_input is not None else price.input
+            cost = (
+                (input_tokens - cached_tokens) * price.input + cached_tokens * cached_price + output_tokens * price.output
+            ) / 1_000_000
+        call = LLMCallStats(
+            agent=agent,
+            model=model,
+            section=section,
+            iteration=iteration,
+            model_calls=model_calls,
+            input_tokens=input_tokens,
+            cached_tokens=cached_tokens,
+            output_tokens=output_tokens,
+            cost=cost,
+            wall_seconds=wall_seconds,
+            queue_seconds=queue_seconds,
+        )
+        self.calls.append(call)
+        return call
+
+    def finish(self) -> None:
+        self.elapsed_seconds = time.time() - self.started_at
+
+    @property
+    def total(self) -> UsageTotals:
+        return self._group(lambda call: "total").get("total", UsageTotals())
+
+    def by_agent(self) -> Dict[str, UsageTotals]:
+        return self._group(lambda call: call.agent)
+
+    def by_model(self) -> Dict[str, UsageTotals]:
+        return self._group(lambda call: call.model)
+
+    def by_section(self) -> Dict[str, UsageTotals]:
+        return self._group(lambda call: call.section or "(report)")
+
+    def by_iteration(self) -> Dict[str, UsageTotals]:
+        return self._group(lambda call: f"{call.section or '(report)'} #{call.iteration}" if call.iteration else call.section or "(report)")
+
+    def _group(self, get_key) -> Dict[str, UsageTotals]:
+        groups: Dict[str, UsageTotals] = {}
+        for call in self.calls:
+            groups.setdefault(get_key(call), UsageTotals()).add(call)
+        return groups
+
+    def summary(self) -> str:
+        """Human readable tables of usage by agent and by section"""
+        total = self.total
+        cached_share = total.cached_tokens / total.input_tokens if total.input_tokens else 0.0
+        lines = [
+            f"Run stats: {total.calls} LLM calls, {total.input_tokens} input tokens ({cached_share:.0%} cached), "
+            f"{total.output_tokens} output tokens, ${total.cost:.4f}"
+            + (f" (+{total.unpriced_calls} calls to unpriced models)" if total.unpriced_calls else "")
+            + f", {self.elapsed_seconds:.1f}s elapsed"
+        ]
+        for title, groups in [("agent", self.by_agent()), ("section", self.by_section())]:
+            lines.append(f"{title:<32} {'calls':>6} {'input':>9} {'cached':>9} {'output':>8} {'cost $':>9} {'llm s':>8} {'queue s':>8}")
+            for name, totals in sorted(groups.items(), key=lambda item: item[1].wall_seconds, reverse=True):
+                lines.append(
+                    f"{name[:32]:<32} {totals.calls:>6} {totals.input_tokens:>9} {totals.cached_tokens:>9} "
+                    f"{totals.output_tokens:>8} {totals.cost:>9.4f} {totals.wall_seconds:>8.1f} {totals.queue_seconds:>8.1f}"
+                )
+        for section in self.sections:
+            novelty = ", ".join(f"{score:.2f}" for score in section.novelty_scores) or "-"
+            lines.append(
+                f"- {section.name}: {section.iterations} iterations in {section.elapsed_seconds:.1f}s, novelty {novelty}"
+                + (f", {section.reused_tool_calls} reused tool calls" if section.reused_tool_calls else "")
+            )
+        return "\n".join(lines)
+
+    def activate(self):
+        """Make these the stats that LLM calls in the current async context are recorded against"""
+        return _current_stats.set(self)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        _current_stats.reset(token)
+
+
+def get_current_stats() -> Optional[RunStats]:
+    return _current_stats.get()
+
+
+def set_scope(section: Optional[str] = None, iteration: Optional[int] = None):
+    """Tag the LLM calls made in the current async context with a section and iteration of the research loop"""
+    return _current_scope.set((section, iteration))
+
+
+def reset_scope(token) -> None:
+    _current_scope.reset(token)
+
+
+def get_scope() -> Tuple[Optional[str], Optional[int]]:
+    """Get the (section, iteration) that the current async context is tagged with"""
+    return _current_scope.get()
+
+
+def record_llm_call(agent: str, model: str, usage: Tuple[int, int, int], **kwargs) -> Optional[LLMCallStats]:
+    """Record an LLM call against the stats that are active in the current async context (if any)"""
+    stats = _current_stats.get()
+    if stats is not None:
+        return stats.record_call(agent, model, usage, **kwargs)
+    return None
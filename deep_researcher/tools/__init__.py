@@ -1,2 +1,9 @@
-from .web_search import web_search
-from .crawl_website import crawl_website
+def __getattr__(name: str):
+    # The default web_search and crawl_website tools are created on first access, as they need the default LLM config
+    if name == "web_search":
+        from .web_search import web_search
+        return web_search
+    if name == "crawl_website":
+        from .crawl_website import crawl_website
+        return crawl_website
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
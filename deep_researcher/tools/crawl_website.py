@@ -1,26 +1,59 @@
-from typing import List, Set, Union
+from typing import List, Set, Tuple, Union
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
-import aiohttp
-from .web_search import scrape_urls, ssl_context, ScrapeResult, WebpageSnippet
-from agents import function_tool
+from .web_search import scrape_urls, ScrapeResult, WebpageSnippet
+from ..llm_client import LLMConfig, get_default_config
+from agents import FunctionTool, custom_span, function_tool
 
 
-@function_tool
-async def crawl_website(starting_url: str) -> Union[List[ScrapeResult], str]:
-    """Crawls the pages of a website starting with the starting_url and then descending into the pages linked from there.
-    Prioritizes links found in headers/navigation, then body links, then subsequent pages.
+def extract_links(html: str, current_url: str, base_domain: str) -> Tuple[List[str], List[str]]:
+    """Extract the links from HTML content to pages on base_domain, as (navigation/header links, other body links)"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    nav_links = set()
+    body_links = set()
+    
+    # Find navigation/header links
+    for nav_element in soup.find_all(['nav', 'header']):
+        for a in nav_element.find_all('a', href=True):
+            link = urljoin(current_url, a['href'])
+            if urlparse(link).netloc == base_domain:
+                nav_links.add(link)
     
-    Args:
-        starting_url: Starting URL to scrape
+    # Find remaining body links
+    for a in soup.find_all('a', href=True):
+        link = urljoin(current_url, a['href'])
+        if urlparse(link).netloc == base_domain and link not in nav_links:
+            body_links.add(link)
+            
+    return list(nav_links), list(body_links)
+
+
+def create_crawl_website_tool(config: LLMConfig) -> FunctionTool:
+    """Create a crawl_website tool that fetches pages with the shared HTTP session of the config's client registry"""
+
+    @function_tool
+    async def crawl_website(starting_url: str) -> Union[List[ScrapeResult], str]:
+        """Crawls the pages of a website starting with the starting_url and then descending into the pages linked from there.
+        Prioritizes links found in headers/navigation, then body links, then subsequent pages.
         
-    Returns:
-        List of ScrapeResult objects which have the following fields:
-            - url: The URL of the web page
-            - title: The title of the web page
-            - description: The description of the web page
-            - text: The text content of the web page
-    """
+        Args:
+            starting_url: Starting URL to scrape
+            
+        Returns:
+            List of ScrapeResult objects which have the following fields:
+                - url: The URL of the web page
+                - title: The title of the web page
+                - description: The description of the web page
+                - text: The text content of the web page
+        """
+        return await crawl(starting_url, config)
+
+    return crawl_website
+
+
+async def crawl(starting_url: str, config: LLMConfig) -> Union[List[ScrapeResult], str]:
+    """Crawl the pages of a website breadth-first, starting with the starting_url, and scrape their contents"""
     if not starting_url:
         return "Empty URL provided"
 
@@ -31,38 +64,19 @@ async def crawl_website(starting_url: str) -> Union[List[ScrapeResult], str]:
     max_pages = 10
     base_domain = urlparse(starting_url).netloc
     
-    async def extract_links(html: str, current_url: str) -> tuple[List[str], List[str]]:
-        """Extract prioritized links from HTML content"""
-        soup = BeautifulSoup(html, 'html.parser')
-        nav_links = set()
-        body_links = set()
-        
-        # Find navigation/header links
-        for nav_element in soup.find_all(['nav', 'header']):
-            for a in nav_element.find_all('a', href=True):
-                link = urljoin(current_url, a['href'])
-                if urlparse(link).netloc == base_domain:
-                    nav_links.add(link)
-        
-        # Find remaining body links
-        for a in soup.find_all('a', href=True):
-            link = urljoin(current_url, a['href'])
-            if urlparse(link).netloc == base_domain and link not in nav_links:
-                body_links.add(link)
-                
-        return list(nav_links), list(body_links)
-
+    session = config.registry.get_http_session()
+    
     async def fetch_page(url: str) -> str:
         """Fetch HTML content from a URL"""
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            try:
+        try:
+            with custom_span("http_fetch", data={"url": url}) as span:
                 async with session.get(url, timeout=30) as response:
+                    span.span_data.data["status"] = response.status
                     if response.status == 200:
                         return await response.text()
-            except Exception as e:
-                print(f"Error fetching {url}: {str(e)}")
-                return "Error fetching page"
+        except Exception as e:
+            print(f"Error fetching {url}: {str(e)}")
+            return "Error fetching page"
 
     # Initialize with starting URL
     queue: List[str] = [starting_url]
@@ -76,7 +90,7 @@ async def crawl_website(starting_url: str) -> Union[List[ScrapeResult], str]:
         # Fetch and process the page
         html_content = await fetch_page(current_url)
         if html_content:
-            nav_links, body_links = await extract_links(html_content, current_url)
+            nav_links, body_links = extract_links(html_content, current_url, base_domain)
             
             # Add unvisited nav links to current queue (higher priority)
             remaining_slots = max_pages - len(all_pages_to_scrape)
@@ -105,5 +119,14 @@ async def crawl_website(starting_url: str) -> Union[List[ScrapeResult], str]:
     pages_to_scrape = [WebpageSnippet(url=page, title="", description="") for page in pages_to_scrape]
     
     # Use scrape_urls to get the content for all discovered pages
-    result = await scrape_urls(pages_to_scrape)
-    return result
\ No newline at end of file
+    result = await scrape_urls(pages_to_scrape, session=session)
+    return result
+
+
+def __getattr__(name: str):
+    # The default crawl_website tool is created on first access, as it needs the default LLM config
+    if name == "crawl_website":
+        value = create_crawl_website_tool(get_default_config())
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
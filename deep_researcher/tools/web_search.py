@@ -1,20 +1,22 @@
 import json
 import os
 import ssl
-import aiohttp
 import asyncio
-from agents import function_tool
+from agents import FunctionTool, custom_span, function_tool
 from ..agents.baseclass import ResearchAgent, ResearchRunner
 from ..agents.utils.parse_output import create_type_parser
-from typing import List, Union, Optional
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, List, Union, Optional
 from pydantic import BaseModel, Field
-from ..llm_client import fast_model, model_supports_structured_output
+from ..llm_client import ClientRegistry, LLMConfig, client_registry, get_default_config, model_supports_structured_output
+from ..resilience import call_with_retries, get_circuit_breaker
+from ..freshness import record_validators
+
+if TYPE_CHECKING:
+    import aiohttp
+
+# aiohttp and bs4 are imported where they are used, as they are only needed once a search or crawl is run
 
-load_dotenv()
 CONTENT_LENGTH_LIMIT = 10000  # Trim scraped content to this length to avoid large context / token limit issues
-SEARCH_PROVIDER = os.getenv("SEARCH_PROVIDER", "serper").lower()
 
 # ------- DEFINE TYPES -------
 
@@ -35,47 +37,43 @@ class SearchResults(BaseModel):
 
 # ------- DEFINE TOOL -------
 
-# Add a module-level variable to store the singleton instance
-_serper_client = None
-
-
-@function_tool
-async def web_search(query: str) -> Union[List[ScrapeResult], str]:
-    """Perform a web search for a given query and get back the URLs along with their titles, descriptions and text contents.
-    
-    Args:
-        query: The search query
+def create_web_search_tool(config: LLMConfig) -> FunctionTool:
+    """Create a web_search tool that uses the given config for filtering search results by relevance"""
+    @function_tool
+    async def web_search(query: str) -> Union[List[ScrapeResult], str]:
+        """Perform a web search for a given query and get back the URLs along with their titles, descriptions and text contents.
         
-    Returns:
-        List of ScrapeResult objects which have the following fields:
-            - url: The URL of the search result
-            - title: The title of the search result
-            - description: The description of the search result
-            - text: The full text content of the search result
-    """
-    # Only use SerperClient if search provider is serper
-    if SEARCH_PROVIDER == "openai":
-        # For OpenAI search provider, this function should not be called directly
-        # The WebSearchTool from the agents module will be used instead
-        return f"The web_search function is not used when SEARCH_PROVIDER is set to 'openai'. Please check your configuration."
-    else:
-        try:
-            # Lazy initialization of SerperClient
-            global _serper_client
-            if _serper_client is None:
-                _serper_client = SerperClient()
-
-            search_results = await _serper_client.search(query, filter_for_relevance=True, max_results=5)
-            results = await scrape_urls(search_results)
-            return results
-        except Exception as e:
-            # Return a user-friendly error message
-            return f"Sorry, I encountered an error while searching: {str(e)}"
+        Args:
+            query: The search query
+            
+        Returns:
+            List of ScrapeResult objects which have the following fields:
+                - url: The URL of the search result
+                - title: The title of the search result
+                - description: The description of the search result
+                - text: The full text content of the search result
+        """
+        # Only use SerperClient if search provider is serper
+        if config.search_provider == "openai":
+            # For OpenAI search provider, this function should not be called directly
+            # The WebSearchTool from the agents module will be used instead
+            return f"The web_search function is not used when SEARCH_PROVIDER is set to 'openai'. Please check your configuration."
+        else:
+            try:
+                search_results = await get_serper_client(config).search(query, filter_for_relevance=True, max_results=5)
+                results = await scrape_urls(search_results, session=config.registry.get_http_session())
+                return results
+            except Exception as e:
+                # Return a user-friendly error message
+                return f"Sorry, I encountered an error while searching: {str(e)}"
+
+    return web_search
 
 
 # ------- DEFINE AGENT FOR FILTERING SEARCH RESULTS BY RELEVANCE -------
 
-FILTER_AGENT_INSTRUCTIONS = f"""
+def build_filter_agent_instructions() -> str:
+    return f"""
 You are a search result filter. Your task is to analyze a list of SERP search results and determine which ones are relevant
 to the original query based on the link, title and snippet. Return only the relevant results in the specified format. 
 
@@ -86,34 +84,72 @@ Only output JSON. Follow the JSON schema below. Do not output anything else. I w
 {SearchResults.model_json_schema()}
 """
 
-selected_model = fast_model
 
-filter_agent = ResearchAgent(
-    name="SearchFilterAgent",
-    instructions=FILTER_AGENT_INSTRUCTIONS,
-    model=selected_model,
-    output_type=SearchResults if model_supports_structured_output(selected_model) else None,
-    output_parser=create_type_parser(SearchResults) if not model_supports_structured_output(selected_model) else None
-)
+def init_filter_agent(config: LLMConfig) -> ResearchAgent:
+    selected_model = config.fast_model
+
+    return ResearchAgent(
+        name="SearchFilterAgent",
+        instructions=build_filter_agent_instructions(),
+        model=selected_model,
+        output_type=SearchResults if model_supports_structured_output(selected_model) else None,
+        output_parser=create_type_parser(SearchResults) if not model_supports_structured_output(selected_model) else None,
+        backup_model=config.backup_model
+    )
+
+
+def get_serper_client(config: LLMConfig) -> "SerperClient":
+    """Get the SerperClient of a config, creating it on first use so that all of its searches share the client"""
+    return config.get_agent(
+        "SerperClient",
+        lambda config: SerperClient(filter_agent=config.get_agent("SearchFilterAgent", init_filter_agent), registry=config.registry),
+    )
+
+
+def __getattr__(name: str):
+    if name == "filter_agent":
+        value = init_filter_agent(get_default_config())
+    elif name == "web_search":
+        value = create_web_search_tool(get_default_config())
+    elif name == "ssl_context":
+        value = get_ssl_context()
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
 
 # ------- DEFINE UNDERLYING TOOL LOGIC -------
 
-# Create a shared connector
-ssl_context = ssl.create_default_context()
-ssl_context.check_hostname = False
-ssl_context.verify_mode = ssl.CERT_NONE
-ssl_context.set_ciphers('DEFAULT:@SECLEVEL=1')  # Add this line to allow older cipher suites
+_ssl_context: Optional[ssl.SSLContext] = None
+
+
+def get_ssl_context() -> ssl.SSLContext:
+    """Get the SSL context shared by all connectors, creating it on first use (loading the CA certificates is slow)"""
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+        _ssl_context.check_hostname = False
+        _ssl_context.verify_mode = ssl.CERT_NONE
+        _ssl_context.set_ciphers('DEFAULT:@SECLEVEL=1')  # Add this line to allow older cipher suites
+    return _ssl_context
 
 
 class SerperClient:
     """A client for the Serper API to perform Google searches."""
 
-    def __init__(self, api_key: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        filter_agent: Optional[ResearchAgent] = None,
+        registry: Optional[ClientRegistry] = None
+    ):
         self.api_key = api_key or os.getenv("SERPER_API_KEY")
+        self.filter_agent = filter_agent or init_filter_agent(get_default_config())  # Agent used to filter the search results by relevance
+        self.registry = registry or client_registry  # Provides the HTTP session that the API is called with
         if not self.api_key:
             raise ValueError("No API key provided. Set SERPER_API_KEY environment variable.")
         
-        self.url = "https://google.serper.dev/search"
+        self.url = os.getenv("SERPER_API_URL", "https://google.serper.dev/search")  # Can be pointed at a compatible endpoint, e.g. for benchmarks
         self.headers = {
             "X-API-KEY": self.api_key,
             "Content-Type": "application/json"
@@ -129,23 +165,10 @@ class SerperClient:
         Returns:
             Dictionary with search results
         """
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            async with session.post(
-                self.url,
-                headers=self.headers,
-                json={"q": query, "autocorrect": False}
-            ) as response:
-                response.raise_for_status()
-                results = await response.json()
-                results_list = [
-                    WebpageSnippet(
-                        url=result.get('link', ''),
-                        title=result.get('title', ''),
-                        description=result.get('snippet', '')
-                    )
-                    for result in results.get('organic', [])
-                ]
+        results_list = await call_with_retries(
+            lambda: self._fetch_results(query),
+            breaker=get_circuit_breaker(self.url)
+        )
                 
         if not results_list:
             return []
@@ -155,6 +178,26 @@ class SerperClient:
             
         return await self._filter_results(results_list, query, max_results=max_results)
 
+    async def _fetch_results(self, query: str) -> List[WebpageSnippet]:
+        """Call the Serper API and convert the organic results into WebpageSnippet objects"""
+        session = self.registry.get_http_session()
+        with custom_span("serper_search", data={"query": query}):
+            async with session.post(
+                self.url,
+                headers=self.headers,
+                json={"q": query, "autocorrect": False}
+            ) as response:
+                response.raise_for_status()
+                results = await response.json()
+            return [
+                WebpageSnippet(
+                    url=result.get('link', ''),
+                    title=result.get('title', ''),
+                    description=result.get('snippet', '')
+                )
+                for result in results.get('organic', [])
+            ]
+
     async def _filter_results(self, results: List[WebpageSnippet], query: str, max_results: int = 5) -> List[WebpageSnippet]:
         serialized_results = [result.model_dump() if isinstance(result, WebpageSnippet) else result for result in results]
         
@@ -168,7 +211,7 @@ class SerperClient:
         """
         
         try:
-            result = await ResearchRunner.run(filter_agent, user_prompt)
+            result = await ResearchRunner.run(self.filter_agent, user_prompt)
             output = result.final_output_as(SearchResults)
             return output.results_list
         except Exception as e:
@@ -176,11 +219,12 @@ class SerperClient:
             return results[:max_results]
 
 
-async def scrape_urls(items: List[WebpageSnippet]) -> List[ScrapeResult]:
+async def scrape_urls(items: List[WebpageSnippet], session: Optional["aiohttp.ClientSession"] = None) -> List[ScrapeResult]:
     """Fetch text content from provided URLs.
     
     Args:
         items: List of SearchEngineResult items to extract content from
+        session: HTTP session to fetch the URLs with (defaults to the session of the shared client registry)
         
     Returns:
         List of ScrapeResult objects which have the following fields:
@@ -189,22 +233,21 @@ async def scrape_urls(items: List[WebpageSnippet]) -> List[ScrapeResult]:
             - description: The description of the search result
             - text: The full text content of the search result
     """
-    connector = aiohttp.TCPConnector(ssl=ssl_context)
-    async with aiohttp.ClientSession(connector=connector) as session:
-        # Create list of tasks for concurrent execution
-        tasks = []
-        for item in items:
-            if item.url:  # Skip empty URLs
-                tasks.append(fetch_and_process_url(session, item))
-                
-        # Execute all tasks concurrently and gather results
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Filter out errors and return successful results
-        return [r for r in results if isinstance(r, ScrapeResult)]
+    session = session or client_registry.get_http_session()
+    # Create list of tasks for concurrent execution
+    tasks = []
+    for item in items:
+        if item.url:  # Skip empty URLs
+            tasks.append(fetch_and_process_url(session, item))
+            
+    # Execute all tasks concurrently and gather results
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    
+    # Filter out errors and return successful results
+    return [r for r in results if isinstance(r, ScrapeResult)]
 
 
-async def fetch_and_process_url(session: aiohttp.ClientSession, item: WebpageSnippet) -> ScrapeResult:
+async def fetch_and_process_url(session: "aiohttp.ClientSession", item: WebpageSnippet) -> ScrapeResult:
     """Helper function to fetch and process a single URL."""
 
     if not is_valid_url(item.url):
@@ -216,28 +259,32 @@ async def fetch_and_process_url(session: aiohttp.ClientSession, item: WebpageSni
         )
 
     try:
-        async with session.get(item.url, timeout=8) as response:
-            if response.status == 200:
-                content = await response.text()
-                # Run html_to_text in a thread pool to avoid blocking
-                text_content = await asyncio.get_event_loop().run_in_executor(
-                    None, html_to_text, content
-                )
-                text_content = text_content[:CONTENT_LENGTH_LIMIT]  # Trim content to avoid exceeding token limit
-                return ScrapeResult(
-                    url=item.url,
-                    title=item.title,
-                    description=item.description,
-                    text=text_content
-                )
-            else:
-                # Instead of raising, return a WebSearchResult with an error message
-                return ScrapeResult(
-                    url=item.url,
-                    title=item.title,
-                    description=item.description,
-                    text=f"Error fetching content: HTTP {response.status}"
-                )
+        with custom_span("http_fetch", data={"url": item.url}) as span:
+            async with session.get(item.url, timeout=8) as response:
+                span.span_data.data["status"] = response.status
+                content = await response.text() if response.status == 200 else None
+                if content is not None:
+                    record_validators(item.url, response.headers, str(response.url))
+        if content is None:
+            # Instead of raising, return a WebSearchResult with an error message
+            return ScrapeResult(
+                url=item.url,
+                title=item.title,
+                description=item.description,
+                text=f"Error fetching content: HTTP {response.status}"
+            )
+        # Run html_to_text in a thread pool to avoid blocking
+        with custom_span("html_to_text", data={"url": item.url, "html_characters": len(content)}):
+            text_content = await asyncio.get_event_loop().run_in_executor(
+                None, html_to_text, content
+            )
+        text_content = text_content[:CONTENT_LENGTH_LIMIT]  # Trim content to avoid exceeding token limit
+        return ScrapeResult(
+            url=item.url,
+            title=item.title,
+            description=item.description,
+            text=text_content
+        )
     except Exception as e:
         # Instead of raising, return a WebSearchResult with an error message
         return ScrapeResult(
@@ -252,6 +299,8 @@ def html_to_text(html_content: str) -> str:
     """
     Strips out all of the unnecessary elements from the HTML context to prepare it for text extraction / LLM processing.
     """
+    from bs4 import BeautifulSoup
+
     # Parse the HTML using lxml for speed
     soup = BeautifulSoup(html_content, 'lxml')
 
@@ -0,0 +1,49 @@
+import asyncio
+
+
+def test_load_jobs_from_jsonl_and_csv(tmp_path):
+    from deep_researcher.batch import load_jobs
+
+    jsonl_file = tmp_path / "jobs.jsonl"
+    jsonl_file.write_text('{"query": "EV market"}\n\n{"id": "acme", "query": "Acme Corp", "mode": "simple"}\n')
+    csv_file = tmp_path / "jobs.csv"
+    csv_file.write_text("id,query,mode,max_iterations\n,EV market,,\nacme,Acme Corp,simple,2\n")
+
+    jsonl_jobs = load_jobs(str(jsonl_file))
+    csv_jobs = load_jobs(str(csv_file))
+
+    assert [job.mode for job in jsonl_jobs] == ["deep", "simple"]
+    assert jsonl_jobs[1].id == "acme" and csv_jobs[1].max_iterations == 2
+    # Jobs without an ID get one from their fields, so it is the same every time the file is loaded
+    assert jsonl_jobs[0].id == csv_jobs[0].id == load_jobs(str(jsonl_file))[0].id
+
+
+def test_batch_skips_completed_jobs_on_restart(tmp_path, monkeypatch):
+    from deep_researcher.batch import BatchJob, BatchResult, BatchRunner
+
+    started = []
+    in_progress = []
+    max_in_progress = 0
+
+    async def fake_run_job(self, job):
+        nonlocal max_in_progress
+        started.append(job.id)
+        in_progress.append(job.id)
+        max_in_progress = max(max_in_progress, len(in_progress))
+        await asyncio.sleep(0.01)
+        in_progress.remove(job.id)
+        if job.query == "fails":
+            return BatchResult(id=job.id, query=job.query, status="failed", error="RuntimeError: boom")
+        return BatchResult(id=job.id, query=job.query, status="completed")
+
+    monkeypatch.setattr(BatchRunner, "_run_job", fake_run_job)
+    jobs = [BatchJob(query=f"query {i}") for i in range(5)] + [BatchJob(query="fails")]
+
+    results = asyncio.run(BatchRunner(str(tmp_path), max_concurrent_jobs=2).run(jobs))
+    assert len(results) == 6 and max_in_progress == 2
+    assert len((tmp_path / "results.jsonl").read_text().splitlines()) == 6
+
+    # Only the failed job is run again
+    started.clear()
+    asyncio.run(BatchRunner(str(tmp_path), max_concurrent_jobs=2).run(jobs))
+    assert started == [jobs[-1].id]
@@ -0,0 +1,93 @@
+def test_blackboard_reuses_similar_tasks():
+    import asyncio
+    from deep_researcher.agents.tool_agents import ToolAgentOutput
+    from deep_researcher.agents.tool_selector_agent import AgentTask
+    from deep_researcher.blackboard import FindingsBlackboard
+
+    blackboard = FindingsBlackboard()
+    calls = []
+
+    async def run_task(task, section):
+        async def run():
+            calls.append(task.query)
+            await asyncio.sleep(0.01)
+            return ToolAgentOutput(output=f"Findings for {task.query}", sources=["https://example.com/a"])
+        return await blackboard.run_task(task, run, section=section)
+
+    async def research():
+        search = AgentTask(agent="WebSearchAgent", query="Tesla battery suppliers 2024")
+        # The same query running concurrently in two sections only calls the tool once
+        first, second = await asyncio.gather(run_task(search, "Supply chain"), run_task(search, "Batteries"))
+        # A query with the same terms in a different order is answered from the blackboard
+        reordered = await run_task(AgentTask(agent="WebSearchAgent", query="2024 battery suppliers of Tesla"), "Costs")
+        # A different query, or the same query for a different agent, is not
+        other = await run_task(AgentTask(agent="WebSearchAgent", query="Tesla vehicle deliveries"), "Sales")
+        crawl = await run_task(
+            AgentTask(agent="SiteCrawlerAgent", query="Tesla battery suppliers 2024", entity_website="tesla.com"), "Sales"
+        )
+        return first, second, reordered, other, crawl
+
+    first, second, reordered, other, crawl = asyncio.run(research())
+    assert sorted(reused for _, reused in [first, second]) == [False, True]
+    assert first[0] is second[0]
+    assert reordered == (first[0], True)
+    assert other[1] is False and crawl[1] is False
+    assert len(calls) == 3
+    assert blackboard.lookups == 5 and blackboard.hits == 2
+    assert "2 of 5 tool calls reused (40%)" in blackboard.summary()
+
+
+def test_blackboard_does_not_share_failures():
+    import asyncio
+    from deep_researcher.agents.tool_agents import ToolAgentOutput
+    from deep_researcher.agents.tool_selector_agent import AgentTask
+    from deep_researcher.blackboard import FindingsBlackboard
+
+    blackboard = FindingsBlackboard()
+    task = AgentTask(agent="WebSearchAgent", query="Tesla battery suppliers")
+
+    async def failed_search():
+        return ToolAgentOutput(output="Error executing search", sources=[])
+
+    async def search():
+        return ToolAgentOutput(output="Panasonic, LG and CATL", sources=["https://example.com"])
+
+    async def research():
+        # Outputs without sources (e.g. errors) are returned but not published
+        assert await blackboard.run_task(task, failed_search) == (ToolAgentOutput(output="Error executing search"), False)
+        assert (await blackboard.run_task(task, search))[1] is False
+        assert (await blackboard.run_task(task, failed_search))[1] is True
+
+    asyncio.run(research())
+    assert len(blackboard.entries) == 1
+
+
+def test_blackboard_waiters_take_over_when_the_owner_fails():
+    import asyncio
+    from deep_researcher.agents.tool_agents import ToolAgentOutput
+    from deep_researcher.agents.tool_selector_agent import AgentTask
+    from deep_researcher.blackboard import FindingsBlackboard
+
+    blackboard = FindingsBlackboard()
+    task = AgentTask(agent="WebSearchAgent", query="battery market size")
+    calls = []
+
+    async def search(section: str) -> ToolAgentOutput:
+        calls.append(section)
+        await asyncio.sleep(0.01)
+        if section == "A":
+            raise RuntimeError("search failed")
+        return ToolAgentOutput(output=f"Found by {section}", sources=["https://example.com"])
+
+    async def research():
+        return await asyncio.wait_for(asyncio.gather(
+            *(blackboard.run_task(task, lambda section=section: search(section), section) for section in "ABCD"),
+            return_exceptions=True,
+        ), timeout=2)
+
+    results = asyncio.run(research())
+    assert isinstance(results[0], RuntimeError)
+    # One waiting section takes over the failed call and the others reuse its output
+    assert len(calls) == 2
+    assert [reused for _, reused in results[1:]].count(False) == 1
+    assert not blackboard.pending
@@ -0,0 +1,132 @@
+import asyncio
+from types import SimpleNamespace
+
+
+def _make_checkpoint():
+    from deep_researcher.agents.long_writer_agent import LongWriterOutput
+    from deep_researcher.agents.planner_agent import ReportPlan, ReportPlanSection
+    from deep_researcher.checkpoint import RunCheckpoint, SectionCheckpoint
+    from deep_researcher.iterative_research import Conversation
+
+    conversation = Conversation()
+    conversation.add_iteration()
+    conversation.set_latest_thought("Thought")
+    conversation.set_latest_gap("Gap")
+    conversation.set_latest_findings(["Finding [1](https://example.com/a)"])
+    return RunCheckpoint(
+        run_id="run-1",
+        query="query",
+        report_plan=ReportPlan(
+            background_context="Background",
+            report_title="Title",
+            report_outline=[ReportPlanSection(title="A", key_question="What about A?")],
+        ),
+        sections={0: SectionCheckpoint(iterations=conversation.history, sources=["https://example.com/a"])},
+        written_sections={0: LongWriterOutput(next_section_markdown="## A\nText [1]", references=["[1] https://example.com/a"])},
+    )
+
+
+def test_checkpoint_stores_round_trip(tmp_path):
+    from deep_researcher.checkpoint import FileCheckpointStore, SQLiteCheckpointStore, open_checkpoint_store
+
+    checkpoint = _make_checkpoint()
+    for location in [str(tmp_path / "checkpoints"), str(tmp_path / "checkpoints.db")]:
+        store = open_checkpoint_store(location)
+        assert isinstance(store, SQLiteCheckpointStore if location.endswith(".db") else FileCheckpointStore)
+        assert store.load("run-1") is None
+
+        store.save(checkpoint)
+        loaded = store.load("run-1")
+        assert loaded == checkpoint
+        assert loaded.sections[0].iterations[0].thought == "Thought"
+        assert store.list_runs() == ["run-1"]
+        store.close()
+
+
+def test_checkpoint_store_must_implement_all_methods():
+    import pytest
+    from deep_researcher.checkpoint import CheckpointStore
+
+    class MemoryCheckpointStore(CheckpointStore):
+        def __init__(self):
+            self.checkpoints = {}
+
+        def load(self, run_id):
+            return self.checkpoints.get(run_id)
+
+        def save(self, checkpoint):
+            self.checkpoints[checkpoint.run_id] = checkpoint
+
+    # A store that misses a method fails when it is created rather than halfway through a run
+    with pytest.raises(TypeError):
+        MemoryCheckpointStore()
+
+    class ListingMemoryCheckpointStore(MemoryCheckpointStore):
+        def list_runs(self):
+            return sorted(self.checkpoints)
+
+    store = ListingMemoryCheckpointStore()
+    store.save(_make_checkpoint())
+    assert store.list_runs() == ["run-1"]
+    store.close()
+
+
+def test_report_writing_reuses_written_sections(monkeypatch):
+    from deep_researcher.agents import long_writer_agent
+    from deep_researcher.agents.long_writer_agent import LongWriterOutput, write_report_as_sections_complete
+
+    written = []
+
+    async def fake_write_next_section(original_query, report_draft, next_section_title, next_section_draft, agent=None):
+        written.append(next_section_title)
+        return LongWriterOutput(next_section_markdown=f"## {next_section_title}\nText [1]", references=[f"[1] https://example.com/{next_section_title}"])
+
+    monkeypatch.setattr(long_writer_agent, "write_next_section", fake_write_next_section)
+    monkeypatch.setattr(long_writer_agent, "init_long_writer_agent", lambda config: SimpleNamespace())
+
+    async def draft(title: str) -> str:
+        return f"Draft of {title}"
+
+    saves = []
+    written_sections = {0: LongWriterOutput(next_section_markdown="## A\nSaved text [1]", references=["[1] https://example.com/A"])}
+    report = asyncio.run(write_report_as_sections_complete(
+        "query", "Title", ["A", "B"], [draft("A"), draft("B")],
+        written_sections=written_sections, on_section_written=lambda: saves.append(sorted(written_sections)),
+    ))
+
+    assert written == ["B"]
+    assert saves == [[0, 1]]
+    assert "Saved text [1]" in report and "## B\nText [2]" in report
+
+
+def test_iterative_researcher_resumes_after_last_saved_iteration(monkeypatch):
+    from deep_researcher.iterative_research import IterativeResearcher
+
+    checkpoint = _make_checkpoint().sections[0]
+    saves = []
+    researcher = IterativeResearcher(
+        max_iterations=3, verbose=False, checkpoint=checkpoint, on_checkpoint=lambda: saves.append(len(checkpoint.iterations))
+    )
+    iterations = []
+
+    async def fake_generate_observations(query, background_context=""):
+        iterations.append(researcher.iteration)
+        researcher.conversation.set_latest_thought("New thought")
+
+    async def fake_evaluate_gaps(query, background_context=""):
+        return SimpleNamespace(research_complete=True)
+
+    async def fake_create_final_report(query, length="", instructions=""):
+        return "Report: " + researcher.conversation.compile_conversation_history()
+
+    monkeypatch.setattr(researcher, "_generate_observations", fake_generate_observations)
+    monkeypatch.setattr(researcher, "_evaluate_gaps", fake_evaluate_gaps)
+    monkeypatch.setattr(researcher, "_create_final_report", fake_create_final_report)
+    report = asyncio.run(researcher.run("query"))
+
+    # The first iteration is restored from the checkpoint rather than run again
+    assert iterations == [2]
+    assert "[ITERATION 1]" in report and "Finding [1](https://example.com/a)" in report
+    assert researcher.sources == ["https://example.com/a"]
+    assert checkpoint.research_complete and checkpoint.draft == report
+    assert saves[0] == 2
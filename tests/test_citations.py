@@ -0,0 +1,26 @@
+def test_canonicalize_url():
+    from deep_researcher.agents.utils.citations import canonicalize_url
+
+    assert canonicalize_url("https://x.com/a") == canonicalize_url("http://x.com/a/")
+    assert canonicalize_url("https://www.X.com/a#intro") == canonicalize_url("x.com/a")
+    assert canonicalize_url("https://x.com/a?utm_source=feed&id=2") == canonicalize_url("https://x.com/a?id=2")
+    assert canonicalize_url("https://x.com/a?id=2") != canonicalize_url("https://x.com/a?id=3")
+    assert canonicalize_url("https://x.com:8080/a") != canonicalize_url("https://x.com/a")
+
+
+def test_citation_index():
+    from deep_researcher.agents.utils.citations import CitationIndex
+
+    index = CitationIndex(known_sources=["https://x.com/a", "https://y.com"])
+    first = index.add_section("A [1] and B [2].", ["[1] https://x.com/a", "[2] https://y.com"])
+    # The same sources with different URL forms get the same numbers, and citations without a reference are removed
+    second = index.add_section(
+        "B [1], A [2], C [3] and D [4].",
+        ["[1] http://www.y.com/", "[2] https://x.com/a#top", "[3] https://z.com/c"],
+    )
+    assert first == "A [1] and B [2]."
+    assert second == "B [2], A [1], C [3] and D ."
+    assert index.render_references() == "[1] https://x.com/a  \n[2] https://y.com  \n[3] https://z.com/c"
+
+    # Citations of URLs that weren't retrieved during the research are flagged
+    assert index.unverified == {"https://z.com/c"}
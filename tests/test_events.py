@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_report_chunks_are_streamed_as_sections_are_written(monkeypatch):
+    from deep_researcher.agents import long_writer_agent
+    from deep_researcher.agents.long_writer_agent import LongWriterOutput, write_report_as_sections_complete
+    from deep_researcher.events import ReportChunkEvent, ResearchDoneEvent, SectionDoneEvent, emit, stream_events
+
+    async def fake_write_next_section(original_query, report_draft, next_section_title, next_section_draft, agent=None):
+        return LongWriterOutput(
+            next_section_markdown=f"## {next_section_title}\n{next_section_draft} [1]",
+            references=[f"[1] https://example.com/{next_section_title}"],
+        )
+
+    monkeypatch.setattr(long_writer_agent, "write_next_section", fake_write_next_section)
+    monkeypatch.setattr(long_writer_agent, "init_long_writer_agent", lambda config: SimpleNamespace())
+
+    async def research(title: str, delay: float) -> str:
+        await asyncio.sleep(delay)
+        await emit(SectionDoneEvent(section=title, draft=f"Draft of {title}"))
+        return f"Draft of {title}"
+
+    async def run_report() -> None:
+        tasks = [asyncio.create_task(research(title, delay)) for title, delay in [("A", 0.01), ("B", 0.1)]]
+        report = await write_report_as_sections_complete("query", "Title", ["A", "B"], tasks)
+        await emit(ResearchDoneEvent(report=report))
+
+    async def run():
+        return [event async for event in stream_events(run_report())]
+
+    events = asyncio.run(run())
+    chunks = [event.text for event in events if isinstance(event, ReportChunkEvent)]
+    kinds = [(event.type, event.section) for event in events if not isinstance(event, ReportChunkEvent)]
+
+    # The header and section A are streamed before the research for section B is done
+    assert chunks[0].startswith("# Title") and chunks[1].startswith("## A")
+    assert events.index(next(event for event in events if event.type == "section_done" and event.section == "B")) > 2
+    assert kinds == [("section_done", "A"), ("section_done", "B"), ("research_done", None)]
+    assert "".join(chunks) == events[-1].report
+
+
+def test_stream_waits_for_a_slow_consumer_and_cancels_when_it_stops():
+    from deep_researcher.events import LogEvent, emit, emit_log, get_current_stream, stream_events
+
+    emitted = 0
+    cancelled = False
+
+    async def research() -> None:
+        nonlocal emitted, cancelled
+        try:
+            for i in range(100):
+                await emit(LogEvent(message=str(i)))
+                emitted += 1
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    async def run():
+        events = stream_events(research(), max_queued_events=5)
+        async for event in events:
+            await asyncio.sleep(0.01)
+            if event.message == "2":
+                break
+        await events.aclose()
+        await asyncio.sleep(0)
+        return get_current_stream()
+
+    assert asyncio.run(run()) is None  # The stream is only active within the research
+    # The research got at most a full queue ahead of the consumer before it was cancelled
+    assert emitted <= 3 + 5 + 1 and cancelled
+    assert emit_log("no stream") is False
+
+
+def test_stream_raises_the_error_of_the_research():
+    from deep_researcher.events import LogEvent, emit, stream_events
+
+    async def research() -> None:
+        await emit(LogEvent(message="started"))
+        raise RuntimeError("boom")
+
+    async def run():
+        return [event.message async for event in stream_events(research())]
+
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(run())
@@ -0,0 +1,11 @@
+def test_extract_links_prioritizes_navigation_links_on_the_same_domain():
+    from deep_researcher.tools.crawl_website import extract_links
+
+    html = (
+        '<header><nav><a href="/about">About</a><a href="https://other.com/x">Other</a></nav></header>'
+        '<p><a href="/about">About again</a> <a href="products/1">Product</a> <a href="https://other.com/y">Y</a></p>'
+    )
+    nav_links, body_links = extract_links(html, "https://example.com/start/", "example.com")
+
+    assert nav_links == ["https://example.com/about"]
+    assert body_links == ["https://example.com/start/products/1"]
@@ -0,0 +1,124 @@
+import asyncio
+
+
+def test_check_sources_with_conditional_requests():
+    from aiohttp import web
+    from deep_researcher.freshness import SourceValidator, check_sources
+
+    async def etag_page(request):
+        if request.headers.get("If-None-Match") == '"v2"':
+            return web.Response(status=304)
+        return web.Response(text="page", headers={"ETag": '"v2"'})
+
+    async def get_only_page(request):
+        if request.method == "HEAD":
+            return web.Response(status=405)
+        return web.Response(text="page", headers={"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    async def plain_page(request):
+        return web.Response(text="page")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/etag", etag_page)
+        app.router.add_route("*", "/get-only", get_only_page)
+        app.router.add_get("/plain", plain_page)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        try:
+            validators = {
+                f"{base_url}/etag": SourceValidator(etag='"v2"'),
+                f"{base_url}/etag?old": SourceValidator(etag='"v1"'),
+                f"{base_url}/get-only": SourceValidator(last_modified="Mon, 01 Jan 2024 00:00:00 GMT"),
+                f"{base_url}/plain": SourceValidator(),
+                f"{base_url}/missing": SourceValidator(etag='"v1"'),
+            }
+            return base_url, await check_sources(validators, validators)
+        finally:
+            await runner.cleanup()
+
+    base_url, checks = asyncio.run(run())
+    assert checks[f"{base_url}/etag"].changed is False
+    assert checks[f"{base_url}/etag?old"].changed is True
+    assert checks[f"{base_url}/get-only"].changed is False
+    assert checks[f"{base_url}/plain"].changed is None
+    assert checks[f"{base_url}/missing"].changed is True
+
+
+def test_refresh_keeps_sections_with_fresh_sources(monkeypatch):
+    import time
+    from deep_researcher import deep_research
+    from deep_researcher.agents.long_writer_agent import LongWriterOutput
+    from deep_researcher.agents.planner_agent import ReportPlan, ReportPlanSection
+    from deep_researcher.checkpoint import RunCheckpoint, SectionCheckpoint
+    from deep_researcher.freshness import SourceCheck
+
+    async def fake_check_sources(urls, validators, max_concurrent=20):
+        return {url: SourceCheck(url=url, changed=url.endswith("changed")) for url in urls}
+
+    monkeypatch.setattr(deep_research, "check_sources", fake_check_sources)
+    now = time.time()
+    sections = {
+        0: SectionCheckpoint(sources=["https://example.com/fresh"], draft="A", researched_at=now),
+        1: SectionCheckpoint(sources=["https://example.com/fresh", "https://example.com/changed"], draft="B", researched_at=now),
+        2: SectionCheckpoint(sources=["https://example.com/fresh"], draft="C", researched_at=now - 10 * 86400),
+        3: SectionCheckpoint(sources=[], research_complete=True),
+    }
+    previous = RunCheckpoint(
+        run_id="previous",
+        query="query",
+        report_plan=ReportPlan(
+            background_context="",
+            report_title="Title",
+            report_outline=[ReportPlanSection(title=title, key_question=title) for title in "ABCD"],
+        ),
+        sections=sections,
+        written_sections={i: LongWriterOutput(next_section_markdown=f"## {title}", references=[]) for i, title in enumerate("ABC")},
+    )
+
+    researcher = deep_research.DeepResearcher(verbose=False)
+    checkpoint = asyncio.run(researcher._plan_refresh(previous, "refresh", max_age_days=7))
+
+    # Only the section whose sources are unchanged and recent enough is kept
+    assert checkpoint.refreshed_from == "previous"
+    assert list(checkpoint.sections) == [0] and checkpoint.sections[0].draft == "A"
+    assert list(checkpoint.written_sections) == [0]
+
+
+def test_validators_are_found_for_sources_cited_by_another_form_of_the_url(monkeypatch):
+    from deep_researcher import deep_research
+    from deep_researcher.agents.planner_agent import ReportPlan, ReportPlanSection
+    from deep_researcher.checkpoint import RunCheckpoint, SectionCheckpoint
+    from deep_researcher.freshness import SourceCheck, collect_validators, record_validators, stop_collecting_validators
+
+    validators = {}
+    token = collect_validators(validators)
+    try:
+        record_validators("http://www.example.com/a/?utm_source=x", {"ETag": '"a1"'})
+        record_validators("https://example.com/old", {"ETag": '"b1"'}, final_url="https://example.com/new")
+    finally:
+        stop_collecting_validators(token)
+
+    checked = {}
+
+    async def fake_check_sources(urls, validators, max_concurrent=20):
+        checked.update(validators)
+        return {url: SourceCheck(url=url, changed=False) for url in urls}
+
+    monkeypatch.setattr(deep_research, "check_sources", fake_check_sources)
+    previous = RunCheckpoint(
+        run_id="previous",
+        query="query",
+        report_plan=ReportPlan(background_context="", report_title="Title", report_outline=[ReportPlanSection(title="A", key_question="A")]),
+        sections={0: SectionCheckpoint(sources=["https://example.com/a", "https://example.com/new/"], draft="A")},
+        source_validators=validators,
+    )
+    checkpoint = asyncio.run(deep_research.DeepResearcher(verbose=False)._plan_refresh(previous, "refresh", max_age_days=None))
+
+    # The sources are checked with the ETags recorded when they were fetched, rather than by date
+    assert checked["https://example.com/a"].etag == '"a1"'
+    assert checked["https://example.com/new/"].etag == '"b1"'
+    assert set(checkpoint.source_validators) == {"example.com/a", "example.com/new"}
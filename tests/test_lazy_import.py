@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+
+def run_python(code: str) -> str:
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY") or "sk-test")
+    process = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert process.returncode == 0, process.stderr
+    return process.stdout.strip()
+
+
+def test_package_import_is_lazy():
+    # Importing the package doesn't import the agents SDK
+    assert run_python("import sys, deep_researcher; print('agents' in sys.modules)") == "False"
+
+    # Importing the research modules doesn't create any models or agents, or import the scraping libraries
+    output = run_python(
+        "import sys\n"
+        "from deep_researcher import DeepResearcher\n"
+        "from deep_researcher import llm_client\n"
+        "print(llm_client._default_config is None, 'bs4' in sys.modules)\n"
+        "from deep_researcher.agents.planner_agent import planner_agent\n"
+        "print(llm_client._default_config is not None, planner_agent.name)"
+    )
+    assert output.splitlines() == ["True False", "True PlannerAgent"]
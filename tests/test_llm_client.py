@@ -0,0 +1,64 @@
+def test_llm_config_shares_clients():
+    from deep_researcher.llm_client import ClientRegistry, LLMConfig
+
+    registry = ClientRegistry()
+    config = LLMConfig(
+        reasoning_model_provider="openai",
+        main_model_provider="openai",
+        fast_model_provider="deepseek",
+        api_keys={"openai": "sk-test", "deepseek": "sk-test"},
+        registry=registry,
+    )
+    # Models from the same provider share a client, and each endpoint has a single connection pool
+    assert config.reasoning_model._client is config.main_model._client
+    assert config.fast_model._client is not config.main_model._client
+    assert len(registry.clients) == 2
+    assert len(registry.http_clients) == 2
+
+    # A second config for the same provider reuses the existing client
+    other_config = LLMConfig(
+        main_model_provider="openai",
+        main_model="gpt-4o-mini",
+        api_keys={"openai": "sk-test", "deepseek": "sk-test"},
+        registry=registry,
+    )
+    assert other_config.main_model._client is config.main_model._client
+
+
+def test_researchers_with_the_same_config_share_agents():
+    from deep_researcher.iterative_research import IterativeResearcher
+    from deep_researcher.llm_client import ClientRegistry, LLMConfig
+
+    registry = ClientRegistry()
+    config = LLMConfig(api_keys={"openai": "sk-test"}, search_provider="serper", registry=registry)
+    first = IterativeResearcher(verbose=False, config=config)
+    second = IterativeResearcher(verbose=False, config=config)
+    assert second.writer_agent is first.writer_agent
+    assert second.tool_agents["WebSearchAgent"].tools[0] is first.tool_agents["WebSearchAgent"].tools[0]
+
+    # Researchers with another config get their own agents
+    other = IterativeResearcher(verbose=False, config=LLMConfig(api_keys={"openai": "sk-test"}, registry=registry))
+    assert other.writer_agent is not first.writer_agent
+
+
+def test_registry_shares_one_http_session_per_event_loop():
+    import asyncio
+    from deep_researcher.llm_client import ClientRegistry
+
+    registry = ClientRegistry()
+
+    async def use_session():
+        session = registry.get_http_session()
+        assert registry.get_http_session() is session
+        return session
+
+    async def run_and_close():
+        session = await use_session()
+        await registry.aclose()
+        return session
+
+    first = asyncio.run(use_session())
+    # A later event loop gets a session of its own, which is closed with the registry
+    second = asyncio.run(run_and_close())
+    assert second is not first
+    assert second.closed and registry.http_session is None
@@ -0,0 +1,29 @@
+def test_novelty_scores():
+    from deep_researcher.novelty import NoveltyDetector
+
+    detector = NoveltyDetector()
+
+    # The first set of findings is always entirely novel
+    first = ["Tesla delivered 1.8 million vehicles in 2023 according to its annual report [1](https://ir.tesla.com)."]
+    assert detector.add(first) == 1.0
+
+    # Repeating the same findings adds nothing new
+    assert detector.add(first) == 0.0
+
+    # Partially overlapping findings score somewhere in between
+    overlapping = [
+        "Tesla delivered 1.8 million vehicles in 2023 according to its annual report [1](https://ir.tesla.com). "
+        "Its energy storage deployments more than doubled over the same period."
+    ]
+    partial_score = detector.score(overlapping)
+    assert 0.0 < partial_score < 1.0
+
+    # Findings about a different topic are entirely new
+    assert detector.add(["Plato founded the Academy in Athens around 387 BC."]) == 1.0
+
+    # Scoring does not record the findings, adding them does
+    assert detector.scores == [1.0, 0.0, 1.0]
+    assert detector.add(overlapping) == partial_score
+
+    # Empty findings carry no new information
+    assert detector.add([]) == 0.0
@@ -0,0 +1,116 @@
+import json
+import random
+import pytest
+
+# Characters that commonly trip up JSON extraction when they appear inside strings
+TRICKY_CHARACTERS = ['{', '}', '[', ']', '"', '\\', ',', ':', '`', '\n', ' ', 'é', '😀']
+
+
+def random_string(rng: random.Random) -> str:
+    alphabet = TRICKY_CHARACTERS + list("abcdefghijklmnopqrstuvwxyz0123456789")
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+
+
+def random_json_value(rng: random.Random, depth: int = 0):
+    kind = rng.randint(0, 6 if depth < 3 else 4)
+    if kind == 0:
+        return rng.randint(-1000, 1000)
+    if kind == 1:
+        return rng.random()
+    if kind == 2:
+        return rng.choice([True, False, None])
+    if kind in (3, 4):
+        return random_string(rng)
+    if kind == 5:
+        return [random_json_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return random_json_object(rng, depth + 1)
+
+
+def random_json_object(rng: random.Random, depth: int = 0) -> dict:
+    return {random_string(rng): random_json_value(rng, depth) for _ in range(rng.randint(1, 4))}
+
+
+def wrap_output(rng: random.Random, payload: str) -> str:
+    """Wrap JSON in the kind of text that LLMs put around it"""
+    prefix = rng.choice([
+        "",
+        "Here is the output:\n",
+        "```json\n",
+        "```\n",
+        "Sure! I've used [1] and [2] as references {not json} before:\n```JSON\n",
+    ])
+    suffix = rng.choice(["", "\n```", "\n```\nLet me know if you need anything else!", " {'also': 'not json'}"])
+    return prefix + payload + suffix
+
+
+def test_parse_json_output_cases():
+    from deep_researcher.agents.utils.parse_output import parse_json_output, OutputParserError
+
+    # Plain JSON
+    assert parse_json_output('{"a": 1}') == {"a": 1}
+
+    # Output without a code block that isn't valid JSON on its own
+    assert parse_json_output('The answer is {"a": 1} as requested') == {"a": 1}
+
+    # Braces and escaped quotes inside strings
+    assert parse_json_output('```json\n{"a": "b}\\"{", "c": "[ok]"}\n```') == {"a": 'b}"{', "c": "[ok]"}
+
+    # Objects are preferred to arrays that appear earlier in the output
+    assert parse_json_output('Sources [1] and [2]: {"a": [1, 2]}') == {"a": [1, 2]}
+
+    # Invalid candidates are skipped
+    assert parse_json_output('{not json} then {"a": 1}') == {"a": 1}
+
+    # Trailing commas
+    assert parse_json_output('{"a": [1, 2,], "b": {"c": 3,},}') == {"a": [1, 2], "b": {"c": 3}}
+
+    # Truncated output
+    assert parse_json_output('{"a": [1, 2], "b": "some te') == {"a": [1, 2], "b": "some te"}
+    assert parse_json_output('{"a": {"b": [1, 2') == {"a": {"b": [1, 2]}}
+    assert parse_json_output('{"a": 1, "b') == {"a": 1, "b": None}
+    assert parse_json_output('{"a": 1, "b":') == {"a": 1, "b": None}
+    assert parse_json_output('{"a": 1,') == {"a": 1}
+    assert parse_json_output('{"a": "x\\') == {"a": "x"}
+    assert parse_json_output('{"a": "x\\u00') == {"a": "x"}
+    assert parse_json_output('{"a": [tru') == {"a": [True]}
+    assert parse_json_output('{"a": 1.') == {"a": 1}
+    assert parse_json_output('{"a": 1, "b"') == {"a": 1, "b": None}
+
+    with pytest.raises(OutputParserError):
+        parse_json_output("No JSON here")
+
+
+def test_find_json_in_string():
+    from deep_researcher.agents.utils.parse_output import find_json_in_string
+
+    string = "bla bla bla {this is {some} text{{}and it's sneaky}} because {it's} confusing"
+    assert find_json_in_string(string) == "{this is {some} text{{}and it's sneaky}}"
+    assert find_json_in_string('x {"a": "}"} y') == '{"a": "}"}'
+    assert find_json_in_string("no braces") == ""
+
+
+def test_parse_json_output_fuzz():
+    from deep_researcher.agents.utils.parse_output import parse_json_output
+
+    rng = random.Random(42)
+    for _ in range(500):
+        expected = random_json_object(rng)
+        payload = json.dumps(expected, ensure_ascii=rng.choice([True, False]), indent=rng.choice([None, 2]))
+        assert parse_json_output(wrap_output(rng, payload)) == expected
+
+
+def test_parse_json_output_fuzz_truncated():
+    from deep_researcher.agents.utils.parse_output import parse_json_output
+
+    rng = random.Random(7)
+    for _ in range(1000):
+        expected = random_json_object(rng)
+        payload = json.dumps(expected, ensure_ascii=rng.choice([True, False]))
+        truncated = payload[:rng.randint(1, len(payload))]
+        # Output that was cut off has nothing after it, but may have text before it
+        prefix = rng.choice(["", "Here is the output:\n", "```json\n"])
+        # Truncated output is always repaired into an object, whatever token it was cut off in
+        parsed = parse_json_output(prefix + truncated)
+        assert isinstance(parsed, dict)
+        if truncated == payload:
+            assert parsed == expected
@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+
+
+def test_prefetch_search_results(monkeypatch):
+    from deep_researcher.agents import planner_agent
+    from deep_researcher.tools.web_search import ScrapeResult, WebpageSnippet
+
+    searches, scraped = [], []
+
+    class FakeSerperClient:
+        async def search(self, query, filter_for_relevance=True, max_results=5):
+            searches.append((query, filter_for_relevance))
+            return [WebpageSnippet(url="https://news.example.com/acme", title="Acme news", description="About Acme")]
+
+    async def fake_scrape_urls(items, session=None):
+        scraped.extend(item.url for item in items)
+        return [
+            ScrapeResult(
+                url=item.url,
+                title=item.title,
+                description=item.description or "",
+                text="Error fetching content: HTTP 404" if "missing" in item.url else f"Text of {item.url} " * 500,
+            )
+            for item in items
+        ]
+
+    monkeypatch.setattr(planner_agent, "get_serper_client", lambda config: FakeSerperClient())
+    monkeypatch.setattr(planner_agent, "scrape_urls", fake_scrape_urls)
+
+    config = SimpleNamespace(search_provider="serper", registry=SimpleNamespace(get_http_session=lambda: None))
+    query = "How does Acme Inc (www.Acme.com) compare to missing.io?"
+    results = asyncio.run(planner_agent.prefetch_search_results(query, config, max_characters=100))
+
+    # The raw query is searched without the LLM relevance filter, and the websites in the query are scraped directly
+    assert searches == [(query, False)]
+    assert sorted(scraped) == ["https://acme.com", "https://missing.io", "https://news.example.com/acme"]
+    assert "URL: https://news.example.com/acme" in results and "URL: https://acme.com" in results
+    assert "missing.io" not in results
+    assert all(len(line) <= len("TEXT: ") + 100 for line in results.splitlines() if line.startswith("TEXT: "))
+
+    # Nothing is prefetched when the search provider can't be called directly and the query has no websites
+    config.search_provider = "openai"
+    assert asyncio.run(planner_agent.prefetch_search_results("Acme products", config)) is None
+
+
+def test_planner_reuses_the_agents_and_search_client_of_the_config(monkeypatch):
+    from deep_researcher.agents.planner_agent import init_planner_agent
+    from deep_researcher.iterative_research import IterativeResearcher
+    from deep_researcher.llm_client import ClientRegistry, LLMConfig
+    from deep_researcher.tools.web_search import get_serper_client
+
+    monkeypatch.setenv("SERPER_API_KEY", "test")
+    config = LLMConfig(api_keys={"openai": "sk-test"}, search_provider="serper", registry=ClientRegistry())
+    researcher = IterativeResearcher(verbose=False, config=config)
+    init_planner_agent(config)
+    init_planner_agent(config, use_tools=False)
+
+    assert set(config.agents) == {"KnowledgeGapAgent", "ToolSelectorAgent", "ThinkingAgent", "WriterAgent", "ToolAgents"}
+    assert config.agents["ToolAgents"] is researcher.tool_agents
+    client = get_serper_client(config)
+    assert get_serper_client(config) is client and client.filter_agent is config.agents["SearchFilterAgent"]
+
+
+def test_prefetch_errors_go_to_the_event_stream(monkeypatch, capsys):
+    from deep_researcher.agents import planner_agent
+    from deep_researcher.events import LogEvent, stream_events
+
+    class FailingSerperClient:
+        async def search(self, query, filter_for_relevance=True, max_results=5):
+            raise RuntimeError("Search is down")
+
+    monkeypatch.setattr(planner_agent, "get_serper_client", lambda config: FailingSerperClient())
+    config = SimpleNamespace(search_provider="serper", registry=SimpleNamespace(get_http_session=lambda: None))
+    results = []
+
+    async def prefetch():
+        results.append(await planner_agent.prefetch_search_results("Acme products", config))
+
+    async def run():
+        return [event async for event in stream_events(prefetch())]
+
+    events = asyncio.run(run())
+    assert results == [None]
+    assert [event.message for event in events if isinstance(event, LogEvent)] == [
+        "Error prefetching search results for the report plan: Search is down"
+    ]
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+
+def test_local_trace_processor_writes_profiles(tmp_path):
+    from agents import custom_span, trace
+    from deep_researcher.profiling import disable_profiling, enable_profiling, profiling_enabled
+
+    profiler = enable_profiling(str(tmp_path))
+
+    async def fetch(url: str):
+        with custom_span("http_fetch", data={"url": url}):
+            await asyncio.sleep(0.01)
+        with custom_span("html_to_text", data={"url": url, "text": "x" * 1000}):
+            pass
+
+    async def run():
+        with trace("profiled_run") as workflow_trace:
+            with custom_span("research"):
+                await asyncio.gather(fetch("https://a.com"), fetch("https://b.com"))
+        return workflow_trace.trace_id
+
+    try:
+        trace_id = asyncio.run(run())
+    finally:
+        disable_profiling()
+    assert not profiling_enabled()
+
+    spans = [json.loads(line) for line in (tmp_path / f"{trace_id}.jsonl").read_text().splitlines()]
+    assert sorted(span["name"] for span in spans) == ["html_to_text", "html_to_text", "http_fetch", "http_fetch", "research"]
+    research = next(span for span in spans if span["name"] == "research")
+    fetches = [span for span in spans if span["name"] == "http_fetch"]
+    assert all(span["parent_id"] == research["span_id"] for span in fetches)
+    assert all(span["duration_us"] >= 10_000 for span in fetches)
+    # Concurrent fetches are shown in their own lanes, and long data values are truncated
+    assert len({span["lane"] for span in fetches}) == 2 and research["lane"] not in {span["lane"] for span in fetches}
+    assert all(len(span["data"].get("text", "")) <= 200 for span in spans)
+
+    chrome_trace = json.loads((tmp_path / f"{trace_id}.trace.json").read_text())
+    complete_events = [event for event in chrome_trace["traceEvents"] if event["ph"] == "X"]
+    assert len(complete_events) == 5
+    assert {"name", "ts", "dur", "pid", "tid"} <= set(complete_events[0])
+    assert profiler.written_files == [str(tmp_path / f"{trace_id}.jsonl"), str(tmp_path / f"{trace_id}.trace.json")]
+
+
+def test_trace_of_a_failed_run_is_written(tmp_path, monkeypatch):
+    import pytest
+    from deep_researcher.iterative_research import IterativeResearcher
+    from deep_researcher.profiling import disable_profiling, enable_profiling
+
+    profiler = enable_profiling(str(tmp_path))
+    researcher = IterativeResearcher(max_iterations=3, verbose=False)
+    ended_traces = []
+    monkeypatch.setattr(profiler, "on_trace_end", lambda trace: ended_traces.append(trace.name))
+
+    async def failing_generate_observations(query, background_context=""):
+        raise RuntimeError("Provider down")
+
+    monkeypatch.setattr(researcher, "_generate_observations", failing_generate_observations)
+    try:
+        with pytest.raises(RuntimeError):
+            asyncio.run(researcher.run("query"))
+    finally:
+        disable_profiling()
+
+    assert ended_traces == ["iterative_researcher"]
+
+
+def test_flushing_an_open_trace_keeps_its_earlier_spans(tmp_path):
+    from agents import custom_span, trace
+    from deep_researcher.profiling import disable_profiling, enable_profiling
+
+    profiler = enable_profiling(str(tmp_path))
+    try:
+        with trace("profiled_run") as workflow_trace:
+            with custom_span("before_flush"):
+                pass
+            profiler.force_flush()
+            with custom_span("after_flush"):
+                pass
+        profiler.force_flush()
+    finally:
+        disable_profiling()
+
+    spans = [json.loads(line) for line in (tmp_path / f"{workflow_trace.trace_id}.jsonl").read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["before_flush", "after_flush"]
+    assert len(profiler.written_files) == 2
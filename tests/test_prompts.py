@@ -0,0 +1,27 @@
+def test_build_prompt_keeps_stable_prefix():
+    from deep_researcher.agents.utils.prompts import build_prompt
+
+    history = "[ITERATION 1]\n\n<thought>\nStart with the basics\n</thought>\n\n"
+    stable_sections = [
+        ("ORIGINAL QUERY", "Who was Plato?"),
+        ("BACKGROUND CONTEXT", ""),
+        ("HISTORY OF ACTIONS, FINDINGS AND THOUGHTS", history),
+    ]
+
+    thinking_prompt = build_prompt(stable_sections)
+    gap_prompt = build_prompt(stable_sections, [("CURRENT ITERATION NUMBER", "1"), ("TIME ELAPSED", "0.50 minutes")])
+    selector_prompt = build_prompt(stable_sections, [("KNOWLEDGE GAP TO ADDRESS", "Plato's main works")])
+
+    # Empty sections are left out
+    assert "BACKGROUND CONTEXT" not in thinking_prompt
+
+    # The prompts of all agents share the same prefix, with the volatile content at the end
+    prefix = thinking_prompt.rstrip("\n")
+    assert gap_prompt.startswith(prefix)
+    assert selector_prompt.startswith(prefix)
+    assert gap_prompt.endswith("TIME ELAPSED:\n0.50 minutes\n")
+
+    # The prompt for the next iteration extends the prompt from the previous iteration
+    next_history = history + "<task>\nAddress this knowledge gap: Plato's main works\n</task>\n\n"
+    next_prompt = build_prompt(stable_sections[:2] + [("HISTORY OF ACTIONS, FINDINGS AND THOUGHTS", next_history)])
+    assert next_prompt.startswith(prefix)
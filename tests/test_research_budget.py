@@ -0,0 +1,58 @@
+def test_unused_allowance_flows_to_incomplete_sections():
+    from deep_researcher.budget import ResearchBudget
+
+    budget = ResearchBudget(max_iterations=3, max_time_minutes=10)
+    finished_early = budget.create_section_budget("Introduction")
+    still_researching = budget.create_section_budget("Market Analysis")
+
+    # The first section finishes after 1 iteration and 2 minutes, releasing 2 iterations and 8 minutes
+    assert finished_early.can_continue(0, 0.0) == (True, "")
+    finished_early.release(1, 2.0)
+    assert budget.iteration_pool == 2
+    assert budget.time_pool_minutes == 8.0
+
+    # The second section reaches its own cap and borrows from the pool
+    assert still_researching.can_continue(3, 6.0)[0]
+    assert still_researching.max_iterations == 4
+    assert still_researching.can_continue(4, 10.5)[0]
+    assert still_researching.max_iterations == 5
+    assert still_researching.max_time_minutes > 10.5
+
+    # Once the pool is empty the section has to stop
+    can_continue, reason = still_researching.can_continue(5, 11.0)
+    assert not can_continue
+    assert reason == "Reached maximum iterations (5)"
+
+
+def test_sections_do_not_borrow_when_sharing_is_disabled():
+    from deep_researcher.budget import ResearchBudget
+
+    budget = ResearchBudget(max_iterations=2, max_time_minutes=10, share_unused=False)
+    finished_early = budget.create_section_budget("Introduction")
+    still_researching = budget.create_section_budget("Market Analysis")
+
+    finished_early.release(0, 1.0)
+    assert not still_researching.can_continue(2, 3.0)[0]
+
+
+def test_llm_call_ceiling_keeps_reserve_for_writing():
+    from deep_researcher.budget import ResearchBudget, record_llm_calls
+
+    budget = ResearchBudget(max_iterations=5, max_time_minutes=10, max_llm_calls=20, reserved_llm_calls=4)
+    section = budget.create_section_budget("Introduction")
+
+    token = budget.activate()
+    try:
+        record_llm_calls(15)
+        assert section.can_continue(1, 1.0)[0]
+        record_llm_calls(1)
+        can_continue, reason = section.can_continue(2, 2.0)
+    finally:
+        ResearchBudget.deactivate(token)
+
+    # Calls made outside of the active context are not counted
+    record_llm_calls(100)
+
+    assert not can_continue
+    assert reason == "Reached the maximum number of LLM calls for the report (20)"
+    assert budget.llm_calls == 16
@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+
+
+def test_call_with_retries_retries_transient_errors():
+    from deep_researcher.resilience import RetryPolicy, call_with_retries
+
+    attempts = []
+
+    async def flaky_call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise asyncio.TimeoutError()
+        return "ok"
+
+    result = asyncio.run(call_with_retries(flaky_call, policy=RetryPolicy(max_attempts=4, base_delay=0)))
+    assert result == "ok"
+    assert len(attempts) == 3
+
+
+def test_call_with_retries_does_not_retry_other_errors():
+    from deep_researcher.resilience import RetryPolicy, call_with_retries
+
+    attempts = []
+
+    async def broken_call():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(call_with_retries(broken_call, policy=RetryPolicy(max_attempts=4, base_delay=0)))
+    assert len(attempts) == 1
+
+
+def test_circuit_breaker_fails_fast_once_open():
+    from deep_researcher.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retries
+
+    breaker = CircuitBreaker("test-provider", failure_threshold=2, reset_timeout=60)
+    attempts = []
+
+    async def failing_call():
+        attempts.append(1)
+        raise asyncio.TimeoutError()
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call_with_retries(failing_call, policy=RetryPolicy(max_attempts=5, base_delay=0), breaker=breaker))
+
+    # The breaker opened after two failures, so the remaining attempts were never made
+    assert len(attempts) == 2
+    assert breaker.is_open
+
+    # Once the cool-down has passed a trial call is let through, and a success closes the breaker again
+    breaker.opened_at -= 60
+
+    async def healthy_call():
+        return "ok"
+
+    assert asyncio.run(call_with_retries(healthy_call, breaker=breaker)) == "ok"
+    assert not breaker.is_open
+
+
+def test_llm_call_limit_lets_nested_calls_share_their_slot():
+    from deep_researcher.resilience import llm_call_slot, set_max_concurrent_llm_calls
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def call(nested: bool):
+        nonlocal in_flight, max_in_flight
+        async with llm_call_slot():
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            if nested:
+                # E.g. a tool of the agent calling another agent, which would deadlock if it waited for its own slot
+                await asyncio.create_task(call(nested=False))
+            in_flight -= 1
+
+    async def run():
+        set_max_concurrent_llm_calls(2)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(call(nested=True) for _ in range(6))), timeout=5)
+        finally:
+            set_max_concurrent_llm_calls(None)
+
+    asyncio.run(run())
+    assert max_in_flight <= 4  # Two slots, each with at most one nested call
+
+
+def test_cancelled_trial_call_does_not_keep_the_breaker_open():
+    from deep_researcher.resilience import CircuitBreaker, call_with_retries
+
+    breaker = CircuitBreaker("test-provider", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.is_open
+
+    async def run():
+        task = asyncio.ensure_future(call_with_retries(lambda: asyncio.sleep(10), breaker=breaker))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert not breaker.trial_in_progress
+    assert breaker.allow_request()
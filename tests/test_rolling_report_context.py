@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+
+def test_rolling_context_stays_within_budget():
+    from deep_researcher.agents.long_writer_agent import RollingReportContext, build_report_header
+    from deep_researcher.agents.utils.prompts import estimate_tokens
+
+    titles = [f"Section {i}" for i in range(20)]
+    context = RollingReportContext(build_report_header("Title", titles), max_tokens=1000, digest_words=20)
+    for title in titles[:-1]:
+        context.add_section(title, f"## {title}\n" + f"Details about {title}. " * 100)
+        rendered = context.render()
+        assert estimate_tokens(rendered) <= 1000 + 10
+        # The table of contents and the end of the previous section are always included
+        assert "20. Section 19" in rendered
+        assert rendered.rstrip().endswith(f"Details about {title}.")
+
+    # The most recent digests are kept and the oldest are left out once the budget is used up
+    assert "[Summary of section: Section 17]" in rendered
+    assert "[Summary of section: Section 0]" not in rendered
+    assert "earlier sections omitted]" in rendered
+
+
+def test_write_report_sends_bounded_context(monkeypatch):
+    from deep_researcher.agents import long_writer_agent
+    from deep_researcher.agents.long_writer_agent import LongWriterOutput, write_report
+    from deep_researcher.agents.proofreader_agent import ReportDraft, ReportDraftSection
+
+    context_sizes = {}
+
+    async def fake_write_next_section(original_query, report_draft, next_section_title, next_section_draft, agent=None):
+        context_sizes.setdefault(next_section_title, []).append(len(report_draft))
+        return LongWriterOutput(next_section_markdown=f"## {next_section_title}\n" + "text " * 2000, references=[])
+
+    monkeypatch.setattr(long_writer_agent, "write_next_section", fake_write_next_section)
+    monkeypatch.setattr(long_writer_agent, "init_long_writer_agent", lambda config: SimpleNamespace())
+
+    report_draft = ReportDraft(sections=[
+        ReportDraftSection(section_title=f"Section {i}", section_content="draft") for i in range(10)
+    ])
+    bounded_report = asyncio.run(write_report("query", "Title", report_draft, max_context_tokens=3000))
+    bounded_sizes = [sizes[0] for sizes in context_sizes.values()]
+    full_report = asyncio.run(write_report("query", "Title", report_draft, max_context_tokens=None))
+    full_sizes = [sizes[1] for sizes in context_sizes.values()]
+
+    # Only the prompt context changes, not the report itself
+    assert bounded_report == full_report
+    assert max(bounded_sizes) <= 3000 * 4 + 100
+    assert full_sizes[-1] > 9 * 10000
@@ -0,0 +1,70 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+
+def make_result(input_tokens: int, cached_tokens: int, output_tokens: int, num_responses: int = 1):
+    usage = SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        input_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+    )
+    return SimpleNamespace(raw_responses=[SimpleNamespace(usage=usage)] * num_responses, final_output="output")
+
+
+def test_run_stats_rollups(tmp_path, monkeypatch):
+    from deep_researcher.stats import RunStats, get_price, load_prices, reset_scope, set_scope
+
+    prices_file = tmp_path / "prices.json"
+    prices_file.write_text(json.dumps({"my-model": {"input": 1.0, "output": 2.0}}))
+    monkeypatch.setenv("MODEL_PRICES_FILE", str(prices_file))
+    prices = load_prices()
+    assert get_price("gpt-4o-2024-08-06", prices) is prices["gpt-4o"]
+    assert get_price("gpt-4o-mini-2024-07-18", prices) is prices["gpt-4o-mini"]
+    assert get_price("unknown-model", prices) is None
+
+    stats = RunStats()
+    stats.record_call("PlannerAgent", "my-model", (1_000_000, 0, 500_000))
+    token = set_scope("Section A", 1)
+    stats.record_call("ThinkingAgent", "gpt-4o", (1_000_000, 500_000, 0), wall_seconds=2.0, queue_seconds=0.5)
+    set_scope("Section A", 2)
+    stats.record_call("ThinkingAgent", "unknown-model", (10, 0, 10), model_calls=2, wall_seconds=1.0)
+    reset_scope(token)
+
+    # Uncached input, cached input and output tokens are each priced separately
+    assert stats.calls[0].cost == 1.0 + 1.0
+    assert stats.calls[1].cost == 0.5 * 2.5 + 0.5 * 1.25
+    assert stats.total.calls == 4 and stats.total.unpriced_calls == 2
+
+    assert set(stats.by_agent()) == {"PlannerAgent", "ThinkingAgent"}
+    assert stats.by_agent()["ThinkingAgent"].wall_seconds == 3.0
+    assert stats.by_section()["Section A"].queue_seconds == 0.5
+    assert set(stats.by_iteration()) == {"(report)", "Section A #1", "Section A #2"}
+    assert "ThinkingAgent" in stats.summary()
+
+
+def test_research_runner_records_calls(monkeypatch):
+    from deep_researcher.agents import baseclass
+    from deep_researcher.agents.baseclass import ResearchAgent, ResearchRunner
+    from deep_researcher.stats import RunStats
+
+    async def fake_run(agent, input, **kwargs):
+        return make_result(200, 100, 50, num_responses=2)
+
+    monkeypatch.setattr(baseclass.Runner, "run", fake_run)
+    agent = ResearchAgent(name="WriterAgent", instructions="", model="gpt-4o-mini")
+
+    async def run():
+        stats = RunStats()
+        token = stats.activate()
+        try:
+            await ResearchRunner.run(agent, "input")
+        finally:
+            RunStats.deactivate(token)
+        return stats
+
+    stats = asyncio.run(run())
+    [call] = stats.calls
+    assert (call.agent, call.model, call.model_calls) == ("WriterAgent", "gpt-4o-mini", 2)
+    assert (call.input_tokens, call.cached_tokens, call.output_tokens) == (400, 200, 100)
+    assert call.cost is not None and 0 <= call.queue_seconds <= call.wall_seconds
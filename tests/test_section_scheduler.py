@@ -0,0 +1,70 @@
+import asyncio
+
+
+def test_scheduler_limits_concurrency_in_priority_order():
+    from deep_researcher.scheduler import SectionScheduler
+
+    scheduler = SectionScheduler(max_concurrent=2)
+    running, max_running, started = [], [], []
+
+    async def research(name: str, priority: int, delay: float):
+        async with scheduler.slot(name, priority=priority):
+            started.append(name)
+            running.append(name)
+            max_running.append(len(running))
+            await asyncio.sleep(delay)
+            running.remove(name)
+
+    async def run():
+        # Sections arrive out of report order, but the queued ones are admitted by their position in the report
+        await asyncio.gather(
+            research("S1", 0, 0.02),
+            research("S5", 4, 0.01),
+            research("S4", 3, 0.01),
+            research("S2", 1, 0.01),
+            research("S3", 2, 0.01),
+        )
+
+    asyncio.run(run())
+    assert max(max_running) == 2
+    assert started == ["S1", "S5", "S2", "S3", "S4"]
+    assert scheduler.active == 0
+    assert all(run.finished_at is not None for run in scheduler.runs)
+    assert max(run.wait_seconds for run in scheduler.runs) > 0
+    assert "max 2 concurrent" in scheduler.summary()
+
+
+def test_cancelled_sections_leave_the_queue():
+    from deep_researcher.scheduler import SectionScheduler
+
+    scheduler = SectionScheduler(max_concurrent=1)
+    started = []
+
+    async def research(name: str, priority: int):
+        async with scheduler.slot(name, priority=priority):
+            started.append(name)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        first = asyncio.create_task(research("A", 0))
+        queued = asyncio.create_task(research("B", 1))
+        last = asyncio.create_task(research("C", 2))
+        await asyncio.sleep(0)
+        queued.cancel()
+        await asyncio.gather(first, last, queued, return_exceptions=True)
+
+    asyncio.run(run())
+    assert started == ["A", "C"]
+    assert scheduler.active == 0 and not scheduler.waiting
+
+
+def test_unlimited_scheduler_admits_everything():
+    from deep_researcher.scheduler import SectionScheduler
+
+    scheduler = SectionScheduler()
+
+    async def run():
+        async with scheduler.slot("A"), scheduler.slot("B"), scheduler.slot("C"):
+            return scheduler.active
+
+    assert asyncio.run(run()) == 3
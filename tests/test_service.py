@@ -0,0 +1,117 @@
+import asyncio
+
+
+def test_job_limits_are_capped_at_the_service_limits():
+    from deep_researcher.service import JobRequest, ResearchService
+
+    # The service can be created without API keys, as the default config is only created when it starts
+    service = ResearchService(max_iterations=5, max_time_minutes=10, max_llm_calls=50)
+    assert service.config is None
+
+    assert service.job_limits(JobRequest(query="q")) == (5, 10, 50)
+    assert service.job_limits(JobRequest(query="q", max_iterations=2, max_time_minutes=30, max_llm_calls=500)) == (2, 10, 50)
+
+
+def test_service_queues_runs_and_cancels_jobs(monkeypatch):
+    import aiohttp
+    from aiohttp import web
+    from deep_researcher.service import ResearchService
+    from deep_researcher.stats import RunStats
+
+    release = asyncio.Event()
+
+    async def fake_research(self, job):
+        if job.request.query == "slow":
+            await release.wait()
+        if job.request.query == "fails":
+            raise RuntimeError("boom")
+        return f"Report on {job.request.query}", RunStats()
+
+    monkeypatch.setattr(ResearchService, "_research", fake_research)
+
+    async def run():
+        service = ResearchService(max_workers=1, max_queue_size=2, config=object())
+        runner = web.AppRunner(service.create_app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        try:
+            async with aiohttp.ClientSession(base_url) as session:
+                async def submit(query):
+                    async with session.post("/jobs", json={"query": query}) as response:
+                        return response.status, await response.json()
+
+                assert (await submit(""))[0] == 400
+                _, slow = await submit("slow")
+                await asyncio.sleep(0.05)  # Let the worker pick up the slow job, leaving the queue empty
+                _, queued = await submit("fast")
+                _, failing = await submit("fails")
+                status, _ = await submit("rejected")
+                assert status == 503 and queued["queue_position"] == 0 and failing["queue_position"] == 1
+
+                async with session.delete(f"/jobs/{failing['id']}") as response:
+                    assert (await response.json())["status"] == "cancelled"
+                async with session.get(f"/jobs/{queued['id']}/result") as response:
+                    assert response.status == 409
+                release.set()
+                await service.queue.join()
+
+                async with session.get(f"/jobs/{queued['id']}/result") as response:
+                    assert (await response.json())["report"] == "Report on fast"
+                async with session.get("/jobs") as response:
+                    states = {job["query"]: job["status"] for job in await response.json()}
+                async with session.get("/jobs/missing") as response:
+                    assert response.status == 404
+                return states
+        finally:
+            await runner.cleanup()
+
+    states = asyncio.run(run())
+    assert states == {"slow": "completed", "fast": "completed", "fails": "cancelled"}
+
+
+def test_cancelled_jobs_free_their_queue_slot_and_leave_the_worker_running(monkeypatch):
+    import pytest
+    from deep_researcher.resilience import CircuitBreaker, call_with_retries
+    from deep_researcher.service import QueueFullError, ResearchService
+    from deep_researcher.stats import RunStats
+
+    # The running job is cancelled during the trial call of a half-open breaker
+    breaker = CircuitBreaker("test-provider", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    async def fake_research(self, job):
+        if job.request.query == "slow":
+            await call_with_retries(lambda: asyncio.sleep(10), breaker=breaker)
+        return f"Report on {job.request.query}", RunStats()
+
+    monkeypatch.setattr(ResearchService, "_research", fake_research)
+
+    async def run():
+        from deep_researcher.service import JobRequest
+
+        service = ResearchService(max_workers=1, max_queue_size=1, config=object())
+        await service.start()
+        try:
+            running = service.submit(JobRequest(query="slow"))
+            await asyncio.sleep(0.05)
+            queued = service.submit(JobRequest(query="cancelled"))
+            with pytest.raises(QueueFullError):
+                service.submit(JobRequest(query="rejected"))
+
+            # Cancelling the queued job makes room straight away, before a worker has reached it
+            service.cancel(queued.id)
+            accepted = service.submit(JobRequest(query="accepted"))
+            assert service.health()["queued"] == 1
+
+            service.cancel(running.id)
+            await asyncio.wait_for(service.queue.join(), timeout=2)
+            return running, queued, accepted
+        finally:
+            await service.stop()
+
+    running, queued, accepted = asyncio.run(run())
+    assert (running.state, queued.state, accepted.state) == ("cancelled", "cancelled", "completed")
+    assert accepted.report == "Report on accepted"
+    assert breaker.allow_request()
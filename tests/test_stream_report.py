@@ -0,0 +1,117 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+SECTION_MARKDOWN = '# Heading "one" [2]\nText with a citation [1] and \\ escapes 😀 [7].\n## Sub [12]\n\nLast line [1]'
+SECTION_REFERENCES = ["[1] https://example.com/a", "[2] https://example.com/b", "[12] https://example.com/a/"]
+
+
+def test_streamed_section_matches_add_section_to_report():
+    from deep_researcher.agents.long_writer_agent import (
+        LongWriterOutput, StreamedSectionFormatter, add_section_to_report
+    )
+    from deep_researcher.agents.utils.citations import CitationIndex
+
+    output = LongWriterOutput(next_section_markdown=SECTION_MARKDOWN, references=SECTION_REFERENCES)
+    expected_index = CitationIndex.from_references(["[1] https://example.com/b"])
+    expected = add_section_to_report("", output, expected_index)
+
+    for references_first in (True, False):
+        fields = {"next_section_markdown": SECTION_MARKDOWN, "references": SECTION_REFERENCES}
+        if references_first:
+            fields = dict(reversed(list(fields.items())))
+        # ASCII-escaped output splits the surrogate pair of the emoji across deltas
+        raw = json.dumps(fields, ensure_ascii=True)
+        for delta_size in (1, 3, 10):
+            citation_index = CitationIndex.from_references(["[1] https://example.com/b"])
+            formatter = StreamedSectionFormatter(citation_index)
+            streamed = "".join(formatter.feed(raw[i:i + delta_size]) for i in range(0, len(raw), delta_size))
+            remainder, section_markdown = formatter.finish(output)
+
+            assert section_markdown == expected
+            assert streamed + remainder == expected
+            assert citation_index.urls == expected_index.urls
+            if references_first:
+                # With the references known up front, only the blank line that ends the section waits for the output
+                assert streamed == expected[:-2]
+
+
+def test_sections_are_streamed_as_they_are_written(monkeypatch):
+    from deep_researcher.agents import long_writer_agent
+    from deep_researcher.agents.baseclass import ResearchRunner
+    from deep_researcher.agents.long_writer_agent import (
+        LongWriterOutput, StreamedLongWriterOutput, write_report_as_sections_complete
+    )
+    from deep_researcher.events import ReportChunkEvent, stream_events
+
+    def section_output(title: str) -> dict:
+        return {"references": [f"[1] https://example.com/{title}"], "next_section_markdown": f"# {title}\nText [1]\n### More"}
+
+    async def fake_run_streamed_text(agent, input, on_text_delta, **kwargs):
+        title = input.split("<TITLE OF NEXT SECTION TO WRITE>")[1].split("</TITLE")[0].strip()
+        output = section_output(title)
+        raw = json.dumps(output)
+        for i in range(0, len(raw), 4):
+            await on_text_delta(raw[i:i + 4])
+        return SimpleNamespace(final_output=StreamedLongWriterOutput(**output))
+
+    async def fake_write_next_section(original_query, report_draft, next_section_title, next_section_draft, agent=None):
+        return LongWriterOutput(**section_output(next_section_title))
+
+    monkeypatch.setattr(ResearchRunner, "run_streamed_text", fake_run_streamed_text)
+    monkeypatch.setattr(long_writer_agent, "write_next_section", fake_write_next_section)
+    monkeypatch.setattr(long_writer_agent, "init_long_writer_agent", lambda config, references_first=False: SimpleNamespace())
+
+    async def write(stream: bool):
+        chunks = []
+
+        async def run_report() -> None:
+            drafts = [long_writer_agent._completed(f"Draft {title}") for title in ["A", "B"]]
+            chunks.append(await write_report_as_sections_complete("query", "Title", ["A", "B"], drafts, stream=stream))
+
+        events = [event async for event in stream_events(run_report())]
+        return chunks[0], [event.text for event in events if isinstance(event, ReportChunkEvent)]
+
+    report, chunks = asyncio.run(write(stream=True))
+    expected_report, section_chunks = asyncio.run(write(stream=False))
+
+    assert report == expected_report
+    assert "".join(chunks) == report
+    assert "## B\nText [2]\n#### More" in report
+    assert len(chunks) > len(section_chunks)
+
+
+def test_streamed_run_is_not_retried_once_text_has_been_passed_on(monkeypatch):
+    from agents import Agent
+    from deep_researcher import resilience
+    from deep_researcher.agents import baseclass
+    from deep_researcher.agents.baseclass import ResearchRunner
+
+    monkeypatch.setattr(resilience.DEFAULT_RETRY_POLICY, "base_delay", 0)
+    monkeypatch.setattr(resilience, "_circuit_breakers", {})
+    attempts = []
+
+    def fake_run_streamed(agent, input, **kwargs):
+        attempts.append(agent.model_settings.include_usage)
+
+        async def stream_events():
+            if len(attempts) > 1:
+                yield SimpleNamespace(type="raw_response_event", data=baseclass.ResponseTextDeltaEvent.model_construct(delta="Partial"))
+            raise asyncio.TimeoutError()
+
+        return SimpleNamespace(stream_events=stream_events, cancel=lambda: None)
+
+    monkeypatch.setattr(baseclass.Runner, "run_streamed", fake_run_streamed)
+    deltas = []
+
+    async def on_text_delta(delta: str) -> None:
+        deltas.append(delta)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(ResearchRunner.run_streamed_text(Agent(name="Writer", model="m"), "input", on_text_delta))
+
+    # The first attempt failed before any text and was retried, the second failed after its first delta
+    assert attempts == [True, True]
+    assert deltas == ["Partial"]
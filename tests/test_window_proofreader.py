@@ -0,0 +1,91 @@
+import asyncio
+import re
+from types import SimpleNamespace
+
+
+def test_split_into_windows():
+    from deep_researcher.agents.window_proofreader_agent import split_into_windows
+
+    windows = split_into_windows(7, window_size=3, overlap=1)
+    assert [list(owned) for owned, _, _ in windows] == [[0, 1, 2], [3, 4, 5], [6]]
+    assert [(list(before), list(after)) for _, before, after in windows] == [([], [3]), ([2], [6]), ([5], [])]
+
+
+def test_proofread_report_stitches_windows(monkeypatch):
+    from deep_researcher.agents import window_proofreader_agent
+    from deep_researcher.agents.window_proofreader_agent import ProofreadWindowOutput, proofread_report
+    from deep_researcher.agents.proofreader_agent import ReportDraft, ReportDraftSection
+
+    prompts = []
+
+    class FakeRunner:
+        @classmethod
+        async def run(cls, agent, input):
+            prompts.append((agent.name, input))
+            if agent.name == "ReportSummaryAgent":
+                return SimpleNamespace(final_output="A summary of the report.")
+            titles = re.findall(r'"section_title":"([^"]+)"', input.split("SECTIONS TO PROOFREAD:")[1])
+            if "Section 4" in titles:
+                raise RuntimeError("Window failed")
+            # Every section cites a shared source and one of its own, numbered from 1 within the window
+            markdown = "\n\n".join(
+                f"# {title}\nEdited [1] and [{i + 2}]" for i, title in enumerate(titles)
+            )
+            references = ["[1] https://example.com/shared"] + [f"[{i + 2}] https://example.com/{title}" for i, title in enumerate(titles)]
+            return SimpleNamespace(final_output_as=lambda cls: ProofreadWindowOutput(sections_markdown=markdown, references=references))
+
+    monkeypatch.setattr(window_proofreader_agent, "ResearchRunner", FakeRunner)
+    monkeypatch.setattr(window_proofreader_agent, "init_window_proofreader_agent", lambda config: SimpleNamespace(name="WindowProofreaderAgent"))
+    monkeypatch.setattr(window_proofreader_agent, "init_report_summary_agent", lambda config: SimpleNamespace(name="ReportSummaryAgent"))
+
+    report_draft = ReportDraft(sections=[
+        ReportDraftSection(section_title=f"Section {i}", section_content=f"Draft {i} [1](https://example.com/draft-{i})")
+        for i in range(6)
+    ])
+    report = asyncio.run(proofread_report("query", "Title", report_draft, config=SimpleNamespace(), window_size=2))
+
+    # Three windows plus the summary pass, with the windows overlapping by one section
+    assert len(prompts) == 4
+    assert "FOLLOWING SECTIONS (CONTEXT ONLY):\n## Section 2\nDraft 2" in prompts[0][1]
+
+    # The windows are stitched in order with headings rebased to level 2 and references numbered across the report
+    assert report.startswith("# Title\n\n## Summary\n\nA summary of the report.\n\n## Table of Contents\n\n1. Section 0")
+    assert [line for line in report.splitlines() if line.startswith("## Section")] == [f"## Section {i}" for i in range(6)]
+    assert "## Section 1\nEdited [1] and [3]" in report
+    assert report.count("https://example.com/shared") == 1
+
+    # The failed window falls back to the drafts of its sections
+    assert "## Section 4\nDraft 4 [" in report
+    assert report.endswith("https://example.com/draft-5")
+
+
+def test_proofreading_errors_go_to_the_event_stream(monkeypatch, capsys):
+    from deep_researcher.agents import window_proofreader_agent
+    from deep_researcher.agents.proofreader_agent import ReportDraft, ReportDraftSection
+    from deep_researcher.agents.window_proofreader_agent import proofread_report
+    from deep_researcher.events import LogEvent, stream_events
+
+    class FailingRunner:
+        @classmethod
+        async def run(cls, agent, input):
+            raise RuntimeError("Provider down")
+
+    monkeypatch.setattr(window_proofreader_agent, "ResearchRunner", FailingRunner)
+    monkeypatch.setattr(window_proofreader_agent, "init_window_proofreader_agent", lambda config: SimpleNamespace(name="WindowProofreaderAgent"))
+    monkeypatch.setattr(window_proofreader_agent, "init_report_summary_agent", lambda config: SimpleNamespace(name="ReportSummaryAgent"))
+    report_draft = ReportDraft(sections=[ReportDraftSection(section_title="Section", section_content="Draft")])
+    reports = []
+
+    async def proofread():
+        reports.append(await proofread_report("query", "Title", report_draft, config=SimpleNamespace()))
+
+    async def run():
+        return [event async for event in stream_events(proofread())]
+
+    events = asyncio.run(run())
+    assert "## Section\nDraft" in reports[0]
+    assert [event.message for event in events if isinstance(event, LogEvent)] == [
+        "Error proofreading sections 1-1, using their drafts instead: Provider down",
+        "Error writing the report summary: Provider down",
+    ]
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,117 @@
+import asyncio
+from types import SimpleNamespace
+
+
+def test_sections_are_written_as_research_completes(monkeypatch):
+    from deep_researcher.agents import long_writer_agent
+    from deep_researcher.agents.long_writer_agent import LongWriterOutput, write_report_as_sections_complete, write_report
+    from deep_researcher.agents.proofreader_agent import ReportDraft, ReportDraftSection
+
+    events = []
+
+    async def fake_write_next_section(original_query, report_draft, next_section_title, next_section_draft, agent=None):
+        events.append(f"write {next_section_title}")
+        return LongWriterOutput(
+            next_section_markdown=f"## {next_section_title}\n{next_section_draft} [1]",
+            references=[f"[1] https://example.com/{next_section_title}"],
+        )
+
+    monkeypatch.setattr(long_writer_agent, "write_next_section", fake_write_next_section)
+    monkeypatch.setattr(long_writer_agent, "init_long_writer_agent", lambda config: SimpleNamespace())
+
+    async def research(title: str, delay: float) -> str:
+        await asyncio.sleep(delay)
+        events.append(f"research {title}")
+        return f"Draft of {title}"
+
+    async def run():
+        # The research for the first section finishes first and the last section takes the longest
+        tasks = [asyncio.create_task(research(title, delay)) for title, delay in [("A", 0.01), ("B", 0.03), ("C", 0.1)]]
+        return await write_report_as_sections_complete("query", "Title", ["A", "B", "C"], tasks)
+
+    pipelined_report = asyncio.run(run())
+
+    # Sections A and B are written while the research for C is still running
+    assert events.index("write B") < events.index("research C")
+    assert [event for event in events if event.startswith("write")] == ["write A", "write B", "write C"]
+
+    # The report is the same as when writing from finished drafts
+    report_draft = ReportDraft(sections=[
+        ReportDraftSection(section_title=title, section_content=f"Draft of {title}") for title in ["A", "B", "C"]
+    ])
+    assert asyncio.run(write_report("query", "Title", report_draft)) == pipelined_report
+    assert pipelined_report.endswith("[1] https://example.com/A  \n[2] https://example.com/B  \n[3] https://example.com/C")
+
+
+def test_sections_are_written_in_parallel(monkeypatch):
+    from deep_researcher.agents import long_writer_agent
+    from deep_researcher.agents.long_writer_agent import LongWriterOutput, write_report
+    from deep_researcher.agents.proofreader_agent import ReportDraft, ReportDraftSection
+
+    contexts = {}
+    in_progress = []
+    max_in_progress = 0
+
+    async def fake_write_next_section(original_query, report_draft, next_section_title, next_section_draft, agent=None):
+        nonlocal max_in_progress
+        contexts[next_section_title] = report_draft
+        in_progress.append(next_section_title)
+        max_in_progress = max(max_in_progress, len(in_progress))
+        await asyncio.sleep(0.01)
+        in_progress.remove(next_section_title)
+        # Every section cites a shared source and one of its own
+        return LongWriterOutput(
+            next_section_markdown=f"## {next_section_title}\nShared [1](https://example.com/shared) and own [2](https://example.com/{next_section_title})",
+            references=["[1] https://example.com/shared", f"[2] https://example.com/{next_section_title}"],
+        )
+
+    monkeypatch.setattr(long_writer_agent, "write_next_section", fake_write_next_section)
+    monkeypatch.setattr(long_writer_agent, "init_long_writer_agent", lambda config: SimpleNamespace())
+
+    titles = [f"Section {i}" for i in range(10)]
+    report_draft = ReportDraft(sections=[
+        ReportDraftSection(section_title=title, section_content=f"## {title}\nFindings about {title} [1](https://x.com)")
+        for title in titles
+    ])
+    parallel_report = asyncio.run(write_report("query", "Title", report_draft, parallel=True))
+    assert max_in_progress == 10
+
+    # Each section gets the table of contents and digests of its neighbours instead of the report so far
+    context = contexts["Section 5"]
+    assert "10. Section 9" in context
+    assert "Findings about Section 4" in context and "Findings about Section 6" in context
+    assert "Findings about Section 3" not in context and "Shared" not in context
+
+    # Merging renumbers the references in document order, giving the same report as writing sequentially
+    sequential_report = asyncio.run(write_report("query", "Title", report_draft))
+    assert parallel_report == sequential_report
+    assert parallel_report.count("https://example.com/shared") == 1 + 10
+
+
+def test_create_section_digest():
+    from deep_researcher.agents.long_writer_agent import create_section_digest
+
+    digest = create_section_digest("## Market\nThe market grew [1](https://x.com) quickly.\n### Outlook\n" + "word " * 100, max_words=5)
+    assert digest == "Covers: Market; Outlook\nThe market grew quickly. word ..."
+
+
+def test_unwritten_drafts_are_closed_when_writing_fails(monkeypatch):
+    import inspect
+    import pytest
+    from deep_researcher.agents import long_writer_agent
+    from deep_researcher.agents.long_writer_agent import _completed, write_report_as_sections_complete
+
+    async def failing_write_next_section(original_query, report_draft, next_section_title, next_section_draft, agent=None):
+        raise RuntimeError("writer failed")
+
+    monkeypatch.setattr(long_writer_agent, "write_next_section", failing_write_next_section)
+    monkeypatch.setattr(long_writer_agent, "init_long_writer_agent", lambda config: SimpleNamespace())
+
+    async def run():
+        drafts = [_completed(f"Draft of {title}") for title in ["A", "B", "C"]]
+        with pytest.raises(RuntimeError):
+            await write_report_as_sections_complete("query", "Title", ["A", "B", "C"], drafts)
+        return drafts
+
+    drafts = asyncio.run(run())
+    assert all(inspect.getcoroutinestate(draft) == inspect.CORO_CLOSED for draft in drafts)